@@ -2,61 +2,87 @@
 Astoria v2 — Data exploration endpoints.
 
 Browse and filter the maritime database directly.
-Queries the documents table filtered by metadata type.
+Ships (ship_registry view) and voyage legs (voyage_legs, rebuilt from
+vessel_events) are filtered in the database and paged by keyset cursor
+(app/core/pagination.py). Statistics come from the precomputed
+maritime_stats rollups (app/services/stats.py).
 """
 
+import re
+from datetime import date
+
 from fastapi import APIRouter, Depends, Query, HTTPException
 from app.middleware.auth import AuthUser, get_current_user
-from app.models.schemas import ShipSummary, VoyageSummary
+from app.models.schemas import (
+    ShipPage, ShipSummary, StatsResponse, StatsRow, VoyagePage, VoyageRoute, VoyageSummary,
+)
+from app.core.pagination import apply_keyset, decode_cursor, page_of, quote
 from app.core.supabase import get_supabase_admin
+from app.services.stats import query_stats
 
 router = APIRouter(prefix="/explore", tags=["explore"])
 
 
-@router.get("/ships", response_model=list[ShipSummary])
+@router.get("/ships", response_model=ShipPage)
 async def list_ships(
-    search: str | None = Query(None, description="Search by ship name"),
+    name: str | None = Query(None, description="Ship name prefix"),
+    ship_type: str | None = Query(None, description="Vessel type, e.g. schooner"),
+    hailing_port: str | None = Query(None, description="Home port, e.g. Machias"),
     year_min: int | None = Query(None, description="Filter by minimum year built"),
     year_max: int | None = Query(None, description="Filter by maximum year built"),
+    tonnage_min: float | None = Query(None, ge=0),
+    tonnage_max: float | None = Query(None, ge=0),
     limit: int = Query(50, ge=1, le=200),
-    offset: int = Query(0, ge=0),
+    cursor: str | None = Query(None, description="next_cursor of the previous page"),
     user: AuthUser = Depends(get_current_user),
 ):
-    """List ships with optional filters."""
+    """List ships in name order, filtered and paged in the database.
+
+    Reads the ship_registry view (migration 016); every filter and the
+    (name_key, id) keyset are indexed, so each page is one query.
+    """
     supabase = get_supabase_admin()
 
     query_builder = (
-        supabase.table("documents")
-        .select("id, title, metadata")
-        .eq("metadata->>type", "ship")
-        .order("title")
-        .range(offset, offset + limit - 1)
+        supabase.table("ship_registry")
+        .select("id, name, name_key, ship_type, year_built, hailing_port, tonnage", count="estimated")
     )
 
-    if search:
-        query_builder = query_builder.ilike("title", f"%{search}%")
-
-    result = query_builder.execute()
-
-    ships = []
-    for doc in (result.data or []):
-        meta = doc.get("metadata", {})
-        year = meta.get("year_built")
-
-        if year_min and year and int(year) < year_min:
-            continue
-        if year_max and year and int(year) > year_max:
-            continue
-
-        ships.append(ShipSummary(
-            id=doc["id"],
-            name=meta.get("ship_name", doc["title"]),
-            type=meta.get("ship_type"),
-            year_built=int(year) if year else None,
-            port_of_registry=meta.get("port_of_registry"),
-        ))
-
-    return ships
+    if name:
+        prefix = re.sub(r"([\\%_*])", r"\\\1", name.strip().lower())
+        query_builder = query_builder.like("name_key", f"{prefix}%")
+    if ship_type:
+        query_builder = query_builder.eq("ship_type", ship_type.strip().lower())
+    if hailing_port:
+        query_builder = query_builder.eq("port_key", hailing_port.strip().lower())
+    if year_min is not None:
+        query_builder = query_builder.gte("year_built", year_min)
+    if year_max is not None:
+        query_builder = query_builder.lte("year_built", year_max)
+    if tonnage_min is not None:
+        query_builder = query_builder.gte("tonnage", tonnage_min)
+    if tonnage_max is not None:
+        query_builder = query_builder.lte("tonnage", tonnage_max)
+
+    query_builder = apply_keyset(query_builder, "name_key", decode_cursor(cursor))
+    result = query_builder.limit(limit + 1).execute()
+    rows, next_cursor = page_of(result.data or [], limit, "name_key")
+
+    return ShipPage(
+        items=[
+            ShipSummary(
+                id=row["id"],
+                name=row["name"],
+                type=row.get("ship_type"),
+                year_built=row.get("year_built"),
+                hailing_port=row.get("hailing_port"),
+                tonnage=row.get("tonnage"),
+            )
+            for row in rows
+        ],
+        next_cursor=next_cursor,
+        total_estimate=result.count,
+    )
 
 
 @router.get("/ships/{ship_id}")
@@ -81,59 +107,119 @@ async def get_ship(
     return result.data
 
 
-@router.get("/voyages", response_model=list[VoyageSummary])
+@router.get("/voyages", response_model=VoyagePage)
 async def list_voyages(
-    ship_name: str | None = Query(None),
-    port: str | None = Query(None, description="Filter by departure or arrival port"),
-    date_from: str | None = Query(None, description="YYYY-MM-DD"),
-    date_to: str | None = Query(None, description="YYYY-MM-DD"),
+    ship_name: str | None = Query(None, description="Vessel name"),
+    port: str | None = Query(None, description="Departure or arrival port"),
+    master: str | None = Query(None, description="Master (captain) name"),
+    date_from: date | None = Query(None, description="YYYY-MM-DD"),
+    date_to: date | None = Query(None, description="YYYY-MM-DD"),
+    include_routes: bool = Query(False, description="Also return the busiest routes for these filters"),
     limit: int = Query(50, ge=1, le=200),
-    offset: int = Query(0, ge=0),
+    cursor: str | None = Query(None, description="next_cursor of the previous page"),
     user: AuthUser = Depends(get_current_user),
 ):
-    """List voyages with optional filters."""
+    """List voyage legs in date order, filtered and paged in the database.
+
+    Reads the voyage_legs materialized view (migration 017), built from
+    vessel_events; every filter and the (sort_date, id) keyset are indexed.
+    """
     supabase = get_supabase_admin()
 
     query_builder = (
-        supabase.table("documents")
-        .select("id, title, metadata")
-        .eq("metadata->>type", "voyage")
-        .order("title")
-        .range(offset, offset + limit - 1)
+        supabase.table("voyage_legs")
+        .select("id, document_id, vessel_name, departed_from, arrived_at, event_date, "
+                "event_type, master, inferred, sort_date", count="estimated")
     )
 
     if ship_name:
-        query_builder = query_builder.ilike("metadata->>ship_name", f"%{ship_name}%")
-
-    result = query_builder.execute()
-
-    voyages = []
-    for doc in (result.data or []):
-        meta = doc.get("metadata", {})
-
-        if port:
-            dep = (meta.get("departure_port") or "").lower()
-            arr = (meta.get("arrival_port") or "").lower()
-            if port.lower() not in dep and port.lower() not in arr:
-                continue
-
-        if date_from:
-            dep_date = meta.get("departure_date", "")
-            if dep_date and dep_date < date_from:
-                continue
-
-        if date_to:
-            arr_date = meta.get("arrival_date", "")
-            if arr_date and arr_date > date_to:
-                continue
-
-        voyages.append(VoyageSummary(
-            id=doc["id"],
-            ship_name=meta.get("ship_name", "Unknown"),
-            departure_port=meta.get("departure_port"),
-            arrival_port=meta.get("arrival_port"),
-            departure_date=meta.get("departure_date"),
-            arrival_date=meta.get("arrival_date"),
-        ))
-
-    return voyages
+        query_builder = query_builder.eq("vessel_key", ship_name.strip().lower())
+    if port:
+        key = quote(port.strip().lower())
+        query_builder = query_builder.or_(f"from_key.eq.{key},to_key.eq.{key}")
+    if master:
+        query_builder = query_builder.eq("master_key", master.strip().lower())
+    if date_from:
+        query_builder = query_builder.gte("event_date", date_from.isoformat())
+    if date_to:
+        query_builder = query_builder.lte("event_date", date_to.isoformat())
+
+    # or= filters are ANDed together, so the keyset's composes with the port's
+    query_builder = apply_keyset(query_builder, "sort_date", decode_cursor(cursor))
+    result = query_builder.limit(limit + 1).execute()
+    rows, next_cursor = page_of(result.data or [], limit, "sort_date")
+
+    routes = None
+    if include_routes:
+        routes_result = supabase.rpc("voyage_route_counts", {
+            "vessel": ship_name.strip() if ship_name else None,
+            "port": port.strip() if port else None,
+            "master_name": master.strip() if master else None,
+            "date_from": date_from.isoformat() if date_from else None,
+            "date_to": date_to.isoformat() if date_to else None,
+        }).execute()
+        routes = [
+            VoyageRoute(
+                departure_port=r["departed_from"],
+                arrival_port=r["arrived_at"],
+                legs=r["legs"],
+                first_date=r.get("first_date"),
+                last_date=r.get("last_date"),
+            )
+            for r in (routes_result.data or [])
+        ]
+
+    return VoyagePage(
+        items=[
+            VoyageSummary(
+                id=row["id"],
+                document_id=row["document_id"],
+                ship_name=row["vessel_name"],
+                departure_port=row.get("departed_from"),
+                arrival_port=row.get("arrived_at"),
+                arrival_date=row.get("event_date"),
+                master=row.get("master"),
+                event_type=row.get("event_type"),
+                inferred=bool(row.get("inferred")),
+            )
+            for row in rows
+        ],
+        next_cursor=next_cursor,
+        total_estimate=result.count,
+        routes=routes,
+    )
+
+
+@router.get("/stats", response_model=StatsResponse)
+async def maritime_stats(
+    kind: str = Query("vessels", pattern="^(vessels|events)$",
+                      description="vessels (by construction) or events (enrollments, registrations)"),
+    group_by: str = Query("decade", description="Comma-separated dimensions, e.g. decade,vessel_type"),
+    decade: int | None = Query(None, description="e.g. 1840 for 1840-1849"),
+    vessel_type: str | None = Query(None),
+    place_built: str | None = Query(None, description="vessels only"),
+    hailing_port: str | None = Query(None, description="vessels only"),
+    builder: str | None = Query(None, description="vessels only"),
+    event_type: str | None = Query(None, description="events only"),
+    port: str | None = Query(None, description="events only"),
+    metric: str | None = Query(None, description="Order by: vessels, tonnage_total, tonnage_avg or events"),
+    limit: int = Query(100, ge=1, le=1000),
+    user: AuthUser = Depends(get_current_user),
+):
+    """Counts and tonnage grouped by any of the dimensions of kind.
+
+    Each combination is a precomputed cell of maritime_stats (migration
+    020), so a breakdown is one indexed lookup; filtering on a dimension
+    also groups by it.
+    """
+    dimensions = [d.strip() for d in group_by.split(",") if d.strip()]
+    filters = {
+        "decade": decade, "vessel_type": vessel_type, "place_built": place_built,
+        "hailing_port": hailing_port, "builder": builder, "event_type": event_type, "port": port,
+    }
+    try:
+        rows = query_stats(get_supabase_admin(), kind, dimensions, filters, metric, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return StatsResponse(kind=kind, group_by=dimensions, rows=[StatsRow(**row) for row in rows])
@@ -0,0 +1,130 @@
+"""
+Astoria v2 — Bulk export endpoints.
+
+Download ships, vessel events, voyage legs or person roles as CSV,
+NDJSON, Arrow or Parquet; ships and voyages take the same filters as
+the explore endpoints. The response
+is streamed from a server-side cursor (app/services/export.py), so a
+full-district export neither buffers in memory nor goes through NL2SQL.
+"""
+
+import asyncio
+from datetime import date
+
+import psycopg
+import structlog
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+
+from app.middleware.auth import AuthUser, get_current_user
+from app.services import export
+
+logger = structlog.get_logger()
+
+router = APIRouter(prefix="/export", tags=["export"])
+
+FORMAT = Query("csv", pattern="^(csv|ndjson|arrow|parquet)$",
+               description="csv, ndjson, arrow (IPC stream) or parquet")
+
+
+async def _stream(dataset: str, fmt: str, params: dict) -> StreamingResponse:
+    if fmt in export.ARROW_FORMATS and not export.arrow_available():
+        raise HTTPException(status_code=400, detail=f"{fmt} export needs pyarrow on the server")
+    chunks = export.stream_export(dataset, fmt, params)
+    try:
+        # run the query now, so a failure is still an error status
+        first = await asyncio.to_thread(next, chunks)
+    except psycopg.Error as e:
+        logger.error("export_failed", dataset=dataset, error=str(e))
+        raise HTTPException(status_code=503, detail=f"Export of {dataset} failed")
+
+    def body():
+        yield first
+        yield from chunks
+
+    media_type, extension = export.FORMATS[fmt]
+    return StreamingResponse(
+        body(),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="astoria_{dataset}.{extension}"'},
+    )
+
+
+@router.get("/ships")
+async def export_ships(
+    format: str = FORMAT,
+    name: str | None = Query(None, description="Ship name prefix"),
+    ship_type: str | None = Query(None),
+    hailing_port: str | None = Query(None),
+    year_min: int | None = Query(None),
+    year_max: int | None = Query(None),
+    tonnage_min: float | None = Query(None, ge=0),
+    tonnage_max: float | None = Query(None, ge=0),
+    user: AuthUser = Depends(get_current_user),
+):
+    """All ships matching the /explore/ships filters, in name order."""
+    return await _stream("ships", format, {
+        "name": name, "ship_type": ship_type, "hailing_port": hailing_port,
+        "year_min": year_min, "year_max": year_max,
+        "tonnage_min": tonnage_min, "tonnage_max": tonnage_max,
+    })
+
+
+@router.get("/events")
+async def export_events(
+    format: str = FORMAT,
+    ship_name: str | None = Query(None),
+    event_port: str | None = Query(None, description="Port where the document was issued"),
+    previous_port: str | None = Query(None, description="Previous port, where the register names one"),
+    recorded_master: str | None = Query(None, description="Master as written; '(same as previous)' is not resolved"),
+    date_from: date | None = Query(None, description="YYYY-MM-DD"),
+    date_to: date | None = Query(None, description="YYYY-MM-DD"),
+    user: AuthUser = Depends(get_current_user),
+):
+    """Every vessel event as recorded in the register, by vessel and event order.
+
+    For the legs /explore/voyages shows (inferred departures, resolved
+    masters), export /export/voyages instead.
+    """
+    return await _stream("events", format, {
+        "ship_name": ship_name, "event_port": event_port, "previous_port": previous_port,
+        "recorded_master": recorded_master,
+        "date_from": date_from and date_from.isoformat(),
+        "date_to": date_to and date_to.isoformat(),
+    })
+
+
+@router.get("/voyages")
+async def export_voyages(
+    format: str = FORMAT,
+    ship_name: str | None = Query(None),
+    port: str | None = Query(None, description="Departure or arrival port"),
+    master: str | None = Query(None, description="Master (captain) name"),
+    date_from: date | None = Query(None, description="YYYY-MM-DD"),
+    date_to: date | None = Query(None, description="YYYY-MM-DD"),
+    user: AuthUser = Depends(get_current_user),
+):
+    """All voyage legs matching the /explore/voyages filters, in the same order."""
+    return await _stream("voyages", format, {
+        "ship_name": ship_name, "port": port, "master": master,
+        "date_from": date_from and date_from.isoformat(),
+        "date_to": date_to and date_to.isoformat(),
+    })
+
+
+@router.get("/people")
+async def export_people(
+    format: str = FORMAT,
+    person: str | None = Query(None, description="Any form of the person's name"),
+    role: str | None = Query(None, pattern="^(master|owner|builder)$"),
+    ship_name: str | None = Query(None),
+    date_from: date | None = Query(None, description="Roles active on or after, YYYY-MM-DD"),
+    date_to: date | None = Query(None, description="Roles active on or before, YYYY-MM-DD"),
+    user: AuthUser = Depends(get_current_user),
+):
+    """All person roles matching the filters, grouped by resolved person."""
+    return await _stream("people", format, {
+        "person": person, "role": role, "ship_name": ship_name,
+        "date_from": date_from and date_from.isoformat(),
+        "date_to": date_to and date_to.isoformat(),
+    })
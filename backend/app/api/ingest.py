@@ -2,19 +2,29 @@
 # File: backend/app/api/ingest.py
 # Astoria v2 — Data ingestion endpoints (admin only).
 # Handles file upload, URL ingestion, and town web scraping.
+# Endpoints validate the request and queue a run (app.services.ingest_jobs);
+# the ingestion worker process (python -m app.worker) runs it with the
+# jobs in app.services.ingest_tasks. Each endpoint returns a run_id at
+# once; poll /ingest/runs/{run_id} or follow /ingest/runs/{run_id}/events
+# (SSE) for progress. Uploads are written to settings.ingest_upload_dir,
+# which the worker shares. /ingest/batch loads a zip and/or URL manifest
+# as one run.
 # All config sourced from app.core.config (get_settings).
 """
 
+import asyncio
+import json
 import uuid
-import tempfile
 import os
-from fastapi import APIRouter, Depends, UploadFile, File, Form, HTTPException
+import zipfile
+from pydantic import ValidationError
+from fastapi import APIRouter, Depends, Form, HTTPException, Request, status
+from fastapi.responses import StreamingResponse
 from app.middleware.auth import AuthUser, require_admin
-from app.models.schemas import IngestionResult, IngestionStatus
-from app.services.loader_agent import load_document
-from app.services.web_scraper import scrape_town, scrape_all_towns
+from app.models.schemas import BatchItem, BatchManifest, IngestionResult
+from app.services import ingest_jobs
 from app.core.config import get_settings
-from datetime import datetime, timezone
+from app.core.uploads import receive_form
 import structlog
 
 logger = structlog.get_logger()
@@ -22,98 +32,351 @@ router = APIRouter(prefix="/ingest", tags=["ingest"])
 
 ALLOWED_TOWNS = ["Blue Hill", "Sullivan", "Milbridge", "Machias"]
 ALLOWED_EXTENSIONS = {".pdf", ".txt", ".docx"}
+ZIP_MANIFEST_NAME = "manifest.json"
+ZIP_MAX_RATIO = 200             # uncompressed/compressed; higher looks like a zip bomb
 
 
-@router.post("/upload")
+def _upload_dir() -> str:
+    """Directory for uploads handed to the worker (created on first use)."""
+    path = os.path.abspath(get_settings().ingest_upload_dir)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _form_schema(properties: dict, required: list[str] = ()) -> dict:
+    """OpenAPI request body for endpoints that read their form with receive_form()."""
+    return {"requestBody": {"required": True, "content": {"multipart/form-data": {"schema": {
+        "type": "object", "properties": properties, "required": list(required),
+    }}}}}
+
+
+_TEXT = {"type": "string"}
+_FILE = {"type": "string", "format": "binary"}
+
+
+@router.post(
+    "/upload",
+    response_model=IngestionResult,
+    status_code=status.HTTP_202_ACCEPTED,
+    openapi_extra=_form_schema(
+        {"file": _FILE, "town": _TEXT, "archive_name": _TEXT, "replace_document_id": _TEXT},
+        required=["file"],
+    ),
+)
 async def upload_document(
-    file: UploadFile = File(...),
-    town: str = Form(None),
-    archive_name: str = Form(None),
+    request: Request,
     user: AuthUser = Depends(require_admin),
 ):
-    """Upload a PDF, TXT, or DOCX file into the knowledge base."""
-    suffix = os.path.splitext(file.filename)[1].lower()
-    if suffix not in ALLOWED_EXTENSIONS:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Unsupported file type: {suffix}. Allowed: {ALLOWED_EXTENSIONS}"
-        )
-
-    if town and town not in ALLOWED_TOWNS:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Unknown town: {town}. Allowed: {ALLOWED_TOWNS}"
-        )
+    """Upload a PDF, TXT, or DOCX file into the knowledge base (background run).
 
-    # Write upload to temp file
-    with tempfile.NamedTemporaryFile(
-        suffix=suffix,
-        delete=False
-    ) as tmp:
-        content = await file.read()
-        tmp.write(content)
-        tmp_path = tmp.name
+    Form fields: file, and optionally town, archive_name and
+    replace_document_id. The file is a new document unless
+    replace_document_id names the document it is a new version of.
+    The body is streamed to disk once, after the admin check
+    (app/core/uploads.py).
+    """
+    max_bytes = get_settings().ingest_max_upload_mb << 20
+    form = await receive_form(request, "file", max_bytes, ALLOWED_EXTENSIONS, directory=_upload_dir())
+    town = form.fields.get("town") or None
+    archive_name = form.fields.get("archive_name") or None
+    replace_document_id = form.fields.get("replace_document_id") or None
 
+    # The file belongs to the run once queued; the worker removes it after the run
     try:
-        result = load_document(
-            source=tmp_path,
-            town=town,
-            archive_name=archive_name or "Manual Upload",
-            loaded_by=user.id,
+        if form.file is None:
+            raise HTTPException(status_code=400, detail="No file uploaded")
+        if town and town not in ALLOWED_TOWNS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unknown town: {town}. Allowed: {ALLOWED_TOWNS}"
+            )
+        file = form.file
+        run = await asyncio.to_thread(
+            ingest_jobs.submit_run,
+            f"upload:{file.filename}",
+            "load",
+            {
+                "source": file.path,
+                "town": town,
+                "archive_name": archive_name or "Manual Upload",
+                "loaded_by": user.id,
+                "label": file.filename,
+                "file_checksum": file.checksum,
+                "replace_document_id": replace_document_id,
+            },
+            created_by=user.id,
+            upload=file.path,
         )
-    finally:
-        os.unlink(tmp_path)
+    except Exception:
+        form.discard()
+        raise
+    logger.info("upload_queued", filename=file.filename, run_id=run.run_id)
+    return run
 
-    logger.info("upload_complete", filename=file.filename, result=result)
-    return result
 
-
-@router.post("/url")
+@router.post("/url", response_model=IngestionResult, status_code=status.HTTP_202_ACCEPTED)
 async def ingest_url(
     url: str = Form(...),
     town: str = Form(None),
     archive_name: str = Form(None),
     user: AuthUser = Depends(require_admin),
 ):
-    """Ingest content from a URL into the knowledge base."""
+    """Ingest content from a URL into the knowledge base (background run)."""
     if not url.startswith("http"):
         raise HTTPException(status_code=400, detail="Invalid URL")
 
-    result = load_document(
-        source=url,
-        town=town,
-        archive_name=archive_name or "Web",
-        loaded_by=user.id,
+    run = await asyncio.to_thread(
+        ingest_jobs.submit_run,
+        f"url:{url}",
+        "load",
+        {"source": url, "town": town, "archive_name": archive_name or "Web", "loaded_by": user.id},
+        created_by=user.id,
     )
-    logger.info("url_ingest_complete", url=url, result=result)
-    return result
+    logger.info("url_ingest_queued", url=url, run_id=run.run_id)
+    return run
+
+
+def _zip_members(zf: zipfile.ZipFile, max_bytes: int) -> tuple[dict[str, zipfile.ZipInfo], list[str]]:
+    """Ingestible members of a batch zip, plus problems with the others.
+
+    Directories, dotfiles and macOS resource forks are ignored. Sizes and
+    compression ratios are checked from the central directory here, and
+    enforced again while extracting. An archive that expands past the
+    batch limit is rejected outright.
+    """
+    settings = get_settings()
+    members, problems = {}, []
+    total = 0
+    for info in zf.infolist():
+        name = info.filename
+        base = os.path.basename(name)
+        if info.is_dir() or name == ZIP_MANIFEST_NAME:
+            continue
+        if name.startswith("__MACOSX/") or base.startswith("."):
+            continue
+        suffix = os.path.splitext(name)[1].lower()
+        if suffix not in ALLOWED_EXTENSIONS:
+            problems.append(f"{name}: unsupported file type {suffix or '(none)'}")
+            continue
+        if info.file_size > max_bytes:
+            problems.append(f"{name}: larger than {max_bytes >> 20} MB")
+            continue
+        if info.compress_size and info.file_size / info.compress_size > ZIP_MAX_RATIO:
+            problems.append(f"{name}: suspicious compression ratio")
+            continue
+        total += info.file_size
+        members[name] = info
+    if total > settings.ingest_batch_max_unzipped_mb << 20:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Archive expands past {settings.ingest_batch_max_unzipped_mb} MB",
+        )
+    return members, problems
+
+
+def _parse_manifest(raw: str | bytes) -> BatchManifest:
+    """Accept either {"items": [...]} or a bare list of items."""
+    try:
+        data = json.loads(raw)
+        if isinstance(data, list):
+            data = {"items": data}
+        return BatchManifest.model_validate(data)
+    except (ValueError, ValidationError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid manifest: {e}")
+
+
+def _validate_batch(
+    items: list[BatchItem],
+    members: dict[str, zipfile.ZipInfo],
+    town: str | None,
+    archive_name: str | None,
+) -> tuple[list[BatchItem], list[str]]:
+    """Fill defaults into manifest items and check each one."""
+    resolved, problems = [], []
+    for n, item in enumerate(items):
+        item = item.model_copy(update={
+            "town": item.town or town,
+            "archive_name": item.archive_name or archive_name,
+        })
+        label = item.url or item.path or f"item {n}"
+        if bool(item.url) == bool(item.path):
+            problems.append(f"{label}: give exactly one of url or path")
+        elif item.url and not item.url.startswith("http"):
+            problems.append(f"{label}: invalid URL")
+        elif item.path and item.path not in members:
+            problems.append(f"{label}: not found in the uploaded zip (or not ingestible)")
+        if item.town and item.town not in ALLOWED_TOWNS:
+            problems.append(f"{label}: unknown town {item.town}. Allowed: {ALLOWED_TOWNS}")
+        resolved.append(item)
+    return resolved, problems
 
 
-@router.post("/scrape/{town}")
+@router.post(
+    "/batch",
+    response_model=IngestionResult,
+    status_code=status.HTTP_202_ACCEPTED,
+    openapi_extra=_form_schema(
+        {"archive": _FILE, "manifest": _TEXT, "town": _TEXT, "archive_name": _TEXT},
+    ),
+)
+async def ingest_batch(
+    request: Request,
+    user: AuthUser = Depends(require_admin),
+):
+    """Ingest many documents as one background run.
+
+    Send a zip of PDF/TXT/DOCX files (form field archive), a JSON
+    manifest, or both. Manifest items name a `url` or a `path` inside the
+    zip, with optional per-item town, archive_name and title; the form's
+    town/archive_name are the defaults. Without a manifest (form field or
+    manifest.json in the zip), every ingestible file in the zip is loaded.
+    """
+    settings = get_settings()
+    max_bytes = settings.ingest_max_upload_mb << 20
+    form = await receive_form(request, "archive", max_bytes, {".zip"}, directory=_upload_dir())
+    archive = form.file
+    manifest = form.fields.get("manifest") or None
+    town = form.fields.get("town") or None
+    archive_name = form.fields.get("archive_name") or None
+    zip_path, members = (archive.path if archive else None), {}
+
+    try:
+        if archive is None and not manifest:
+            raise HTTPException(status_code=400, detail="Send a zip archive, a manifest, or both")
+        if town and town not in ALLOWED_TOWNS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unknown town: {town}. Allowed: {ALLOWED_TOWNS}"
+            )
+        parsed = _parse_manifest(manifest) if manifest else None
+        if zip_path:
+            try:
+                with zipfile.ZipFile(zip_path) as zf:
+                    members, problems = _zip_members(zf, max_bytes)
+                    if parsed is None and ZIP_MANIFEST_NAME in zf.namelist():
+                        parsed = _parse_manifest(zf.read(ZIP_MANIFEST_NAME))
+            except zipfile.BadZipFile:
+                raise HTTPException(status_code=400, detail="Archive is not a valid zip file")
+            if problems and parsed is None:
+                raise HTTPException(status_code=400, detail=problems[:20])
+        items = parsed.items if parsed else [BatchItem(path=name) for name in members]
+
+        if not items:
+            raise HTTPException(status_code=400, detail="Nothing to ingest")
+        if len(items) > settings.ingest_batch_max_items:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Too many items ({len(items)}). Limit: {settings.ingest_batch_max_items}"
+            )
+        items, problems = _validate_batch(items, members, town, archive_name)
+        if problems:
+            raise HTTPException(status_code=400, detail=problems[:20])
+
+        run = await asyncio.to_thread(
+            ingest_jobs.submit_run,
+            f"batch:{archive.filename if archive else 'manifest'} ({len(items)} items)",
+            "batch",
+            {
+                "items": [item.model_dump(mode="json") for item in items],
+                "loaded_by": user.id,
+                "zip_path": zip_path,
+            },
+            created_by=user.id,
+            upload=zip_path,
+        )
+    except Exception:
+        form.discard()
+        raise
+    logger.info("batch_ingest_queued", items=len(items), run_id=run.run_id)
+    return run
+
+
+@router.post("/scrape/{town}", response_model=IngestionResult, status_code=status.HTTP_202_ACCEPTED)
 async def scrape_town_endpoint(
     town: str,
     user: AuthUser = Depends(require_admin),
 ):
-    """Scrape all known sources for a specific town."""
+    """Scrape all known sources for a specific town (background run)."""
     if town not in ALLOWED_TOWNS:
         raise HTTPException(
             status_code=400,
             detail=f"Unknown town: {town}. Allowed: {ALLOWED_TOWNS}"
         )
 
-    result = scrape_town(town, loaded_by=user.id)
-    logger.info("town_scrape_complete", town=town, result=result)
-    return result
+    run = await asyncio.to_thread(
+        ingest_jobs.submit_run,
+        f"scrape:{town}",
+        "scrape",
+        {"town": town, "loaded_by": user.id},
+        created_by=user.id,
+    )
+    logger.info("town_scrape_queued", town=town, run_id=run.run_id)
+    return run
 
 
-@router.post("/scrape-all")
+@router.post("/scrape-all", response_model=IngestionResult, status_code=status.HTTP_202_ACCEPTED)
 async def scrape_all_endpoint(
     user: AuthUser = Depends(require_admin),
 ):
-    """Scrape all four Maine towns."""
-    result = scrape_all_towns(loaded_by=user.id)
-    logger.info("all_towns_scraped", result=result)
-    return result
+    """Scrape all four Maine towns (background run)."""
+    run = await asyncio.to_thread(
+        ingest_jobs.submit_run,
+        "scrape-all",
+        "scrape_all",
+        {"loaded_by": user.id},
+        created_by=user.id,
+    )
+    logger.info("all_towns_scrape_queued", run_id=run.run_id)
+    return run
+
+
+def _get_run_or_404(run_id: str) -> IngestionResult:
+    try:
+        uuid.UUID(run_id)
+    except ValueError:
+        raise HTTPException(status_code=404, detail="Run not found")
+    run = ingest_jobs.get_run(run_id)
+    if run is None:
+        raise HTTPException(status_code=404, detail="Run not found")
+    return run
+
+
+@router.get("/runs/{run_id}", response_model=IngestionResult)
+async def get_run(
+    run_id: str,
+    user: AuthUser = Depends(require_admin),
+):
+    """Current status and progress counters of an ingestion run."""
+    return await asyncio.to_thread(_get_run_or_404, run_id)
+
+
+@router.get("/runs/{run_id}/events")
+async def stream_run(
+    run_id: str,
+    user: AuthUser = Depends(require_admin),
+):
+    """Server-Sent Events stream of run progress; closes when the run ends."""
+    run = await asyncio.to_thread(_get_run_or_404, run_id)
+    interval = get_settings().ingest_poll_interval
+
+    async def events():
+        current, last = run, None
+        while True:
+            payload = current.model_dump_json()
+            if payload != last:
+                yield f"event: progress\ndata: {payload}\n\n"
+                last = payload
+            if current.status in ingest_jobs.TERMINAL_STATUSES:
+                yield f"event: done\ndata: {json.dumps({'status': current.status.value})}\n\n"
+                return
+            await asyncio.sleep(interval)
+            current = await asyncio.to_thread(ingest_jobs.get_run, run_id) or current
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @router.get("/sources")
@@ -1,93 +1,216 @@
 """
 Astoria v2 — Source document endpoints.
 
-Browse ingested documents and their provenance.
+Browse ingested documents and their provenance. A document's detail
+is its metadata and first page of chunks; further chunks (optionally
+as snippets around a search term) and the raw text are paged on demand.
 """
 
+import re
+
 from fastapi import APIRouter, Depends, Query, HTTPException
 from app.middleware.auth import AuthUser, get_current_user
-from app.models.schemas import DocumentMeta
+from app.models.schemas import (
+    ArchiveFacet, ChunkPage, ChunkSummary, DocumentMeta, RawSlice, Snippet, SourceDetail, SourcePage,
+)
+from app.core.pagination import apply_keyset, decode_cursor, page_of
 from app.core.supabase import get_supabase_admin
 
 router = APIRouter(prefix="/sources", tags=["sources"])
 
+RAW_SLICE = 65536           # default characters per /raw request
+MAX_RAW_SLICE = 1048576
+SNIPPET_WIDTH = 80          # characters of context on each side of a match
+MAX_SNIPPETS = 3            # per chunk
+
 
-@router.get("", response_model=list[DocumentMeta])
+@router.get("", response_model=SourcePage)
 async def list_sources(
     archive: str | None = Query(None, description="Filter by archive name"),
+    include_facets: bool = Query(False, description="Also return document/chunk totals per archive"),
     limit: int = Query(50, ge=1, le=200),
-    offset: int = Query(0, ge=0),
+    cursor: str | None = Query(None, description="next_cursor of the previous page"),
     user: AuthUser = Depends(get_current_user),
 ):
-    """List all ingested source documents."""
+    """List ingested source documents, newest first.
+
+    chunk_count is a column kept up to date by triggers (migration 018),
+    so a page is one query on the (ingested_at, id) keyset index.
+    """
     supabase = get_supabase_admin()
 
     query_builder = (
         supabase.table("documents")
-        .select("id, title, source_url, archive_name, ingested_at, checksum")
-        .order("ingested_at", desc=True)
-        .range(offset, offset + limit - 1)
+        .select("id, title, source_url, archive_name, ingested_at, checksum, chunk_count")
     )
 
     if archive:
         query_builder = query_builder.eq("archive_name", archive)
 
-    result = query_builder.execute()
-
-    sources = []
-    for doc in (result.data or []):
-        # Get chunk count for this document
-        chunk_result = (
-            supabase.table("document_chunks")
-            .select("id", count="exact")
-            .eq("document_id", doc["id"])
-            .execute()
-        )
-        chunk_count = chunk_result.count if chunk_result.count is not None else 0
-
-        sources.append(DocumentMeta(
-            id=doc["id"],
-            title=doc["title"],
-            source_url=doc.get("source_url"),
-            archive_name=doc.get("archive_name"),
-            ingested_at=doc["ingested_at"],
-            chunk_count=chunk_count,
-            checksum=doc["checksum"],
+    query_builder = apply_keyset(query_builder, "ingested_at", decode_cursor(cursor), desc=True)
+    result = query_builder.limit(limit + 1).execute()
+    rows, next_cursor = page_of(result.data or [], limit, "ingested_at")
+
+    archives = None
+    if include_facets:
+        facets = supabase.rpc("archive_facets", {}).execute()
+        archives = [ArchiveFacet(**f) for f in (facets.data or [])]
+
+    return SourcePage(
+        items=[
+            DocumentMeta(
+                id=doc["id"],
+                title=doc["title"],
+                source_url=doc.get("source_url"),
+                archive_name=doc.get("archive_name"),
+                ingested_at=doc["ingested_at"],
+                chunk_count=doc.get("chunk_count") or 0,
+                checksum=doc["checksum"],
+            )
+            for doc in rows
+        ],
+        next_cursor=next_cursor,
+        archives=archives,
+    )
+
+
+def _snippets(content: str, term: str, width: int = SNIPPET_WIDTH) -> list[Snippet]:
+    """Excerpts of content around the case-insensitive matches of term.
+
+    Matches closer than `width` characters share one excerpt; at most
+    MAX_SNIPPETS excerpts per chunk.
+    """
+    spans = [m.span() for m in re.finditer(re.escape(term), content, re.IGNORECASE)]
+    windows: list[list] = []    # [start, end, matches]
+    for start, end in spans:
+        if windows and start - width <= windows[-1][1]:
+            windows[-1][1] = min(len(content), end + width)
+            windows[-1][2].append((start, end))
+        elif len(windows) < MAX_SNIPPETS:
+            windows.append([max(0, start - width), min(len(content), end + width), [(start, end)]])
+    snippets = []
+    for start, end, matches in windows:
+        prefix = "…" if start > 0 else ""
+        suffix = "…" if end < len(content) else ""
+        shift = len(prefix) - start
+        snippets.append(Snippet(
+            text=prefix + content[start:end] + suffix,
+            highlights=[(s + shift, e + shift) for s, e in matches],
         ))
+    return snippets
 
-    return sources
+
+def _chunk_page(supabase, document_id: str, limit: int, cursor: str | None = None,
+                q: str | None = None) -> ChunkPage:
+    """One page of a document's chunks, by the (document_id, chunk_index) key."""
+    query_builder = (
+        supabase.table("document_chunks")
+        .select("id, chunk_index, content, metadata, token_count")
+        .eq("document_id", document_id)
+        .order("chunk_index")
+    )
+    after = decode_cursor(cursor)
+    if after:
+        query_builder = query_builder.gt("chunk_index", after[0])
+    if q:
+        term = re.sub(r"([\\%_*])", r"\\\1", q)
+        query_builder = query_builder.ilike("content", f"%{term}%")
+    result = query_builder.limit(limit + 1).execute()
+    rows, next_cursor = page_of(result.data or [], limit, "chunk_index")
+
+    return ChunkPage(
+        items=[
+            ChunkSummary(
+                id=row["id"],
+                chunk_index=row["chunk_index"],
+                content=None if q else row["content"],
+                snippets=_snippets(row["content"], q) if q else None,
+                metadata=row.get("metadata") or {},
+                token_count=row.get("token_count"),
+            )
+            for row in rows
+        ],
+        next_cursor=next_cursor,
+    )
 
 
-@router.get("/{document_id}")
+@router.get("/{document_id}", response_model=SourceDetail)
 async def get_source(
     document_id: str,
+    chunk_limit: int = Query(20, ge=1, le=200, description="Chunks in the first page"),
     user: AuthUser = Depends(get_current_user),
 ):
-    """Get detailed information about a source document, including its chunks."""
+    """Get a source document's metadata and its first page of chunks.
+
+    The raw text and further chunks are fetched on demand from
+    /sources/{id}/raw and /sources/{id}/chunks, so the response size
+    doesn't grow with the document.
+    """
     supabase = get_supabase_admin()
 
-    # Get document
     doc_result = (
         supabase.table("documents")
-        .select("*")
+        .select("id, title, source_url, archive_name, content_type, checksum, metadata, "
+                "ingested_at, updated_at, chunk_count")
         .eq("id", document_id)
-        .single()
+        .limit(1)
         .execute()
     )
 
     if not doc_result.data:
         raise HTTPException(status_code=404, detail="Document not found")
-
-    # Get chunks (without embeddings — they're too large to return)
-    chunks_result = (
-        supabase.table("document_chunks")
-        .select("id, chunk_index, content, metadata, token_count, created_at")
-        .eq("document_id", document_id)
-        .order("chunk_index")
-        .execute()
+    doc = doc_result.data[0]
+
+    chunks = _chunk_page(supabase, document_id, chunk_limit) if doc.get("chunk_count") else ChunkPage(items=[])
+
+    return SourceDetail(
+        id=doc["id"],
+        title=doc["title"],
+        source_url=doc.get("source_url"),
+        archive_name=doc.get("archive_name"),
+        content_type=doc.get("content_type"),
+        checksum=doc["checksum"],
+        metadata=doc.get("metadata") or {},
+        ingested_at=doc["ingested_at"],
+        updated_at=doc.get("updated_at"),
+        chunk_count=doc.get("chunk_count") or 0,
+        chunks=chunks,
     )
 
-    return {
-        **doc_result.data,
-        "chunks": chunks_result.data or [],
-    }
+
+@router.get("/{document_id}/chunks", response_model=ChunkPage)
+async def list_source_chunks(
+    document_id: str,
+    q: str | None = Query(None, min_length=2, max_length=200,
+                          description="Only chunks containing this term, as highlight snippets"),
+    limit: int = Query(20, ge=1, le=200),
+    cursor: str | None = Query(None, description="next_cursor of the previous page"),
+    user: AuthUser = Depends(get_current_user),
+):
+    """A page of a document's chunks in order, or snippets of those matching q."""
+    return _chunk_page(get_supabase_admin(), document_id, limit, cursor, q)
+
+
+@router.get("/{document_id}/raw", response_model=RawSlice)
+async def get_source_raw(
+    document_id: str,
+    offset: int = Query(0, ge=0, description="0-based character offset"),
+    length: int = Query(RAW_SLICE, ge=1, le=MAX_RAW_SLICE, description="Characters to return"),
+    user: AuthUser = Depends(get_current_user),
+):
+    """A slice of the document's raw text, cut in the database (migration 019)."""
+    result = get_supabase_admin().rpc("document_raw_slice", {
+        "doc_id": document_id, "start_at": offset, "slice_length": length,
+    }).execute()
+
+    if not result.data:
+        raise HTTPException(status_code=404, detail="Document not found")
+    row = result.data[0]
+    end = offset + len(row["content"])
+
+    return RawSlice(
+        offset=offset,
+        text=row["content"],
+        total_length=row["total_length"],
+        next_offset=end if end < row["total_length"] else None,
+    )
@@ -36,6 +36,10 @@ class Settings(BaseSettings):
     # --- Embedding ---
     embedding_model: str = "intfloat/e5-large-v2"
     embedding_dimension: int = 1024
+    embedding_cache_dir: str = "data/embedding_cache"  # empty string disables the cache
+    embedding_cache_dtype: str = "float16"             # "float16" | "float32"
+    chunk_target_tokens: int = 400        # passage size in E5 tokens (hard cap 504)
+    chunk_overlap_tokens: int = 50        # sentences repeated between chunks of a paragraph
 
     # --- CORS ---
     cors_origins: list[str] = ["http://localhost:5173", "http://localhost:3000"]
@@ -44,6 +48,43 @@ class Settings(BaseSettings):
     database_url: str = ""
     db_schema: str = "public"
 
+    # --- Ingestion ---
+    ingest_workers: int = 1               # runs executed at once per ingestion worker process
+    ingest_claim_interval_s: float = 2.0  # idle worker threads look for pending runs this often
+    ingest_upload_dir: str = "data/ingest_uploads"  # uploads handed to the worker; shared by both processes
+    ingest_poll_interval: float = 1.0     # seconds between SSE progress polls
+    ingest_embed_batch_size: int = 32     # chunks per embedding call
+    ingest_insert_batch_size: int = 64    # chunk rows per insert request
+    ingest_queue_batches: int = 4         # embedded batches buffered ahead of the writer
+    ingest_spool_bytes: int = 8 << 20     # parsed text kept in RAM before spilling to disk
+    ingest_content_piece_chars: int = 1 << 20  # raw_content characters per append
+    ingest_max_upload_mb: int = 512       # larger uploads are rejected with 413
+    ingest_batch_workers: int = 4         # documents loaded concurrently within a batch run
+    ingest_batch_max_items: int = 500     # items per /ingest/batch request
+    ingest_batch_max_unzipped_mb: int = 2048  # total uncompressed size of a batch zip
+    ingest_heartbeat_s: int = 60          # active runs touch updated_at this often
+    ingest_stale_run_minutes: int = 10    # running runs idle this long are failed at worker startup
+
+    # --- Near-duplicate detection ---
+    near_duplicate_action: str = "merge"  # "merge" (skip, note alias) | "flag" (store, mark) | "off"
+    near_duplicate_threshold: float = 0.85  # estimated Jaccard similarity
+    minhash_num_perm: int = 128
+    minhash_bands: int = 16               # LSH bands; num_perm must divide evenly
+
+    # --- Entity tagging ---
+    entity_tagging: bool = True           # tag chunks with the vessels/people they mention
+    entity_tag_refresh_s: int = 3600      # reload name lists after this many seconds
+
+    # --- PDF extraction ---
+    pdf_workers: int = 0                  # PDF extraction processes (0 = one per CPU)
+    pdf_pages_per_task: int = 16          # pages per extraction task
+    pdf_parallel_min_pages: int = 32      # smaller PDFs are read in-process
+
+    # --- Web scraping ---
+    scrape_per_host_limit: int = 2        # concurrent requests per host
+    scrape_timeout: float = 30.0          # seconds per request
+    scrape_user_agent: str = "Astoria/2.0 (Maine maritime history research)"
+
     # --- Rate Limiting ---
     rate_limit_per_minute: int = 30
 
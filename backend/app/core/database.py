@@ -0,0 +1,30 @@
+"""
+Astoria v2 — Direct Postgres connections.
+
+For work PostgREST can't do well: running generated SQL (NL2SQL) and
+streaming large result sets with a server-side cursor (exports).
+Uses DATABASE_URL when set, otherwise the direct connection to the
+Supabase project's database.
+"""
+
+import psycopg
+
+from app.core.config import get_settings
+
+
+def conninfo() -> str:
+    """Postgres connection string for the configured project."""
+    settings = get_settings()
+    if settings.database_url:
+        return settings.database_url
+    # Fallback: build direct connection from Supabase URL
+    project_ref = settings.supabase_url.replace("https://", "").replace(".supabase.co", "")
+    return (
+        f"postgresql://postgres:{settings.supabase_service_role_key}"
+        f"@db.{project_ref}.supabase.co:5432/postgres"
+    )
+
+
+def connect(**kwargs) -> psycopg.Connection:
+    """New connection (use as a context manager); kwargs go to psycopg.connect."""
+    return psycopg.connect(conninfo(), **kwargs)
@@ -0,0 +1,72 @@
+"""
+Astoria v2 — Keyset pagination helpers.
+
+List endpoints page with an opaque cursor instead of OFFSET: the cursor
+holds the sort key of the last row returned, and the next page is the
+rows after it in (key, id) order. With an index on (key, id) every page
+is one index range scan, however deep the client scrolls, and rows
+inserted meanwhile don't shift later pages.
+
+    query = apply_keyset(query, "name_key", decode_cursor(cursor))
+    rows = query.limit(limit + 1).execute().data
+    rows, next_cursor = page_of(rows, limit, "name_key")
+"""
+
+import base64
+import json
+
+from fastapi import HTTPException
+
+
+def encode_cursor(key, row_id: str) -> str:
+    """Opaque cursor for the row with this sort key and id."""
+    raw = json.dumps([key, row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str | None) -> tuple | None:
+    """(sort key, id) from a cursor; 400 if it wasn't made by encode_cursor."""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        key, row_id = json.loads(raw)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(row_id, str):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return key, row_id
+
+
+def quote(value) -> str:
+    """A value quoted for a PostgREST logic filter (or=...)."""
+    text = str(value).replace("\\", "\\\\").replace('"', '\\"')
+    return f'"{text}"'
+
+
+def apply_keyset(query, key_column: str, after: tuple | None, desc: bool = False):
+    """Order query by (key_column, id) and keep the rows after `after`.
+
+    The redundant key_column >= key bound is what lets the planner start
+    the index scan at the cursor; the or= filter alone would be applied
+    row by row from the start of the index.
+    """
+    query = query.order(key_column, desc=desc).order("id", desc=desc)
+    if after is None:
+        return query
+    key, row_id = after
+    op = "lt" if desc else "gt"
+    query = query.lte(key_column, key) if desc else query.gte(key_column, key)
+    return query.or_(f"{key_column}.{op}.{quote(key)},"
+                     f"and({key_column}.eq.{quote(key)},id.{op}.{quote(row_id)})")
+
+
+def page_of(rows: list[dict], limit: int, key_column: str) -> tuple[list[dict], str | None]:
+    """First `limit` rows, and the cursor for the next page if there is one.
+
+    Fetch limit + 1 rows: the extra row only says whether a next page exists.
+    """
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(rows[-1][key_column], rows[-1]["id"])
@@ -0,0 +1,214 @@
+"""
+Astoria v2 — Streaming multipart uploads.
+
+Declaring UploadFile/Form parameters makes FastAPI receive and spool
+the whole body before the endpoint (or its auth dependency) runs, so a
+size limit can only be enforced after the fact, and the endpoint then
+copies the spooled file a second time. receive_form() reads the body
+from request.stream() instead:
+
+  - a Content-Length over the limit is rejected before any body is read
+  - the file part is written once, straight to a temp file, and hashed
+    on the way; a body that grows past the limit is cut off with 413
+  - parsing, hashing and file writes run in the threadpool, about
+    CHUNK_BYTES at a time, not on the event loop
+
+    form = await receive_form(request, "file", max_bytes, {".pdf", ".txt"})
+    try: ... form.fields["town"], form.file.path, form.file.checksum
+    finally: form.discard()     # unless the temp file was handed on
+"""
+
+import hashlib
+import os
+import tempfile
+from dataclasses import dataclass, field
+from urllib.parse import parse_qsl
+
+from fastapi import HTTPException, Request, status
+from python_multipart.multipart import MultipartParser, parse_options_header
+from starlette.concurrency import run_in_threadpool
+
+CHUNK_BYTES = 1 << 20           # body bytes handed to the parser per threadpool call
+FORM_OVERHEAD = 1 << 20         # allowance for part headers and text fields
+
+
+@dataclass
+class SavedFile:
+    path: str
+    filename: str
+    checksum: str               # SHA-256 of the file bytes
+    size: int
+
+
+@dataclass
+class ReceivedForm:
+    fields: dict[str, str] = field(default_factory=dict)
+    file: SavedFile | None = None
+
+    def discard(self) -> None:
+        """Remove the temp file, if any."""
+        if self.file and os.path.exists(self.file.path):
+            os.unlink(self.file.path)
+
+
+def _too_large(max_bytes: int) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"File too large. Limit: {max_bytes // (1 << 20)} MB",
+    )
+
+
+class _FormSink:
+    """MultipartParser callbacks: text parts into fields, the file part into
+    a temp file. Runs inside run_in_threadpool."""
+
+    def __init__(self, file_field: str, max_bytes: int, suffixes: set[str] | None,
+                 directory: str | None = None):
+        self.file_field = file_field
+        self.max_bytes = max_bytes
+        self.suffixes = suffixes
+        self.directory = directory
+        self.form = ReceivedForm()
+        self._header_field = b""
+        self._header_value = b""
+        self._headers: dict[bytes, bytes] = {}
+        self._name: str | None = None
+        self._value = bytearray()
+        self._out = None
+        self._digest = None
+        self._size = 0
+        self._filename = ""
+        self._skip = False
+
+    def callbacks(self) -> dict:
+        return {
+            "on_part_begin": self._part_begin,
+            "on_header_field": lambda d, s, e: self._add("_header_field", d[s:e]),
+            "on_header_value": lambda d, s, e: self._add("_header_value", d[s:e]),
+            "on_header_end": self._header_end,
+            "on_headers_finished": self._headers_finished,
+            "on_part_data": self._part_data,
+            "on_part_end": self._part_end,
+        }
+
+    def _add(self, attr: str, data: bytes) -> None:
+        setattr(self, attr, getattr(self, attr) + data)
+
+    def _part_begin(self) -> None:
+        self._headers, self._name, self._value, self._skip = {}, None, bytearray(), False
+
+    def _header_end(self) -> None:
+        self._headers[self._header_field.lower()] = self._header_value
+        self._header_field = self._header_value = b""
+
+    def _headers_finished(self) -> None:
+        _, options = parse_options_header(self._headers.get(b"content-disposition", b""))
+        self._name = options.get(b"name", b"").decode("utf-8", "replace")
+        if b"filename" not in options:
+            return
+        if self._name != self.file_field:
+            self._skip = True           # not a file this endpoint takes
+            return
+        if self.form.file is not None or self._out is not None:
+            raise HTTPException(status_code=400, detail=f"Send one '{self.file_field}' file")
+        self._filename = os.path.basename(options[b"filename"].decode("utf-8", "replace"))
+        suffix = os.path.splitext(self._filename)[1].lower()
+        if self.suffixes is not None and suffix not in self.suffixes:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unsupported file type: {suffix or '(none)'}. Allowed: {sorted(self.suffixes)}",
+            )
+        self._out = tempfile.NamedTemporaryFile(suffix=suffix, dir=self.directory, delete=False)
+        self._digest = hashlib.sha256()
+        self._size = 0
+
+    def _part_data(self, data: bytes, start: int, end: int) -> None:
+        if self._skip:
+            return
+        if self._out is None:
+            self._value += data[start:end]
+            if len(self._value) > FORM_OVERHEAD:
+                raise HTTPException(status_code=400, detail=f"Form field '{self._name}' too large")
+            return
+        self._size += end - start
+        if self._size > self.max_bytes:
+            raise _too_large(self.max_bytes)
+        chunk = data[start:end]
+        self._digest.update(chunk)
+        self._out.write(chunk)
+
+    def _part_end(self) -> None:
+        if self._out is not None:
+            self._out.close()
+            self.form.file = SavedFile(self._out.name, self._filename, self._digest.hexdigest(), self._size)
+            self._out = None
+        elif not self._skip and self._name:
+            self.form.fields[self._name] = self._value.decode("utf-8", "replace")
+
+    def abort(self) -> None:
+        if self._out is not None:
+            self._out.close()
+            os.unlink(self._out.name)
+            self._out = None
+        self.form.discard()
+
+
+async def receive_form(
+    request: Request,
+    file_field: str,
+    max_bytes: int,
+    suffixes: set[str] | None = None,
+    directory: str | None = None,
+) -> ReceivedForm:
+    """Read a multipart/form-data body: text fields, plus at most one file
+    in `file_field` (with a suffix in `suffixes`, when given), written to
+    a temp file in `directory` (the system temp dir by default). A
+    urlencoded body (text fields only) is accepted too.
+
+    Raises 413 once the body passes max_bytes (plus FORM_OVERHEAD for the
+    other fields), and 400 for a malformed form. On error nothing is left
+    on disk.
+    """
+    content_type, options = parse_options_header(request.headers.get("content-type", ""))
+    if content_type == b"application/x-www-form-urlencoded":
+        return await _receive_urlencoded(request)
+    if content_type != b"multipart/form-data" or b"boundary" not in options:
+        raise HTTPException(status_code=400, detail="Expected a multipart/form-data body")
+
+    limit = max_bytes + FORM_OVERHEAD
+    declared = request.headers.get("content-length")
+    if declared and declared.isdigit() and int(declared) > limit:
+        raise _too_large(max_bytes)
+
+    sink = _FormSink(file_field, max_bytes, suffixes, directory)
+    parser = MultipartParser(options[b"boundary"], sink.callbacks())
+    received = 0
+    pending = bytearray()
+    try:
+        async for chunk in request.stream():
+            received += len(chunk)
+            if received > limit:
+                raise _too_large(max_bytes)
+            pending += chunk
+            if len(pending) >= CHUNK_BYTES:
+                await run_in_threadpool(parser.write, bytes(pending))
+                pending.clear()
+        if pending:
+            await run_in_threadpool(parser.write, bytes(pending))
+        parser.finalize()
+    except HTTPException:
+        await run_in_threadpool(sink.abort)
+        raise
+    except Exception as e:
+        await run_in_threadpool(sink.abort)
+        raise HTTPException(status_code=400, detail=f"Malformed form data: {e}")
+    return sink.form
+
+
+async def _receive_urlencoded(request: Request) -> ReceivedForm:
+    body = bytearray()
+    async for chunk in request.stream():
+        body += chunk
+        if len(body) > FORM_OVERHEAD:
+            raise HTTPException(status_code=400, detail="Form too large")
+    return ReceivedForm(fields=dict(parse_qsl(body.decode("utf-8", "replace"), keep_blank_values=True)))
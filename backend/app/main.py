@@ -10,8 +10,8 @@ from fastapi.middleware.cors import CORSMiddleware
 
 from app.core.config import get_settings
 from app.core.logging import setup_logging, get_logger
-from app.api import health, query, explore, sources, ingest
-from app.services import embedding
+from app.api import health, query, explore, sources, ingest, export
+from app.services import document_parser, embedding
 
 
 @asynccontextmanager
@@ -33,6 +33,7 @@ async def lifespan(app: FastAPI):
     yield
 
     logger.info("shutting_down_astoria")
+    document_parser.shutdown_pdf_pool()
 
 
 def create_app() -> FastAPI:
@@ -71,6 +72,7 @@ def create_app() -> FastAPI:
     app.include_router(explore.router, prefix="/api")
     app.include_router(sources.router, prefix="/api")
     app.include_router(ingest.router, prefix="/api")
+    app.include_router(export.router, prefix="/api")
 
     return app
 
@@ -60,17 +60,67 @@ class ShipSummary(BaseModel):
     name: str
     type: str | None = None
     year_built: int | None = None
-    port_of_registry: str | None = None
+    hailing_port: str | None = None
+    tonnage: float | None = None
+
+
+class ShipPage(BaseModel):
+    """One page of ships; pass next_cursor back as ?cursor= for the next."""
+    items: list[ShipSummary]
+    next_cursor: str | None = None
+    total_estimate: int | None = Field(default=None, description="Planner estimate of matching ships")
 
 
 class VoyageSummary(BaseModel):
-    """Brief voyage record."""
+    """One voyage leg, reconstructed from a vessel event."""
     id: str
+    document_id: str
     ship_name: str
     departure_port: str | None = None
     arrival_port: str | None = None
-    departure_date: str | None = None
-    arrival_date: str | None = None
+    arrival_date: str | None = Field(default=None, description="Date of the enrollment at arrival_port")
+    master: str | None = None
+    event_type: str | None = None
+    inferred: bool = Field(default=False, description="Departure port taken from the vessel's previous event")
+
+
+class VoyageRoute(BaseModel):
+    """Leg count for one departure -> arrival route."""
+    departure_port: str
+    arrival_port: str
+    legs: int
+    first_date: str | None = None
+    last_date: str | None = None
+
+
+class VoyagePage(BaseModel):
+    """One page of voyage legs; pass next_cursor back as ?cursor= for the next."""
+    items: list[VoyageSummary]
+    next_cursor: str | None = None
+    total_estimate: int | None = Field(default=None, description="Planner estimate of matching legs")
+    routes: list[VoyageRoute] | None = Field(default=None, description="Busiest routes (include_routes=true)")
+
+
+class StatsRow(BaseModel):
+    """One maritime_stats cell; dimensions not in group_by are null."""
+    decade: int | None = None
+    vessel_type: str | None = None
+    place_built: str | None = None
+    hailing_port: str | None = None
+    builder: str | None = None
+    event_type: str | None = None
+    port: str | None = None
+    vessels: int | None = None
+    events: int | None = None
+    tonnage_total: float | None = None
+    tonnage_avg: float | None = None
+
+
+class StatsResponse(BaseModel):
+    """Rollups of vessels or vessel events grouped by group_by."""
+    kind: str
+    group_by: list[str]
+    rows: list[StatsRow]
 
 
 # --- Source Documents ---
@@ -86,6 +136,58 @@ class DocumentMeta(BaseModel):
     checksum: str
 
 
+class ArchiveFacet(BaseModel):
+    """Document and chunk totals for one archive."""
+    archive_name: str | None = None
+    documents: int
+    chunks: int
+
+
+class Snippet(BaseModel):
+    """Excerpt of a chunk around matches of a search term."""
+    text: str
+    highlights: list[tuple[int, int]] = Field(description="[start, end) offsets of the matches in text")
+
+
+class ChunkSummary(BaseModel):
+    """One chunk of a document: its content, or snippets when searching."""
+    id: str
+    chunk_index: int
+    content: str | None = None
+    snippets: list[Snippet] | None = None
+    metadata: dict = {}
+    token_count: int | None = None
+
+
+class ChunkPage(BaseModel):
+    """One page of chunks in chunk_index order."""
+    items: list[ChunkSummary]
+    next_cursor: str | None = None
+
+
+class RawSlice(BaseModel):
+    """A slice of a document's raw text."""
+    offset: int
+    text: str
+    total_length: int
+    next_offset: int | None = None
+
+
+class SourceDetail(DocumentMeta):
+    """Source document metadata and its first page of chunks (no raw text)."""
+    content_type: str | None = None
+    metadata: dict = {}
+    updated_at: datetime | None = None
+    chunks: ChunkPage
+
+
+class SourcePage(BaseModel):
+    """One page of source documents; pass next_cursor back as ?cursor= for the next."""
+    items: list[DocumentMeta]
+    next_cursor: str | None = None
+    archives: list[ArchiveFacet] | None = Field(default=None, description="Archive facet (include_facets=true)")
+
+
 # --- Ingestion ---
 
 class IngestionTrigger(BaseModel):
@@ -94,6 +196,22 @@ class IngestionTrigger(BaseModel):
     force_reindex: bool = Field(default=False, description="Re-embed even if content unchanged")
 
 
+class BatchItem(BaseModel):
+    """One entry of a batch ingestion manifest: a URL or a file in the uploaded zip."""
+    url: str | None = None
+    path: str | None = Field(default=None, description="Member path inside the uploaded zip")
+    town: str | None = None
+    archive_name: str | None = None
+    title: str | None = None
+    replace_document_id: str | None = Field(
+        default=None, description="Existing document this item is a new version of")
+
+
+class BatchManifest(BaseModel):
+    """Manifest for POST /ingest/batch."""
+    items: list[BatchItem]
+
+
 class IngestionResult(BaseModel):
     """Result of an ingestion run."""
     run_id: str
@@ -101,7 +219,9 @@ class IngestionResult(BaseModel):
     status: IngestionStatus
     documents_processed: int = 0
     chunks_created: int = 0
+    duplicates: int = 0
     errors: list[str] = []
+    result: dict | None = Field(default=None, description="Final loader/scraper payload")
     started_at: datetime
     completed_at: datetime | None = None
 
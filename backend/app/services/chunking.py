@@ -0,0 +1,261 @@
+"""
+# File: backend/app/services/chunking.py
+# Astoria v2 — Passage chunker.
+# The one chunker used by the loader and scripts/seed_embeddings.py.
+# Splits streamed text into sentences, paragraphs and register entries,
+# then packs them into passages sized in tokenizer tokens so nothing is
+# truncated by E5's 512-token input limit. Single pass, linear time and
+# deterministic, so identical text always yields identical chunks (and
+# chunk hashes, which versioned re-ingestion relies on).
+# All config sourced from app.core.config (get_settings).
+"""
+
+import re
+from functools import lru_cache
+from typing import Iterable, Iterator, NamedTuple
+
+import structlog
+
+logger = structlog.get_logger()
+
+E5_MAX_TOKENS = 512
+RESERVED_TOKENS = 8             # [CLS], [SEP] and the "passage: " prefix, with margin
+DEFAULT_TARGET_TOKENS = 400
+DEFAULT_OVERLAP_TOKENS = 50
+
+_MAX_LINE_CHARS = 1 << 16       # longer lines are cut at whitespace while streaming
+_MAX_BLOCK_CHARS = 1 << 15      # paragraphs longer than this are split eagerly
+_WORD_CACHE_MAX = 200_000
+
+# Boundary strength before a unit
+SENTENCE, PARAGRAPH, ENTRY = 0, 1, 2
+
+# Start of a register entry: "12. A. HOOPER, schooner, of ..." (number optional).
+# Same shape as ENTRY_PATTERN in extract_vessels.py.
+ENTRY_START = re.compile(
+    r"\s*(?:\d+\s*[.,]\s+)?"
+    r"[A-Z][A-Z\s.'\-&$]+?\s*,\s*"
+    r"(?:schooner|brig|bark|sloop|ship|gas screw|steamer)\b"
+)
+
+_SENTENCE_END = re.compile(r"[.!?][\"')\]]*\s+")
+_LAST_WORD = re.compile(r"(\S+)$")
+_ABBREVIATIONS = {
+    "no", "ft", "in", "capt", "sig", "let", "mass", "me", "st", "mr", "mrs",
+    "jr", "sr", "dr", "co", "bros", "jan", "feb", "mar", "apr", "aug",
+    "sept", "sep", "oct", "nov", "dec", "vol", "p", "pp", "vs", "etc",
+}
+
+
+class Chunk(NamedTuple):
+    text: str
+    token_count: int
+
+
+# --- Token counting ---
+
+_APPROX_PIECE = re.compile(r"[A-Za-z]+|\d+|[^\w\s]|\w+")
+
+
+def _approx_tokens(word: str) -> int:
+    """Upper-leaning WordPiece estimate used when no tokenizer is available."""
+    return sum(1 + len(p) // 6 for p in _APPROX_PIECE.findall(word))
+
+
+class TokenCounter:
+    """Counts tokens word by word.
+
+    BERT-style (WordPiece) tokenizers such as E5's split on whitespace
+    before anything else, so per-word counts add up to the exact total and
+    can be memoised.
+    """
+
+    def __init__(self, tokenizer=None):
+        self._tokenizer = tokenizer
+        self._cache: dict[str, int] = {}
+
+    @property
+    def exact(self) -> bool:
+        return self._tokenizer is not None
+
+    def word(self, word: str) -> int:
+        n = self._cache.get(word)
+        if n is None:
+            n = len(self._tokenizer.tokenize(word)) if self._tokenizer else _approx_tokens(word)
+            if len(self._cache) < _WORD_CACHE_MAX:
+                self._cache[word] = n
+        return n
+
+    def __call__(self, text: str) -> int:
+        return sum(self.word(w) for w in text.split())
+
+
+@lru_cache()
+def get_token_counter(model_name: str | None = None) -> TokenCounter:
+    """Counter for the embedding model's tokenizer (approximate if unavailable)."""
+    if model_name is None:
+        from app.core.config import get_settings
+        model_name = get_settings().embedding_model
+    try:
+        from transformers import AutoTokenizer
+        return TokenCounter(AutoTokenizer.from_pretrained(model_name))
+    except Exception as e:
+        logger.warning("chunker_tokenizer_unavailable", model=model_name, error=str(e))
+        return TokenCounter()
+
+
+# --- Segmentation ---
+
+def _iter_lines(pieces: Iterable[str]) -> Iterator[tuple[str, bool]]:
+    """(text, ends_line) segments; overlong lines are cut at whitespace."""
+    carry = ""
+    for piece in pieces:
+        *lines, carry = (carry + piece).split("\n")
+        for line in lines:
+            yield line, True
+        if len(carry) > _MAX_LINE_CHARS:
+            cut = carry.rfind(" ") + 1 or len(carry)
+            yield carry[:cut], False
+            carry = carry[cut:]
+    if carry:
+        yield carry, True
+
+
+def _split_sentences(text: str) -> list[str]:
+    sentences, start = [], 0
+    for m in _SENTENCE_END.finditer(text):
+        end = m.end()
+        if end < len(text) and (text[end].islower() or text[end].isdigit()):
+            continue    # "No. 448", "ft. x 21 ft."
+        word = _LAST_WORD.search(text, max(start, m.start() - 24), m.start() + 1)
+        stem = word.group(1).rstrip(".!?\"')]").lower() if word else ""
+        if len(stem) == 1 or stem in _ABBREVIATIONS:
+            continue    # initials and abbreviations: "J. Q. G. M.", "Capt. Libby"
+        sentences.append(text[start:end])
+        start = end
+    sentences.append(text[start:])
+    return sentences
+
+
+def _iter_units(pieces: Iterable[str]) -> Iterator[tuple[str, int]]:
+    """Whitespace-normalised sentences with the boundary strength before each."""
+    block: list[str] = []
+    block_len = 0
+    strength = ENTRY
+
+    def drain(final: bool) -> Iterator[tuple[str, int]]:
+        nonlocal block, block_len, strength
+        sentences = _split_sentences("".join(block))
+        rest = "" if final else sentences.pop()
+        if len(rest) > _MAX_BLOCK_CHARS // 2:
+            sentences.append(rest)   # no sentence end in sight; keep memory bounded
+            rest = ""
+        for sentence in sentences:
+            unit = " ".join(sentence.split())
+            if unit:
+                yield unit, strength
+                strength = SENTENCE
+        block, block_len = ([rest], len(rest)) if rest else ([], 0)
+
+    at_line_start = True
+    for segment, ends_line in _iter_lines(pieces):
+        if at_line_start and not segment.strip():
+            if block:
+                yield from drain(final=True)
+            strength = max(strength, PARAGRAPH)
+        else:
+            if at_line_start and ENTRY_START.match(segment):
+                if block:
+                    yield from drain(final=True)
+                strength = ENTRY
+            text = segment + ("\n" if ends_line else "")
+            block.append(text)
+            block_len += len(text)
+            if block_len > _MAX_BLOCK_CHARS:
+                yield from drain(final=False)
+        at_line_start = ends_line
+    if block:
+        yield from drain(final=True)
+
+
+# --- Packing ---
+
+def _split_long(text: str, size: int, counter: TokenCounter) -> Iterator[Chunk]:
+    """Word windows of at most `size` tokens for a sentence that is too long."""
+    words, tokens = [], 0
+    for word in text.split():
+        n = counter.word(word)
+        if words and tokens + n > size:
+            yield Chunk(" ".join(words), tokens)
+            words, tokens = [], 0
+        words.append(word)
+        tokens += n
+    if words:
+        yield Chunk(" ".join(words), tokens)
+
+
+def iter_chunks(
+    pieces: Iterable[str],
+    target_tokens: int = DEFAULT_TARGET_TOKENS,
+    overlap_tokens: int = DEFAULT_OVERLAP_TOKENS,
+    counter: TokenCounter | None = None,
+) -> Iterator[Chunk]:
+    """Chunk streamed text into passages of about target_tokens tokens.
+
+    - A register entry always starts a new chunk, and no overlap is
+      carried into it, so one vessel's record never bleeds into the next.
+    - A paragraph break ends the chunk once it is half full, which lets
+      boundaries re-synchronise after an edit earlier in the document.
+    - Within a paragraph, the last sentences of a chunk (up to
+      overlap_tokens) are repeated at the start of the next one.
+    - No chunk exceeds E5_MAX_TOKENS - RESERVED_TOKENS; a single longer
+      sentence is cut into word windows.
+    """
+    counter = counter or get_token_counter()
+    limit = E5_MAX_TOKENS - RESERVED_TOKENS
+    target = min(target_tokens, limit)
+
+    current: list[tuple[str, int]] = []
+    size = 0
+
+    def emit() -> Chunk:
+        return Chunk(" ".join(text for text, _ in current), size)
+
+    for text, strength in _iter_units(pieces):
+        n = counter(text)
+        if n > limit:
+            if current:
+                yield emit()
+                current, size = [], 0
+            yield from _split_long(text, target, counter)
+            continue
+
+        if current and (
+            strength == ENTRY
+            or (strength == PARAGRAPH and size >= target // 2)
+            or size + n > target
+        ):
+            yield emit()
+            carry: list[tuple[str, int]] = []
+            if strength == SENTENCE:
+                carried = 0
+                for unit in reversed(current):
+                    if carried + unit[1] > overlap_tokens:
+                        break
+                    carry.insert(0, unit)
+                    carried += unit[1]
+                if carried + n > limit or len(carry) == len(current):
+                    carry, carried = [], 0
+            current, size = carry, sum(t for _, t in carry)
+
+        current.append((text, n))
+        size += n
+
+    if current:
+        yield emit()
+
+
+def chunk_text(text: str, **kwargs) -> list[Chunk]:
+    """All chunks of an in-memory string (see iter_chunks)."""
+    return list(iter_chunks([text], **kwargs))
+# end chunking.py
@@ -2,12 +2,22 @@
 # File: backend/app/services/document_parser.py
 # Astoria v2 — Document parsing service.
 # Handles PDF, DOCX, TXT, and URL content extraction.
+# stream_document() yields text piece by piece (page, paragraph, block)
+# so large files never have to be held in memory as one string.
+# Large PDFs are extracted by page range on a process pool.
 # All config sourced from app.core.config (get_settings).
 """
 
 import hashlib
-import httpx
+import multiprocessing
+import os
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
+from typing import Iterator
+
+import httpx
 from app.core.config import get_settings
 import structlog
 
@@ -19,6 +29,148 @@ def _checksum(text: str) -> str:
     return hashlib.sha256(text.encode()).hexdigest()
 
 
+TXT_BLOCK_CHARS = 1 << 20   # characters per piece when streaming text files
+FILE_BLOCK_BYTES = 1 << 20  # bytes per read when hashing files
+
+
+def file_checksum(path: str) -> str:
+    """SHA-256 of a file's raw bytes, read in blocks."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        while block := f.read(FILE_BLOCK_BYTES):
+            h.update(block)
+    return h.hexdigest()
+
+
+_pdf_pool: ProcessPoolExecutor | None = None
+_pdf_pool_lock = threading.Lock()
+
+
+def _pdf_workers() -> int:
+    return get_settings().pdf_workers or os.cpu_count() or 1
+
+
+def _get_pdf_pool() -> ProcessPoolExecutor:
+    """Lazily create the process-wide PDF extraction pool.
+
+    Uses spawn so workers never inherit the server's threads or model.
+    """
+    global _pdf_pool
+    with _pdf_pool_lock:
+        if _pdf_pool is None:
+            _pdf_pool = ProcessPoolExecutor(
+                max_workers=_pdf_workers(),
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _pdf_pool
+
+
+def shutdown_pdf_pool() -> None:
+    global _pdf_pool
+    with _pdf_pool_lock:
+        if _pdf_pool is not None:
+            _pdf_pool.shutdown(wait=False, cancel_futures=True)
+            _pdf_pool = None
+
+
+def _extract_pages(path: str, start: int, stop: int) -> list[str]:
+    """Text of pages [start, stop) — runs in a pool worker."""
+    import fitz
+    with fitz.open(path) as doc:
+        return [doc[i].get_text() for i in range(start, stop)]
+
+
+def iter_txt(path: str) -> Iterator[str]:
+    """Stream a text file in fixed-size blocks."""
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        while block := f.read(TXT_BLOCK_CHARS):
+            yield block
+
+
+def _iter_pdf_pages(path: str) -> Iterator[str]:
+    """Page texts in order.
+
+    Small PDFs are read in-process. Larger ones are split into page ranges
+    extracted on the PDF pool; at most two ranges per worker are in flight,
+    so memory stays bounded while pages are yielded in order.
+    """
+    import fitz
+    settings = get_settings()
+    with fitz.open(path) as doc:
+        page_count = doc.page_count
+        if page_count < settings.pdf_parallel_min_pages or _pdf_workers() < 2:
+            for page in doc:
+                yield page.get_text()
+            return
+
+    pool = _get_pdf_pool()
+    step = settings.pdf_pages_per_task
+    ranges = iter(range(0, page_count, step))
+    in_flight = deque()
+    for start in ranges:
+        in_flight.append(pool.submit(_extract_pages, path, start, min(start + step, page_count)))
+        if len(in_flight) >= 2 * _pdf_workers():
+            break
+    try:
+        while in_flight:
+            pages = in_flight.popleft().result()
+            start = next(ranges, None)
+            if start is not None:
+                in_flight.append(
+                    pool.submit(_extract_pages, path, start, min(start + step, page_count))
+                )
+            yield from pages
+    finally:
+        for future in in_flight:
+            future.cancel()
+
+
+def iter_pdf(path: str) -> Iterator[str]:
+    """Stream PDF text one page at a time.
+
+    Pieces concatenate to exactly the text parse_pdf() produces
+    (pages joined by newlines), so checksums stay comparable.
+    """
+    for i, text in enumerate(_iter_pdf_pages(path)):
+        yield text if i == 0 else "\n" + text
+
+
+def iter_docx(path: str) -> Iterator[str]:
+    """Stream non-empty Word paragraphs, newline-joined like parse_docx()."""
+    from docx import Document
+    doc = Document(path)
+    first = True
+    for p in doc.paragraphs:
+        if p.text.strip():
+            yield p.text if first else "\n" + p.text
+            first = False
+
+
+def stream_document(source: str, html: str | None = None) -> tuple[dict, Iterator[str]]:
+    """Auto-detect source type and stream its text.
+
+    Returns (info, pieces): info carries title, content_type and
+    source_url; "".join(pieces) equals parse_document(source)["content"].
+    For a URL whose page has already been fetched, pass its body as html.
+    """
+    if source.startswith("http://") or source.startswith("https://"):
+        logger.info("parsing_url", source=source)
+        parsed = parse_html(html, source) if html is not None else parse_url(source)
+        info = {k: parsed[k] for k in ("title", "content_type", "source_url")}
+        return info, iter([parsed["content"]])
+    path = Path(source)
+    suffix = path.suffix.lower()
+    if suffix == ".pdf":
+        logger.info("parsing_pdf", source=source)
+        return {"title": path.name, "content_type": "pdf"}, iter_pdf(source)
+    elif suffix == ".docx":
+        logger.info("parsing_docx", source=source)
+        return {"title": path.name, "content_type": "docx"}, iter_docx(source)
+    else:
+        logger.info("parsing_txt", source=source)
+        return {"title": path.name, "content_type": "text"}, iter_txt(source)
+
+
 def parse_txt(path: str) -> dict:
     """Parse plain text file."""
     content = Path(path).read_text(encoding="utf-8", errors="ignore")
@@ -32,10 +184,7 @@ def parse_txt(path: str) -> dict:
 
 def parse_pdf(path: str) -> dict:
     """Parse PDF file using PyMuPDF."""
-    import fitz
-    doc = fitz.open(path)
-    content = "\n".join(page.get_text() for page in doc)
-    doc.close()
+    content = "\n".join(_iter_pdf_pages(path))
     return {
         "title": Path(path).name,
         "content": content,
@@ -59,10 +208,15 @@ def parse_docx(path: str) -> dict:
 
 def parse_url(url: str) -> dict:
     """Fetch and parse web page content."""
-    from bs4 import BeautifulSoup
     response = httpx.get(url, timeout=30, follow_redirects=True)
     response.raise_for_status()
-    soup = BeautifulSoup(response.text, "html.parser")
+    return parse_html(response.text, url)
+
+
+def parse_html(html: str, url: str) -> dict:
+    """Parse an already-fetched web page (e.g. from the web scraper)."""
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(html, "html.parser")
     for tag in soup(["script", "style", "nav", "footer"]):
         tag.decompose()
     title = soup.title.string if soup.title else url
@@ -3,11 +3,21 @@ Astoria v2 — Embedding service.
 
 Loads Microsoft E5-large-v2 at startup and provides embed_query() / embed_documents()
 for the RAG pipeline. E5 models require "query: " / "passage: " prefixes.
+
+Passage vectors go through the on-disk embedding cache, so text that has
+been embedded before (re-scrapes, re-chunking, retries) costs only I/O.
+PassageBatcher merges passage batches from concurrently loading documents.
 """
 
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
 import structlog
 from sentence_transformers import SentenceTransformer
 from app.core.config import get_settings
+from app.services.embedding_cache import encode_cached, get_passage_cache
 
 logger = structlog.get_logger()
 
@@ -53,11 +63,73 @@ def embed_passages(texts: list[str]) -> list[list[float]]:
     """Embed a batch of document passages.
 
     E5 models expect the prefix "passage: " for documents being indexed.
+    Previously embedded passages are served from the embedding cache.
     Returns a list of 1024-dim float vectors.
     """
     if _model is None:
         raise RuntimeError("Embedding model not loaded. Call load_model() first.")
 
     prefixed = [f"passage: {t}" for t in texts]
-    vectors = _model.encode(prefixed, normalize_embeddings=True, show_progress_bar=True)
+    vectors = encode_cached(
+        prefixed,
+        lambda batch: _model.encode(batch, normalize_embeddings=True, show_progress_bar=True),
+        get_passage_cache(),
+    )
     return vectors.tolist()
+
+
+class PassageBatcher:
+    """Coalesces embed_passages() calls from many threads into shared batches.
+
+    When several documents load at once, each one's batches (and especially
+    its short final batch) are merged into calls of up to batch_size
+    passages. A call waits at most max_wait seconds for company.
+    """
+
+    def __init__(self, batch_size: int, max_wait: float = 0.05):
+        self.batch_size = batch_size
+        self.max_wait = max_wait
+        self._queue: queue.Queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="passage-batcher", daemon=True)
+        self._thread.start()
+
+    def embed(self, texts: list[str]) -> list[list[float]]:
+        """Drop-in replacement for embed_passages()."""
+        future: Future = Future()
+        self._queue.put((texts, future))
+        return future.result()
+
+    def close(self) -> None:
+        self._queue.put(None)
+        self._thread.join()
+
+    def _run(self) -> None:
+        closing = False
+        while not closing:
+            item = self._queue.get()
+            if item is None:
+                return
+            requests = [item]
+            size = len(item[0])
+            deadline = time.monotonic() + self.max_wait
+            while size < self.batch_size:
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is None:
+                    closing = True
+                    break
+                requests.append(item)
+                size += len(item[0])
+
+            try:
+                vectors = embed_passages([t for texts, _ in requests for t in texts])
+            except Exception as e:
+                for _, future in requests:
+                    future.set_exception(e)
+                continue
+            start = 0
+            for texts, future in requests:
+                future.set_result(vectors[start:start + len(texts)])
+                start += len(texts)
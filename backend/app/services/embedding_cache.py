@@ -0,0 +1,213 @@
+"""
+# File: backend/app/services/embedding_cache.py
+# Astoria v2 — Persistent passage-embedding cache.
+# Content-addressed store: (model name, encoded text) -> vector.
+# Keys live in a small SQLite index, vectors in an append-only file
+# that is read back through a numpy memory map.
+# All config sourced from app.core.config (get_settings).
+"""
+
+import hashlib
+import re
+import sqlite3
+import threading
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, Sequence
+
+import numpy as np
+import structlog
+
+from app.core.config import get_settings
+
+logger = structlog.get_logger()
+
+_LOOKUP_BATCH = 500   # SQLite host-parameter limit is 999 on older builds
+
+
+class EmbeddingCache:
+    """On-disk cache of embedding vectors keyed by content hash.
+
+    One directory per model, and one index + vector file per dtype, so
+    changing the storage dtype starts a fresh cache beside the old one.
+    Safe to share between threads and between
+    processes: row allocation and appends happen under SQLite's write lock,
+    and readers only ever see rows whose index entry has been committed.
+    """
+
+    def __init__(self, root: str, model_name: str, dimension: int, dtype: str = "float16"):
+        self.model_name = model_name
+        self.dimension = dimension
+        self.dtype = np.dtype(dtype)
+        self._row_bytes = dimension * self.dtype.itemsize
+
+        slug = re.sub(r"[^A-Za-z0-9_.-]+", "_", model_name)
+        self.path = Path(root) / slug
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._vectors_path = self.path / f"vectors.{self.dtype.name}.bin"
+        self._vectors_path.touch(exist_ok=True)
+
+        self._db = sqlite3.connect(
+            self.path / f"index.{self.dtype.name}.sqlite3",
+            timeout=60,
+            isolation_level=None,
+            check_same_thread=False,
+        )
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS vectors (key TEXT PRIMARY KEY, row INTEGER NOT NULL)"
+        )
+        self._check_layout()
+        self._lock = threading.Lock()
+        self._mmap: np.memmap | None = None
+
+    def _check_layout(self) -> None:
+        """Record dtype and dimension on first use; refuse an index written
+        with a different layout, whose rows would not fit the vector file."""
+        self._db.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        layout = {"dtype": self.dtype.name, "dimension": str(self.dimension)}
+        self._db.executemany("INSERT OR IGNORE INTO meta (name, value) VALUES (?, ?)", layout.items())
+        stored = dict(self._db.execute("SELECT name, value FROM meta").fetchall())
+        if any(stored.get(k) != v for k, v in layout.items()):
+            self._db.close()
+            raise ValueError(
+                f"Embedding cache {self.path} holds {stored.get('dimension')}-d "
+                f"{stored.get('dtype')} vectors, not {self.dimension}-d {self.dtype.name}"
+            )
+
+    # --- Keys ---
+
+    def key(self, text: str) -> str:
+        """SHA-256 of model name + exact text handed to the encoder."""
+        return hashlib.sha256(f"{self.model_name}\0{text}".encode()).hexdigest()
+
+    # --- Reads ---
+
+    def _rows(self, min_rows: int) -> np.memmap:
+        """Memory-map the vector file, remapping when it has grown."""
+        if self._mmap is None or self._mmap.shape[0] < min_rows:
+            rows = self._vectors_path.stat().st_size // self._row_bytes
+            self._mmap = np.memmap(
+                self._vectors_path, dtype=self.dtype, mode="r", shape=(rows, self.dimension)
+            )
+        return self._mmap
+
+    def get_many(self, texts: Sequence[str]) -> tuple[np.ndarray, list[int]]:
+        """Look up vectors for texts.
+
+        Returns (vectors, missing) — a float32 array with one row per text
+        (zeros where not cached) and the indexes of texts that were missing.
+        """
+        keys = [self.key(t) for t in texts]
+        found: dict[str, int] = {}
+        with self._lock:
+            for start in range(0, len(keys), _LOOKUP_BATCH):
+                batch = keys[start:start + _LOOKUP_BATCH]
+                placeholders = ",".join("?" * len(batch))
+                cur = self._db.execute(
+                    f"SELECT key, row FROM vectors WHERE key IN ({placeholders})", batch
+                )
+                found.update(cur.fetchall())
+
+            vectors = np.zeros((len(texts), self.dimension), dtype=np.float32)
+            hits = [(i, found[k]) for i, k in enumerate(keys) if k in found]
+            if hits:
+                mm = self._rows(max(row for _, row in hits) + 1)
+                idx = np.fromiter((i for i, _ in hits), dtype=np.int64)
+                rows = np.fromiter((row for _, row in hits), dtype=np.int64)
+                vectors[idx] = mm[rows]
+            missing = [i for i, k in enumerate(keys) if k not in found]
+
+        return vectors, missing
+
+    # --- Writes ---
+
+    def put_many(self, texts: Sequence[str], vectors: np.ndarray) -> None:
+        """Append vectors for texts that are not cached yet."""
+        data = np.ascontiguousarray(vectors, dtype=self.dtype)
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                new_rows = []
+                seen = set()
+                for i, text in enumerate(texts):
+                    k = self.key(text)
+                    if k in seen:
+                        continue
+                    seen.add(k)
+                    if self._db.execute("SELECT 1 FROM vectors WHERE key = ?", (k,)).fetchone():
+                        continue
+                    new_rows.append((k, i))
+
+                if new_rows:
+                    # Row numbers come from the file size while holding the write
+                    # lock, so a crash between append and commit only leaves
+                    # unreferenced bytes at the tail.
+                    with open(self._vectors_path, "r+b") as f:
+                        f.seek(0, 2)
+                        size = f.tell()
+                        if size % self._row_bytes:
+                            size -= size % self._row_bytes
+                            f.truncate(size)
+                            f.seek(size)
+                        first_row = size // self._row_bytes
+                        f.write(data[[i for _, i in new_rows]].tobytes())
+                    self._db.executemany(
+                        "INSERT INTO vectors (key, row) VALUES (?, ?)",
+                        [(k, first_row + n) for n, (k, _) in enumerate(new_rows)],
+                    )
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM vectors").fetchone()[0]
+
+
+def encode_cached(
+    texts: Sequence[str],
+    encode: Callable[[list[str]], np.ndarray],
+    cache: EmbeddingCache | None,
+) -> np.ndarray:
+    """Encode texts, consulting the cache first.
+
+    Only texts never seen before reach `encode`. Returned vectors are the
+    values as stored in the cache, so a re-run yields identical output.
+    """
+    if cache is None:
+        return np.asarray(encode(list(texts)), dtype=np.float32)
+
+    vectors, missing = cache.get_many(texts)
+    if missing:
+        unique = list(dict.fromkeys(texts[i] for i in missing))
+        fresh = np.asarray(encode(unique), dtype=np.float32)
+        cache.put_many(unique, fresh)
+        stored = fresh.astype(cache.dtype).astype(np.float32)
+        lookup = dict(zip(unique, stored))
+        for i in missing:
+            vectors[i] = lookup[texts[i]]
+
+    logger.debug(
+        "embedding_cache_lookup",
+        model=cache.model_name,
+        requested=len(texts),
+        hits=len(texts) - len(missing),
+    )
+    return vectors
+
+
+@lru_cache()
+def get_passage_cache() -> EmbeddingCache | None:
+    """Process-wide cache for the configured model (None when disabled)."""
+    settings = get_settings()
+    if not settings.embedding_cache_dir:
+        return None
+    return EmbeddingCache(
+        settings.embedding_cache_dir,
+        settings.embedding_model,
+        settings.embedding_dimension,
+        settings.embedding_cache_dtype,
+    )
+# end embedding_cache.py
@@ -0,0 +1,146 @@
+"""
+# File: backend/app/services/entity_tagger.py
+# Astoria v2 — Chunk entity tagging.
+# Tags each chunk at ingest with the vessels and people it mentions, so
+# match_chunks_tagged() (migration 013) can narrow vessel and person
+# searches for uploaded and scraped sources, not only seeded registers.
+# Names come from vessel_events and person_roles; one word-level trie
+# matches all of them in a single pass over the chunk (leftmost-longest).
+# The name lists are cached and reloaded every ENTITY_TAG_REFRESH_S.
+# All config sourced from app.core.config (get_settings).
+"""
+
+import re
+import threading
+import time
+from typing import Iterable
+
+import structlog
+
+from app.core.config import get_settings
+
+logger = structlog.get_logger()
+
+VESSEL, PERSON = "ship_names", "people"
+
+_WORD = re.compile(r"[A-Za-z0-9]+(?:'[A-Za-z]+)?")
+_END = ""               # trie key marking the end of a name
+_MIN_NAME_CHARS = 3
+_MAX_TAGS = 50          # per kind, per chunk
+_PAGE = 1000
+
+
+def _words(text: str) -> list[str]:
+    return [w.lower() for w in _WORD.findall(text)]
+
+
+class EntityTagger:
+    """Multi-pattern matcher over known vessel and person names.
+
+    Names are matched as whole words, ignoring case and punctuation, so
+    "A. B. PERRY" in a register matches "A. B. Perry". A match must start
+    with a capital letter or digit in the text, which keeps single-word
+    vessel names such as "Hope" from firing on ordinary prose. People need
+    at least two words; a bare surname is too ambiguous to tag.
+    """
+
+    def __init__(self, vessels: Iterable[str] = (), people: Iterable[str] = ()):
+        self._trie: dict = {}
+        self.size = 0
+        for name in vessels:
+            self._add(name, VESSEL, name.strip())
+        for name in people:
+            if len(_words(name)) >= 2:
+                self._add(name, PERSON, name.strip().lower())
+
+    def _add(self, name: str, kind: str, value: str) -> None:
+        words = _words(name)
+        if not words or len("".join(words)) < _MIN_NAME_CHARS:
+            return
+        node = self._trie
+        for word in words:
+            node = node.setdefault(word, {})
+        node.setdefault(_END, set()).add((kind, value))
+        self.size += 1
+
+    def tag(self, text: str) -> dict[str, list[str]]:
+        """{"ship_names": [...], "people": [...]} for the names in text (empty kinds omitted)."""
+        matches = list(_WORD.finditer(text))
+        words = [m.group().lower() for m in matches]
+        found: dict[str, list[str]] = {}
+        i = 0
+        while i < len(words):
+            best, best_end = None, i
+            if text[matches[i].start()].isupper() or text[matches[i].start()].isdigit():
+                node, j = self._trie, i
+                while j < len(words) and (node := node.get(words[j])) is not None:
+                    j += 1
+                    if _END in node:
+                        best, best_end = node[_END], j
+            if best:
+                for kind, value in best:
+                    values = found.setdefault(kind, [])
+                    if value not in values and len(values) < _MAX_TAGS:
+                        values.append(value)
+                i = best_end
+            else:
+                i += 1
+        return {kind: sorted(values) for kind, values in found.items()}
+
+
+# --- Name lists ---
+
+def _column_values(supabase, table: str, columns: str) -> Iterable[dict]:
+    query = supabase.schema(get_settings().db_schema).table(table).select(columns)
+    start = 0
+    while True:
+        rows = query.order("id").range(start, start + _PAGE - 1).execute().data
+        yield from rows
+        if len(rows) < _PAGE:
+            return
+        start += _PAGE
+
+
+def load_tagger(supabase) -> EntityTagger:
+    """Build a tagger from the vessel and person names in the database."""
+    vessels: set[str] = set()
+    people: set[str] = set()
+    for row in _column_values(supabase, "vessel_events", "id, vessel_name"):
+        if row["vessel_name"]:
+            vessels.add(row["vessel_name"])
+    for row in _column_values(supabase, "person_roles", "id, person_name, vessel_name"):
+        if row["person_name"]:
+            people.add(row["person_name"])
+        if row["vessel_name"]:
+            vessels.add(row["vessel_name"])
+    tagger = EntityTagger(sorted(vessels), sorted(people))
+    logger.info("entity_tagger_loaded", vessels=len(vessels), people=len(people))
+    return tagger
+
+
+_tagger: EntityTagger | None = None
+_loaded_at = 0.0
+_lock = threading.Lock()
+
+
+def get_tagger(supabase) -> EntityTagger | None:
+    """Cached tagger, reloaded when older than entity_tag_refresh_s.
+
+    Returns None when tagging is disabled; if the name lists cannot be
+    loaded the previous tagger (or an empty one) is kept, so tagging never
+    fails an ingest.
+    """
+    global _tagger, _loaded_at
+    settings = get_settings()
+    if not settings.entity_tagging:
+        return None
+    with _lock:
+        if _tagger is None or time.monotonic() - _loaded_at > settings.entity_tag_refresh_s:
+            try:
+                _tagger = load_tagger(supabase)
+            except Exception as e:
+                logger.warning("entity_tagger_load_failed", error=str(e))
+                _tagger = _tagger or EntityTagger()
+            _loaded_at = time.monotonic()
+        return _tagger
+# end entity_tagger.py
@@ -0,0 +1,300 @@
+"""
+Astoria v2 — Bulk data export.
+
+Streams ships, vessel events, voyage legs and person roles as CSV,
+NDJSON, Arrow (IPC stream) or Parquet, for analysis outside the app:
+
+  ships    ship_registry + documents metadata   (filters of /explore/ships)
+  events   vessel_events, as recorded           (vessel, ports, master, dates)
+  voyages  voyage_legs                          (filters of /explore/voyages)
+  people   person_roles                         (person, role, vessel, dates)
+
+Rows come from a server-side cursor BATCH_ROWS at a time and each batch
+is encoded and sent before the next is fetched, so memory stays flat
+however large the export. Arrow and Parquet need pyarrow, imported only
+for those formats.
+"""
+
+import csv
+import importlib.util
+import io
+import json
+import re
+from typing import Callable, Iterator, NamedTuple
+
+import structlog
+
+from app.core.database import connect
+
+logger = structlog.get_logger()
+
+BATCH_ROWS = 5000
+
+FORMATS = {
+    "csv": ("text/csv; charset=utf-8", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "arrow": ("application/vnd.apache.arrow.stream", "arrows"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+ARROW_FORMATS = {"arrow", "parquet"}
+
+
+def _person_key(name: str) -> str:
+    # Same as extraction/resolve.py person_key, which fills person_roles.person_key
+    return " ".join(re.findall(r"[a-z]+", name.lower()))
+
+
+def _key(value: str) -> str:
+    return value.strip().lower()
+
+
+def _prefix(value: str) -> str:
+    return re.sub(r"([\\%_])", r"\\\1", _key(value)) + "%"
+
+
+class Dataset(NamedTuple):
+    select: str                                     # SELECT ... FROM ..., no WHERE
+    order: str
+    filters: dict[str, tuple[str, Callable]]        # param -> (condition, value transform)
+
+
+DATASETS = {
+    "ships": Dataset(
+        select="""
+            SELECT sr.id::text AS id, sr.name, sr.ship_type, sr.year_built, sr.hailing_port,
+                   sr.tonnage::float8 AS tonnage,
+                   d.metadata->>'official_number' AS official_number,
+                   d.metadata->>'place_built' AS place_built,
+                   d.metadata->>'builder' AS builder,
+                   metadata_number(d.metadata->'length_ft')::float8 AS length_ft,
+                   metadata_number(d.metadata->'breadth_ft')::float8 AS breadth_ft,
+                   metadata_number(d.metadata->'depth_ft')::float8 AS depth_ft,
+                   metadata_number(d.metadata->'decks')::int AS decks,
+                   metadata_number(d.metadata->'masts')::int AS masts,
+                   d.metadata->>'stern' AS stern,
+                   d.metadata->>'head' AS head,
+                   metadata_number(d.metadata->'entry_number')::int AS entry_number,
+                   d.archive_name
+            FROM ship_registry sr
+            JOIN documents d ON d.id = sr.id""",
+        order="sr.name_key, sr.id",
+        filters={
+            "name": ("sr.name_key LIKE %(name)s", _prefix),
+            "ship_type": ("sr.ship_type = %(ship_type)s", _key),
+            "hailing_port": ("sr.port_key = %(hailing_port)s", _key),
+            "year_min": ("sr.year_built >= %(year_min)s", int),
+            "year_max": ("sr.year_built <= %(year_max)s", int),
+            "tonnage_min": ("sr.tonnage >= %(tonnage_min)s", float),
+            "tonnage_max": ("sr.tonnage <= %(tonnage_max)s", float),
+        },
+    ),
+    "events": Dataset(
+        select="""
+            SELECT ve.id::text AS id, ve.document_id::text AS document_id, ve.vessel_name,
+                   ve.event_index, ve.event_type, ve.event_date, ve.event_port, ve.previous_port,
+                   ve.doc_number, ve.master, ve.owners_text, ve.notes
+            FROM vessel_events ve""",
+        order="ve.vessel_name, ve.document_id, ve.event_index",
+        filters={
+            "ship_name": ("LOWER(ve.vessel_name) = %(ship_name)s", _key),
+            "event_port": ("LOWER(ve.event_port) = %(event_port)s", _key),
+            "previous_port": ("LOWER(ve.previous_port) = %(previous_port)s", _key),
+            "recorded_master": ("LOWER(ve.master) = %(recorded_master)s", _key),
+            "date_from": ("ve.event_date >= %(date_from)s", str),
+            "date_to": ("ve.event_date <= %(date_to)s", str),
+        },
+    ),
+    # Same view, keys and order as /explore/voyages (migration 017): inferred
+    # departures and "(same as previous)" masters are resolved
+    "voyages": Dataset(
+        select="""
+            SELECT vl.id::text AS id, vl.document_id::text AS document_id, vl.vessel_name,
+                   vl.departed_from, vl.arrived_at, vl.event_date, vl.event_type, vl.master,
+                   vl.doc_number, vl.inferred
+            FROM voyage_legs vl""",
+        order="vl.sort_date, vl.id",
+        filters={
+            "ship_name": ("vl.vessel_key = %(ship_name)s", _key),
+            "port": ("(vl.from_key = %(port)s OR vl.to_key = %(port)s)", _key),
+            "master": ("vl.master_key = %(master)s", _key),
+            "date_from": ("vl.event_date >= %(date_from)s", str),
+            "date_to": ("vl.event_date <= %(date_to)s", str),
+        },
+    ),
+    "people": Dataset(
+        select="""
+            SELECT pr.id::text AS id, pr.document_id::text AS document_id, pr.person_id,
+                   pr.person_name, pr.person_key, pr.last_name, pr.vessel_name, pr.role,
+                   pr.ownership_share, pr.residence, pr.first_date, pr.last_date, pr.event_count
+            FROM person_roles pr""",
+        order="pr.person_id, pr.person_name_normalized, pr.vessel_name, pr.role",
+        filters={
+            # every name form of the person (migration 015)
+            "person": ("pr.person_id IN (SELECT person_id FROM person_roles "
+                       "WHERE person_key = %(person)s)", _person_key),
+            "role": ("pr.role = %(role)s", _key),
+            "ship_name": ("LOWER(pr.vessel_name) = %(ship_name)s", _key),
+            "date_from": ("pr.last_date >= %(date_from)s", str),
+            "date_to": ("pr.first_date <= %(date_to)s", str),
+        },
+    ),
+}
+
+
+def build_query(dataset: str, params: dict) -> tuple[str, dict]:
+    """SQL and bound values for a dataset; params that are None are ignored."""
+    spec = DATASETS[dataset]
+    unknown = {k for k, v in params.items() if v is not None} - spec.filters.keys()
+    if unknown:
+        raise ValueError(f"{dataset} can't be filtered by {', '.join(sorted(unknown))}")
+    conditions, values = [], {}
+    for name, (condition, transform) in spec.filters.items():
+        if params.get(name) is not None:
+            conditions.append(condition)
+            values[name] = transform(params[name])
+    where = f"\nWHERE {' AND '.join(conditions)}" if conditions else ""
+    return f"{spec.select}{where}\nORDER BY {spec.order}", values
+
+
+# --- Encoders -----------------------------------------------------------------
+
+class CsvEncoder:
+    def __init__(self, columns: list[str], type_codes: list[int]):
+        self.columns = columns
+
+    def header(self) -> bytes:
+        return self._rows([self.columns])
+
+    def batch(self, rows: list[tuple]) -> bytes:
+        return self._rows(rows)
+
+    def close(self) -> bytes:
+        return b""
+
+    @staticmethod
+    def _rows(rows) -> bytes:
+        out = io.StringIO()
+        csv.writer(out, lineterminator="\n").writerows(rows)
+        return out.getvalue().encode("utf-8")
+
+
+class NdjsonEncoder:
+    def __init__(self, columns: list[str], type_codes: list[int]):
+        self.columns = columns
+
+    def header(self) -> bytes:
+        return b""
+
+    def batch(self, rows: list[tuple]) -> bytes:
+        return "".join(
+            json.dumps(dict(zip(self.columns, row)), ensure_ascii=False, default=str) + "\n"
+            for row in rows
+        ).encode("utf-8")
+
+    def close(self) -> bytes:
+        return b""
+
+
+class _Sink:
+    """Write-only file that hands its bytes over on drain(); tell() keeps
+    counting, so Parquet's footer offsets stay right."""
+
+    closed = False
+
+    def __init__(self):
+        self._parts: list[bytes] = []
+        self._written = 0
+
+    def write(self, data) -> int:
+        self._parts.append(bytes(data))
+        self._written += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._written
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data, self._parts = b"".join(self._parts), []
+        return data
+
+
+# Postgres type OID -> Arrow type name; anything else is exported as text
+_ARROW_TYPES = {16: "bool_", 20: "int64", 21: "int32", 23: "int32", 700: "float32",
+                701: "float64", 1082: "date32", 1184: "timestamp"}
+
+
+class ArrowEncoder:
+    """Arrow IPC stream, or Parquet with one row group per batch."""
+
+    def __init__(self, columns: list[str], type_codes: list[int], parquet: bool = False):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        def arrow_type(code):
+            name = _ARROW_TYPES.get(code, "string")
+            return pa.timestamp("us", tz="UTC") if name == "timestamp" else getattr(pa, name)()
+
+        self._pa = pa
+        self.schema = pa.schema([(c, arrow_type(t)) for c, t in zip(columns, type_codes)])
+        self._text = [i for i, t in enumerate(type_codes) if t not in _ARROW_TYPES]
+        self._sink = _Sink()
+        self._writer = (pq.ParquetWriter(self._sink, self.schema) if parquet
+                        else pa.ipc.new_stream(self._sink, self.schema))
+
+    def header(self) -> bytes:
+        return self._sink.drain()
+
+    def batch(self, rows: list[tuple]) -> bytes:
+        columns = [list(col) for col in zip(*rows)]
+        for i in self._text:
+            columns[i] = [None if v is None else str(v) for v in columns[i]]
+        self._writer.write_batch(self._pa.record_batch(columns, schema=self.schema))
+        return self._sink.drain()
+
+    def close(self) -> bytes:
+        self._writer.close()
+        return self._sink.drain()
+
+
+def _encoder(fmt: str, columns: list[str], type_codes: list[int]):
+    if fmt == "csv":
+        return CsvEncoder(columns, type_codes)
+    if fmt == "ndjson":
+        return NdjsonEncoder(columns, type_codes)
+    return ArrowEncoder(columns, type_codes, parquet=fmt == "parquet")
+
+
+def arrow_available() -> bool:
+    return importlib.util.find_spec("pyarrow") is not None
+
+
+# --- Streaming ----------------------------------------------------------------
+
+def stream_export(dataset: str, fmt: str, params: dict) -> Iterator[bytes]:
+    """Encoded export, batch by batch, from a read-only server-side cursor.
+
+    Runs the query before yielding anything, so the first next() raises
+    if the query fails (e.g. a migration is missing) while the caller can
+    still answer with an error status.
+    """
+    sql, values = build_query(dataset, params)
+    with connect() as conn:
+        conn.read_only = True
+        with conn.cursor(name=f"export_{dataset}") as cur:
+            cur.itersize = BATCH_ROWS
+            cur.execute(sql, values)
+            encoder = _encoder(fmt, [d.name for d in cur.description],
+                               [d.type_code for d in cur.description])
+            yield encoder.header()
+            total = 0
+            while rows := cur.fetchmany(BATCH_ROWS):
+                total += len(rows)
+                yield encoder.batch(rows)
+            yield encoder.close()
+    logger.info("export_done", dataset=dataset, format=fmt, rows=total, filters=values)
@@ -0,0 +1,288 @@
+"""
+# File: backend/app/services/ingest_jobs.py
+# Astoria v2 — Ingestion run queue.
+# The API only queues runs: submit_run() records a pending row in
+# ingestion_runs (migration 007) with the job to run, and get_run()
+# reports progress from it. Runs are executed by the ingestion worker
+# process (python -m app.worker), not by the API: each Worker thread
+# claims the oldest pending run (claim_ingestion_run(), migration 023),
+# runs its job and persists progress, so parsing and embedding never
+# share the API's CPU, GIL or embedding model with queries.
+# A completed run that added documents refreshes maritime_stats.
+# Claimed runs heartbeat updated_at; a stopping worker fails the runs it
+# was running, and at startup running runs without a heartbeat (a
+# crashed worker's) are failed too. Pending runs wait for any worker.
+# All config sourced from app.core.config (get_settings).
+"""
+
+import os
+import socket
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Callable
+
+import structlog
+
+from app.core.config import get_settings
+from app.core.supabase import get_supabase_admin
+from app.models.schemas import IngestionResult, IngestionStatus
+
+logger = structlog.get_logger()
+
+TERMINAL_STATUSES = {IngestionStatus.COMPLETED, IngestionStatus.FAILED}
+
+
+def _runs_table():
+    settings = get_settings()
+    return get_supabase_admin().schema(settings.db_schema).table("ingestion_runs")
+
+
+def _claim(worker_id: str) -> dict | None:
+    """Atomically mark the oldest pending run running for worker_id."""
+    settings = get_settings()
+    rows = get_supabase_admin().schema(settings.db_schema) \
+        .rpc("claim_ingestion_run", {"p_worker": worker_id}).execute().data
+    return rows[0] if rows else None
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _to_result(row: dict) -> IngestionResult:
+    return IngestionResult(
+        run_id=row["id"],
+        source_id=row["source_id"],
+        status=IngestionStatus(row["status"]),
+        documents_processed=row.get("documents_processed") or 0,
+        chunks_created=row.get("chunks_created") or 0,
+        duplicates=row.get("duplicates") or 0,
+        errors=row.get("errors") or [],
+        result=row.get("result"),
+        started_at=row["started_at"],
+        completed_at=row.get("completed_at"),
+    )
+
+
+def _discard_upload(job: dict | None) -> None:
+    """Remove the uploaded file a run was given, once nothing will read it."""
+    path = (job or {}).get("upload")
+    if path and os.path.exists(path):
+        os.unlink(path)
+
+
+def _fail_runs(rows: list[dict], message: str) -> None:
+    """Mark runs failed, keeping the errors they already recorded."""
+    for row in rows:
+        _runs_table().update({
+            "status": IngestionStatus.FAILED.value,
+            "errors": [*(row.get("errors") or []), message],
+            "completed_at": _now(),
+        }).eq("id", row["id"]).execute()
+        _discard_upload(row.get("job"))
+
+
+# ── API side ────────────────────────────────────────────────
+
+def submit_run(
+    source_id: str,
+    kind: str,
+    params: dict,
+    created_by: str | None = None,
+    upload: str | None = None,
+) -> IngestionResult:
+    """Queue a run of job `kind` (see app.services.ingest_tasks.JOBS) with
+    keyword arguments `params`, which must be JSON.
+
+    `upload` is a file in settings.ingest_upload_dir that belongs to the
+    run: the worker removes it once the run has finished or failed.
+    """
+    row = _runs_table().insert({
+        "source_id": source_id,
+        "status": IngestionStatus.PENDING.value,
+        "created_by": created_by,
+        "job": {"kind": kind, "params": params, "upload": upload},
+    }).execute().data[0]
+    logger.info("ingest_run_queued", run_id=row["id"], source_id=source_id, kind=kind)
+    return _to_result(row)
+
+
+def get_run(run_id: str) -> IngestionResult | None:
+    """Current persisted state of a run, or None if unknown."""
+    rows = _runs_table().select("*").eq("id", run_id).limit(1).execute().data
+    return _to_result(rows[0]) if rows else None
+
+
+# ── Worker side ─────────────────────────────────────────────
+
+class RunProgress:
+    """Progress handle passed to a job; every update is persisted."""
+
+    def __init__(self, run_id: str):
+        self.run_id = run_id
+        self.documents_processed = 0
+        self.chunks_created = 0
+        self.duplicates = 0
+        self.errors: list[str] = []
+        self._lock = threading.Lock()
+
+    def record(self, result: dict, source: str | None = None) -> None:
+        """Fold one load_document() result into the run counters."""
+        with self._lock:
+            status = result.get("status")
+            if status in ("success", "updated"):
+                self.documents_processed += 1
+                self.chunks_created += result.get("chunks_created", 0)
+            elif status == "duplicate":
+                self.duplicates += 1
+            elif status == "error":
+                message = result.get("message", "unknown error")
+                self.errors.append(f"{source}: {message}" if source else message)
+            self._save()
+
+    def error(self, message: str) -> None:
+        with self._lock:
+            self.errors.append(message)
+            self._save()
+
+    def _save(self, **extra) -> None:
+        _runs_table().update({
+            "documents_processed": self.documents_processed,
+            "chunks_created": self.chunks_created,
+            "duplicates": self.duplicates,
+            "errors": self.errors,
+            **extra,
+        }).eq("id", self.run_id).execute()
+
+
+def _refresh_stats(log) -> None:
+    """Rebuild the maritime_stats rollups (migration 020) after new documents."""
+    try:
+        settings = get_settings()
+        get_supabase_admin().schema(settings.db_schema).rpc("refresh_maritime_stats", {}).execute()
+    except Exception as e:
+        log.warning("maritime_stats_refresh_failed", error=str(e))
+
+
+def recover_stale_runs() -> int:
+    """Fail runs no worker will finish: running runs whose worker stopped
+    heartbeating (it died without shutting down), and pending runs queued
+    without a job by an older backend. Called at worker startup.
+    """
+    settings = get_settings()
+    cutoff = (datetime.now(timezone.utc)
+              - timedelta(minutes=settings.ingest_stale_run_minutes)).isoformat()
+    crashed = _runs_table().select("id, errors, job") \
+        .eq("status", IngestionStatus.RUNNING.value).lt("updated_at", cutoff) \
+        .execute().data
+    orphaned = _runs_table().select("id, errors, job") \
+        .eq("status", IngestionStatus.PENDING.value).is_("job", "null").lt("updated_at", cutoff) \
+        .execute().data
+    _fail_runs(crashed, "Interrupted: the worker stopped before the run finished")
+    _fail_runs(orphaned, "Cancelled: queued without a job, no worker can run it")
+    if crashed or orphaned:
+        logger.warning("ingest_stale_runs_failed", runs=len(crashed) + len(orphaned))
+    return len(crashed) + len(orphaned)
+
+
+class Worker:
+    """Claims pending runs and executes them on `threads` threads.
+
+    jobs maps a run's job kind to the function run with its params:
+    job(progress, **params) -> final result payload.
+    """
+
+    def __init__(self, jobs: dict[str, Callable[..., dict]], threads: int, worker_id: str | None = None):
+        self.jobs = jobs
+        self.threads = threads
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self._stop = threading.Event()
+        # run_id -> claimed row, for runs executing in this worker
+        self._running: dict[str, dict] = {}
+        self._running_lock = threading.Lock()
+
+    def start(self) -> None:
+        settings = get_settings()
+        for n in range(self.threads):
+            threading.Thread(target=self._loop, args=(settings.ingest_claim_interval_s,),
+                             name=f"ingest-{n}", daemon=True).start()
+        threading.Thread(target=self._heartbeat, args=(settings.ingest_heartbeat_s,),
+                         name="ingest-heartbeat", daemon=True).start()
+
+    def stop(self) -> None:
+        """Stop claiming and fail the runs still executing here; they
+        overwrite that if they do complete before the process exits."""
+        self._stop.set()
+        with self._running_lock:
+            rows = list(self._running.values())
+        try:
+            _fail_runs(rows, "Interrupted: the worker shut down during the run")
+        except Exception as e:
+            logger.error("ingest_shutdown_mark_failed", error=str(e))
+        logger.info("ingest_worker_stopped", worker=self.worker_id, interrupted=len(rows))
+
+    def run_once(self) -> bool:
+        """Claim and execute one pending run; False if none was pending."""
+        row = _claim(self.worker_id)
+        if row is None:
+            return False
+        with self._running_lock:
+            self._running[row["id"]] = row
+        try:
+            self._execute(row)
+        finally:
+            with self._running_lock:
+                self._running.pop(row["id"], None)
+            _discard_upload(row.get("job"))
+        return True
+
+    def _execute(self, row: dict) -> None:
+        run_id, job = row["id"], row.get("job") or {}
+        progress = RunProgress(run_id)
+        log = logger.bind(run_id=run_id, source_id=row["source_id"], worker=self.worker_id)
+        try:
+            if job.get("kind") not in self.jobs:
+                raise ValueError(f"Unknown ingestion job: {job.get('kind')}")
+            log.info("ingest_run_started")
+            result = self.jobs[job["kind"]](progress, **job.get("params", {}))
+            with progress._lock:
+                progress._save(
+                    status=IngestionStatus.COMPLETED.value,
+                    result=result,
+                    completed_at=_now(),
+                )
+            log.info(
+                "ingest_run_completed",
+                documents=progress.documents_processed,
+                chunks=progress.chunks_created,
+            )
+            if progress.documents_processed:
+                _refresh_stats(log)
+        except Exception as e:
+            log.error("ingest_run_failed", error=str(e))
+            with progress._lock:
+                progress.errors.append(str(e))
+                progress._save(status=IngestionStatus.FAILED.value, completed_at=_now())
+
+    def _loop(self, interval: float) -> None:
+        while not self._stop.is_set():
+            try:
+                claimed = self.run_once()
+            except Exception as e:
+                logger.warning("ingest_claim_failed", error=str(e))
+                claimed = False
+            if not claimed:
+                self._stop.wait(interval)
+
+    def _heartbeat(self, interval: float) -> None:
+        """Touch updated_at of the runs executing here, so a starting
+        worker can tell them from a crashed worker's."""
+        while not self._stop.wait(interval):
+            with self._running_lock:
+                run_ids = list(self._running)
+            if run_ids:
+                try:
+                    _runs_table().update({"updated_at": _now()}).in_("id", run_ids).execute()
+                except Exception as e:
+                    logger.warning("ingest_heartbeat_failed", error=str(e))
+# end ingest_jobs.py
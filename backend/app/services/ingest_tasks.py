@@ -0,0 +1,161 @@
+"""
+# File: backend/app/services/ingest_tasks.py
+# Astoria v2 — Ingestion jobs.
+# The functions the ingestion worker (python -m app.worker) runs for a
+# queued run, by job kind: job(progress, **params) -> result payload.
+# The API endpoints (app.api.ingest) validate a request and queue one of
+# these with ingest_jobs.submit_run(); params are plain JSON, and
+# uploaded files are paths in the shared settings.ingest_upload_dir.
+# All config sourced from app.core.config (get_settings).
+"""
+
+import hashlib
+import os
+import tempfile
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+import structlog
+
+from app.core.config import get_settings
+from app.models.schemas import BatchItem
+from app.services.embedding import PassageBatcher
+from app.services.ingest_jobs import RunProgress
+from app.services.loader_agent import load_document
+from app.services.web_scraper import scrape_all_towns, scrape_town
+
+logger = structlog.get_logger()
+
+UPLOAD_CHUNK_BYTES = 1 << 20   # extract zip members 1 MB at a time
+
+
+def load(
+    progress: RunProgress,
+    source: str,
+    town: str | None,
+    archive_name: str,
+    loaded_by: str,
+    label: str | None = None,
+    file_checksum: str | None = None,
+    replace_document_id: str | None = None,
+) -> dict:
+    """Load one file or URL.
+
+    label names the source in progress reports and, for uploads, becomes
+    the document title (instead of the temp file name). An upload only
+    replaces an existing document when replace_document_id names it.
+    """
+    result = load_document(
+        source=source,
+        town=town,
+        archive_name=archive_name,
+        loaded_by=loaded_by,
+        title=label,
+        file_checksum=file_checksum,
+        replace_document_id=replace_document_id,
+    )
+    progress.record(result, label or source)
+    return result
+
+
+def _extract_member(zip_path: str, name: str, max_bytes: int) -> tuple[str, str]:
+    """Copy one zip member to a temp file with a hard size cap.
+
+    Returns (temp path, SHA-256 of the bytes). The member name is never
+    used as a filesystem path, so "../" entries cannot escape.
+    """
+    suffix = os.path.splitext(name)[1].lower()
+    digest = hashlib.sha256()
+    size = 0
+    tmp = tempfile.NamedTemporaryFile(suffix=suffix, delete=False)
+    try:
+        with tmp, zipfile.ZipFile(zip_path) as zf, zf.open(name) as src:
+            while chunk := src.read(UPLOAD_CHUNK_BYTES):
+                size += len(chunk)
+                if size > max_bytes:
+                    raise ValueError(f"{name} expands past {max_bytes >> 20} MB")
+                digest.update(chunk)
+                tmp.write(chunk)
+    except BaseException:
+        os.unlink(tmp.name)
+        raise
+    return tmp.name, digest.hexdigest()
+
+
+def _load_item(item: BatchItem, zip_path: str | None, loaded_by: str, embed,
+               progress: RunProgress) -> dict:
+    label = item.url or item.path
+    try:
+        if item.url:
+            result = load_document(
+                source=item.url,
+                town=item.town,
+                archive_name=item.archive_name or "Web",
+                loaded_by=loaded_by,
+                title=item.title,
+                embed=embed,
+                replace_document_id=item.replace_document_id,
+            )
+        else:
+            max_bytes = get_settings().ingest_max_upload_mb << 20
+            tmp_path, file_checksum = _extract_member(zip_path, item.path, max_bytes)
+            try:
+                result = load_document(
+                    source=tmp_path,
+                    town=item.town,
+                    archive_name=item.archive_name or "Batch Upload",
+                    loaded_by=loaded_by,
+                    title=item.title or os.path.basename(item.path),
+                    file_checksum=file_checksum,
+                    embed=embed,
+                    replace_document_id=item.replace_document_id,
+                )
+            finally:
+                os.unlink(tmp_path)
+    except Exception as e:
+        logger.error("batch_item_failed", item=label, error=str(e))
+        result = {"status": "error", "message": str(e)}
+    progress.record(result, label)
+    return {
+        "item": label,
+        "status": result["status"],
+        "document_id": result.get("document_id"),
+        "chunks_created": result.get("chunks_created", 0),
+        "message": result.get("message"),
+    }
+
+
+def batch(progress: RunProgress, items: list[dict], loaded_by: str, zip_path: str | None = None) -> dict:
+    """Load the validated items of a batch manifest; they load concurrently
+    and share embedding batches through one PassageBatcher."""
+    settings = get_settings()
+    parsed = [BatchItem.model_validate(item) for item in items]
+    batcher = PassageBatcher(settings.ingest_embed_batch_size)
+    try:
+        with ThreadPoolExecutor(
+            max_workers=settings.ingest_batch_workers,
+            thread_name_prefix="ingest-batch",
+        ) as pool:
+            outcomes = list(pool.map(
+                lambda item: _load_item(item, zip_path, loaded_by, batcher.embed, progress), parsed
+            ))
+    finally:
+        batcher.close()
+    counts: dict[str, int] = {}
+    for outcome in outcomes:
+        counts[outcome["status"]] = counts.get(outcome["status"], 0) + 1
+    return {"status": "completed", "items": len(parsed), "counts": counts, "results": outcomes}
+
+
+def scrape(progress: RunProgress, town: str, loaded_by: str) -> dict:
+    """Scrape all known sources for one town."""
+    return scrape_town(town, loaded_by=loaded_by, on_result=progress.record)
+
+
+def scrape_all(progress: RunProgress, loaded_by: str) -> dict:
+    """Scrape all four Maine towns."""
+    return scrape_all_towns(loaded_by=loaded_by, on_result=progress.record)
+
+
+JOBS = {"load": load, "batch": batch, "scrape": scrape, "scrape_all": scrape_all}
+# end ingest_tasks.py
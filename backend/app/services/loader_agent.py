@@ -2,34 +2,100 @@
 # File: backend/app/services/loader_agent.py
 # Astoria v2 — Document loader agent.
 # Orchestrates parse -> chunk -> embed -> store pipeline.
+# Each stage is a generator feeding the next in fixed-size batches, and
+# inserts run on a writer thread behind a bounded queue, so peak memory
+# depends on the batch settings rather than on document size.
+# A changed source (same URL, or a document the caller names to replace)
+# becomes a new version of its document: only chunks whose hash is new are embedded, and the
+# version is swapped in atomically by apply_document_version().
+# raw_content is sent in bounded pieces, staged as rows and joined once
+# when the document or version is finalized (migration 022).
+# New documents are checked against the MinHash index (near_duplicate)
+# and merged into or flagged against a near-identical existing one.
+# New chunks are tagged with the vessels and people they mention
+# (entity_tagger) for filtered retrieval.
 # All config sourced from app.core.config (get_settings).
 """
 
+import hashlib
+import queue
+import tempfile
+import threading
+import time
 import uuid
+from itertools import islice
+from typing import Callable, Iterable, Iterator
+
 import structlog
 from app.core.config import get_settings
-from app.services.document_parser import parse_document
+from app.services.document_parser import file_checksum as hash_file, stream_document
+from app.services import entity_tagger, near_duplicate
+from app.services.chunking import iter_chunks
 from app.services.embedding import embed_passages
 from supabase import create_client
 
 logger = structlog.get_logger()
 
-CHUNK_SIZE = 500      # words per chunk
-CHUNK_OVERLAP = 50    # word overlap between chunks
 
+def _chunk_hash(text: str) -> str:
+    """Matches document_chunks.content_hash (set by trigger, migration 010)."""
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def _batched(items: Iterable, size: int) -> Iterator[list]:
+    it = iter(items)
+    while batch := list(islice(it, size)):
+        yield batch
+
+
+def _read_pieces(spool, size: int) -> Iterator[str]:
+    spool.seek(0)
+    while piece := spool.read(size):
+        yield piece
+
+
+def _stage_content(supabase, schema: str, spool, doc_id: str) -> None:
+    """Insert the text as document_content_pieces rows (migration 022), one
+    bounded piece per request; finalizing the document joins them once."""
+    pieces = supabase.schema(schema).table("document_content_pieces")
+    size = get_settings().ingest_content_piece_chars
+    for seq, piece in enumerate(_read_pieces(spool, size)):
+        pieces.insert({"document_id": doc_id, "seq": seq, "piece": piece}).execute()
+
+
+class _ChunkWriter:
+    """Inserts chunk batches on a background thread.
+
+    put() blocks while the queue is full, which throttles the embedder to
+    the speed of the database. The first insert error is re-raised from
+    put() or close().
+    """
+
+    def __init__(self, table, max_batches: int):
+        self._table = table
+        self._queue: queue.Queue = queue.Queue(maxsize=max_batches)
+        self._error: Exception | None = None
+        self._thread = threading.Thread(target=self._run, name="chunk-writer", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        while (records := self._queue.get()) is not None:
+            if self._error is None:
+                try:
+                    self._table.insert(records).execute()
+                except Exception as e:
+                    self._error = e
 
-def _chunk_text(text: str) -> list[str]:
-    """Split text into overlapping word-based chunks."""
-    words = text.split()
-    chunks = []
-    start = 0
-    while start < len(words):
-        end = min(start + CHUNK_SIZE, len(words))
-        chunk = " ".join(words[start:end])
-        if chunk.strip():
-            chunks.append(chunk)
-        start += CHUNK_SIZE - CHUNK_OVERLAP
-    return chunks
+    def put(self, records: list[dict]) -> None:
+        if self._error:
+            raise self._error
+        self._queue.put(records)
+
+    def close(self) -> None:
+        self._queue.put(None)
+        self._thread.join()
+        if self._error:
+            raise self._error
 
 
 def _get_supabase():
@@ -38,11 +104,114 @@ def _get_supabase():
     return create_client(settings.supabase_url, settings.supabase_service_role_key)
 
 
+def _find_previous_version(
+    supabase, schema: str, info: dict, replace_document_id: str | None = None,
+) -> dict | None:
+    """Latest document for the same source, if the source has a real identity.
+
+    That is the document the caller asked to replace, else the latest one
+    with the same URL. A file without either is always a new document:
+    upload names (register.pdf) say nothing about what the file is.
+    """
+    query = supabase.schema(schema).table("documents").select("id, version")
+    if replace_document_id:
+        query = query.eq("id", replace_document_id)
+    elif info.get("source_url"):
+        query = query.eq("source_url", info["source_url"])
+    else:
+        return None
+    rows = query.order("updated_at", desc=True).limit(1).execute().data
+    return rows[0] if rows else None
+
+
+def _existing_chunks(supabase, schema: str, doc_id: str) -> dict[str, list[str]]:
+    """content_hash -> chunk ids for a document, paged past PostgREST max-rows."""
+    known: dict[str, list[str]] = {}
+    page, start = 1000, 0
+    while True:
+        rows = supabase.schema(schema).table("document_chunks") \
+            .select("id, content_hash") \
+            .eq("document_id", doc_id) \
+            .order("chunk_index") \
+            .range(start, start + page - 1) \
+            .execute().data
+        for row in rows:
+            known.setdefault(row["content_hash"], []).append(row["id"])
+        if len(rows) < page:
+            return known
+        start += page
+
+
+def _store_chunks(
+    spool,
+    table,
+    doc_id: str,
+    metadata: dict,
+    known: dict[str, list[str]] | None = None,
+    embed: Callable[[list[str]], list[list[float]]] = embed_passages,
+    tagger: entity_tagger.EntityTagger | None = None,
+) -> tuple[int, list[dict]]:
+    """Chunk the spooled text, embed new chunks in batches, write them to table.
+
+    Chunks whose hash is in `known` are not embedded; they are returned as
+    [{"id": existing chunk id, "chunk_index": new position}] instead.
+    With a tagger, each new chunk's metadata also lists the vessels and
+    people it mentions (ship_names, people).
+    Returns (total chunk count, reused chunks).
+    """
+    settings = get_settings()
+    writer = _ChunkWriter(table, settings.ingest_queue_batches)
+    pending: list[dict] = []
+    reused: list[dict] = []
+    chunk_count = 0
+
+    def fresh_chunks():
+        nonlocal chunk_count
+        for chunk in iter_chunks(
+            _read_pieces(spool, settings.ingest_content_piece_chars),
+            target_tokens=settings.chunk_target_tokens,
+            overlap_tokens=settings.chunk_overlap_tokens,
+        ):
+            index = chunk_count
+            chunk_count += 1
+            ids = known.get(_chunk_hash(chunk.text)) if known else None
+            if ids:
+                reused.append({"id": ids.pop(), "chunk_index": index})
+            else:
+                yield index, chunk
+
+    try:
+        for batch in _batched(fresh_chunks(), settings.ingest_embed_batch_size):
+            embeddings = embed([chunk.text for _, chunk in batch])
+            for (index, chunk), embedding in zip(batch, embeddings):
+                pending.append({
+                    "document_id": doc_id,
+                    "chunk_index": index,
+                    "content": chunk.text,
+                    "embedding": embedding,
+                    "metadata": {**metadata, **tagger.tag(chunk.text)} if tagger else metadata,
+                    "token_count": chunk.token_count,
+                })
+            while len(pending) >= settings.ingest_insert_batch_size:
+                writer.put(pending[:settings.ingest_insert_batch_size])
+                del pending[:settings.ingest_insert_batch_size]
+        if pending:
+            writer.put(pending)
+    finally:
+        writer.close()
+    return chunk_count, reused
+
+
 def load_document(
     source: str,
     town: str = None,
     archive_name: str = None,
     loaded_by: str = None,
+    html: str = None,
+    title: str = None,
+    file_checksum: str = None,
+    embed: Callable[[list[str]], list[list[float]]] = None,
+    replace_document_id: str = None,
 ) -> dict:
     """
     Full pipeline: parse -> chunk -> embed -> store.
@@ -52,77 +221,262 @@ def load_document(
         town:         Blue Hill | Sullivan | Milbridge | Machias
         archive_name: e.g. 'Maine Memory Network'
         loaded_by:    admin user UUID
+        html:         page body when the URL has already been fetched
+        title:        document title (defaults to the parsed title / file name)
+        file_checksum: SHA-256 of the file bytes if the caller already has it
+        embed:        passage embedder (defaults to embed_passages; batch runs
+                      pass a shared PassageBatcher)
+        replace_document_id: document this file is a new version of; files
+                      without a URL are otherwise stored as new documents
 
     Returns:
         dict with document_id, chunks_created, status
+        ("success" | "updated" | "duplicate" | "error") and stage timings
     """
     settings = get_settings()
     schema = settings.db_schema
     supabase = _get_supabase()
+    embed = embed or embed_passages
+    started = time.perf_counter()
+    timings: dict[str, float] = {}
 
-    # --- Step 1: Parse ---
-    logger.info("loader_parsing", source=source)
-    parsed = parse_document(source)
-    content = parsed["content"]
+    def lap(stage: str) -> None:
+        timings[stage] = round(time.perf_counter() - started - sum(timings.values()), 3)
 
-    if not content.strip():
-        return {"status": "error", "message": "No content extracted"}
+    # --- Step 0: Raw-file dedupe, before any parsing ---
+    is_url = source.startswith("http://") or source.startswith("https://")
+    if not is_url and file_checksum is None:
+        file_checksum = hash_file(source)
+    if file_checksum:
+        existing = supabase.schema(schema).table("documents") \
+            .select("id") \
+            .eq("file_checksum", file_checksum) \
+            .limit(1) \
+            .execute()
+        lap("hash_s")
+        if existing.data:
+            doc_id = existing.data[0]["id"]
+            logger.info("loader_duplicate_file_skipped", doc_id=doc_id, timings=timings)
+            return {
+                "status": "duplicate",
+                "document_id": doc_id,
+                "chunks_created": 0,
+                "timings": timings,
+            }
 
-    # --- Step 2: Deduplication check ---
-    existing = supabase.schema(schema).table("documents") \
-        .select("id") \
-        .eq("checksum", parsed["checksum"]) \
-        .execute()
+    with tempfile.SpooledTemporaryFile(
+        max_size=settings.ingest_spool_bytes, mode="w+", encoding="utf-8"
+    ) as spool:
+        # --- Step 1: Parse (streamed to a spool, checksummed on the way) ---
+        logger.info("loader_parsing", source=source)
+        info, pieces = stream_document(source, html=html)
+        if title:
+            info["title"] = title
+        hasher = hashlib.sha256()
+        has_content = False
+        for piece in pieces:
+            hasher.update(piece.encode())
+            spool.write(piece)
+            has_content = has_content or bool(piece.strip())
+        checksum = hasher.hexdigest()
+        lap("parse_s")
+        logger.info(
+            "loader_parsed",
+            source=source,
+            content_type=info["content_type"],
+            parse_s=timings["parse_s"],
+        )
 
-    if existing.data:
-        doc_id = existing.data[0]["id"]
-        logger.info("loader_duplicate_skipped", doc_id=doc_id)
-        return {"status": "duplicate", "document_id": doc_id, "chunks_created": 0}
-
-    # --- Step 3: Store document metadata ---
-    doc_record = {
-        "id": str(uuid.uuid4()),
-        "title": parsed["title"],
-        "source_url": parsed.get("source_url"),
-        "archive_name": archive_name,
-        "content_type": parsed["content_type"],
-        "raw_content": content,
-        "checksum": parsed["checksum"],
-        "metadata": {"town": town} if town else {},
-        "ingested_by": loaded_by,
-    }
+        if not has_content:
+            return {"status": "error", "message": "No content extracted", "timings": timings}
+
+        # --- Step 2: Deduplication check ---
+        existing = supabase.schema(schema).table("documents") \
+            .select("id") \
+            .eq("checksum", checksum) \
+            .execute()
+
+        if existing.data:
+            doc_id = existing.data[0]["id"]
+            logger.info("loader_duplicate_skipped", doc_id=doc_id)
+            return {
+                "status": "duplicate",
+                "document_id": doc_id,
+                "chunks_created": 0,
+                "timings": timings,
+            }
+
+        chunk_metadata = {"town": town} if town else {}
+        tagger = entity_tagger.get_tagger(supabase)
+        signature = None
+        if settings.near_duplicate_action != "off":
+            signature = near_duplicate.signature(
+                _read_pieces(spool, settings.ingest_content_piece_chars)
+            )
 
-    result = supabase.schema(schema).table("documents").insert(doc_record).execute()
-    doc_id = result.data[0]["id"]
-    logger.info("loader_document_stored", doc_id=doc_id, title=parsed["title"])
-
-    # --- Step 4: Chunk ---
-    chunks = _chunk_text(content)
-    logger.info("loader_chunked", doc_id=doc_id, chunk_count=len(chunks))
-
-    # --- Step 5: Embed ---
-    embeddings = embed_passages(chunks)
-
-    # --- Step 6: Store chunks ---
-    chunk_records = [
-        {
-            "document_id": doc_id,
-            "chunk_index": i,
-            "content": chunk,
-            "embedding": embedding,
-            "metadata": {"town": town} if town else {},
-            "token_count": len(chunk.split()),
+        previous = _find_previous_version(supabase, schema, info, replace_document_id)
+        if replace_document_id and not previous:
+            return {
+                "status": "error",
+                "message": f"Document to replace not found: {replace_document_id}",
+                "timings": timings,
+            }
+        if previous:
+            result = _store_new_version(
+                supabase, schema, spool, previous, checksum, file_checksum, info,
+                chunk_metadata, embed, tagger,
+            )
+            if signature is not None:
+                near_duplicate.save_signature(supabase, previous["id"], signature)
+            lap("store_s")
+            timings["total_s"] = round(time.perf_counter() - started, 3)
+            return {**result, "timings": timings}
+
+        # --- Step 2b: Near-duplicate check (new documents only) ---
+        doc_metadata = {"town": town} if town else {}
+        near = None
+        if signature is not None:
+            near = near_duplicate.find_near_duplicate(supabase, signature)
+        if near:
+            near_id, score = near
+            logger.info(
+                "loader_near_duplicate",
+                near_id=near_id,
+                similarity=score,
+                action=settings.near_duplicate_action,
+            )
+            if settings.near_duplicate_action == "merge":
+                near_duplicate.record_alias(supabase, near_id, {
+                    "title": info["title"],
+                    "source_url": info.get("source_url"),
+                    "town": town,
+                    "similarity": round(score, 3),
+                })
+                return {
+                    "status": "duplicate",
+                    "document_id": near_id,
+                    "chunks_created": 0,
+                    "near_duplicate": True,
+                    "similarity": round(score, 3),
+                    "timings": timings,
+                }
+            doc_metadata.update(near_duplicate_of=near_id, similarity=round(score, 3))
+
+        # --- Step 3: Store document metadata ---
+        doc_record = {
+            "id": str(uuid.uuid4()),
+            "title": info["title"],
+            "source_url": info.get("source_url"),
+            "archive_name": archive_name,
+            "content_type": info["content_type"],
+            "raw_content": "",
+            "checksum": checksum,
+            "file_checksum": file_checksum,
+            "metadata": doc_metadata,
+            "ingested_by": loaded_by,
         }
-        for i, (chunk, embedding) in enumerate(zip(chunks, embeddings))
-    ]
 
-    supabase.schema(schema).table("document_chunks").insert(chunk_records).execute()
-    logger.info("loader_complete", doc_id=doc_id, chunks_created=len(chunks))
+        result = supabase.schema(schema).table("documents").insert(doc_record).execute()
+        doc_id = result.data[0]["id"]
+        logger.info("loader_document_stored", doc_id=doc_id, title=info["title"])
+
+        try:
+            _stage_content(supabase, schema, spool, doc_id)
+
+            # --- Steps 4-6: Chunk -> embed -> store, one batch at a time ---
+            chunk_count, _ = _store_chunks(
+                spool,
+                supabase.schema(schema).table("document_chunks"),
+                doc_id,
+                chunk_metadata,
+                embed=embed,
+                tagger=tagger,
+            )
+            supabase.schema(schema).rpc(
+                "finalize_document_content", {"p_document_id": doc_id}
+            ).execute()
+            if signature is not None:
+                near_duplicate.save_signature(supabase, doc_id, signature)
+        except Exception:
+            # Don't leave a half-loaded document behind: its checksum would
+            # make every retry look like a duplicate. Chunks cascade.
+            supabase.schema(schema).table("documents").delete().eq("id", doc_id).execute()
+            raise
+
+    lap("store_s")
+    timings["total_s"] = round(time.perf_counter() - started, 3)
+    logger.info("loader_complete", doc_id=doc_id, chunks_created=chunk_count, timings=timings)
 
     return {
         "status": "success",
         "document_id": doc_id,
-        "title": parsed["title"],
-        "chunks_created": len(chunks),
+        "title": info["title"],
+        "chunks_created": chunk_count,
+        "timings": timings,
+    }
+
+
+def _store_new_version(
+    supabase,
+    schema: str,
+    spool,
+    previous: dict,
+    checksum: str,
+    file_checksum: str | None,
+    info: dict,
+    chunk_metadata: dict,
+    embed: Callable[[list[str]], list[list[float]]],
+    tagger: entity_tagger.EntityTagger | None,
+) -> dict:
+    """Stage a changed source as the next version of `previous` and swap it in."""
+    doc_id = previous["id"]
+    staging = supabase.schema(schema).table("document_chunk_staging")
+
+    def clear_staging():
+        staging.delete().eq("document_id", doc_id).execute()
+        supabase.schema(schema).table("document_content_pieces").delete().eq("document_id", doc_id).execute()
+
+    known = _existing_chunks(supabase, schema, doc_id)
+    old_count = sum(len(ids) for ids in known.values())
+
+    clear_staging()   # leftovers from an interrupted attempt
+    try:
+        _stage_content(supabase, schema, spool, doc_id)
+
+        chunk_count, reused = _store_chunks(
+            spool, staging, doc_id, chunk_metadata, known, embed, tagger
+        )
+
+        version = supabase.schema(schema).rpc("apply_document_version", {
+            "p_document_id": doc_id,
+            "p_base_version": previous["version"],
+            "p_checksum": checksum,
+            "p_reused": reused,
+        }).execute().data
+    except Exception:
+        clear_staging()
+        raise
+    supabase.schema(schema).table("documents") \
+        .update({"file_checksum": file_checksum}) \
+        .eq("id", doc_id) \
+        .execute()
+
+    embedded = chunk_count - len(reused)
+    logger.info(
+        "loader_version_applied",
+        doc_id=doc_id,
+        version=version,
+        chunks_embedded=embedded,
+        chunks_reused=len(reused),
+        chunks_retired=old_count - len(reused),
+    )
+    return {
+        "status": "updated",
+        "document_id": doc_id,
+        "title": info["title"],
+        "version": version,
+        "chunks_created": embedded,
+        "chunks_reused": len(reused),
+        "chunks_retired": old_count - len(reused),
     }
 # end loader_agent.py
@@ -0,0 +1,148 @@
+"""
+# File: backend/app/services/near_duplicate.py
+# Astoria v2 — Near-duplicate document detection.
+# MinHash signatures over word 5-gram shingles, indexed by LSH band keys
+# in document_signatures (migration 012). Catches the same page with a
+# different footer, or a re-OCR'd register, which the exact checksum misses.
+# Changing the MinHash settings invalidates stored signatures (re-run
+# scripts/backfill_signatures.py).
+# All config sourced from app.core.config (get_settings).
+"""
+
+import hashlib
+import re
+from collections import deque
+from functools import lru_cache
+from itertools import islice
+from typing import Iterable, Iterator
+
+import numpy as np
+import structlog
+
+from app.core.config import get_settings
+
+logger = structlog.get_logger()
+
+SHINGLE_WORDS = 5
+_MERSENNE = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+_BLOCK = 4096           # shingles hashed per numpy pass
+_MAX_CANDIDATES = 50    # LSH candidates compared per lookup
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+@lru_cache()
+def _permutations(num_perm: int) -> tuple[np.ndarray, np.ndarray]:
+    """Fixed-seed hash permutations, so signatures are stable across processes."""
+    rng = np.random.RandomState(1)
+    a = rng.randint(1, int(_MERSENNE), num_perm, dtype=np.uint64)
+    b = rng.randint(0, int(_MERSENNE), num_perm, dtype=np.uint64)
+    return a, b
+
+
+def _tokens(pieces: Iterable[str]) -> Iterator[str]:
+    """Lowercased alphanumeric tokens; punctuation and layout are ignored."""
+    carry = ""
+    for piece in pieces:
+        text = carry + piece.lower()
+        tokens = _TOKEN.findall(text)
+        carry = tokens.pop() if tokens and text[-1:].isalnum() else ""
+        yield from tokens
+    if carry:
+        yield carry
+
+
+def _shingle_hashes(pieces: Iterable[str]) -> Iterator[int]:
+    window: deque[str] = deque(maxlen=SHINGLE_WORDS)
+    emitted = False
+    for token in _tokens(pieces):
+        window.append(token)
+        if len(window) == SHINGLE_WORDS:
+            yield _hash32(" ".join(window))
+            emitted = True
+    if window and not emitted:
+        yield _hash32(" ".join(window))
+
+
+def _hash32(text: str) -> int:
+    return int.from_bytes(hashlib.blake2b(text.encode(), digest_size=4).digest(), "little")
+
+
+def signature(pieces: Iterable[str], num_perm: int | None = None) -> np.ndarray | None:
+    """MinHash signature of streamed text (None when it has no words)."""
+    num_perm = num_perm or get_settings().minhash_num_perm
+    a, b = _permutations(num_perm)
+    sig = np.full(num_perm, _MAX_HASH, dtype=np.uint64)
+    shingles = _shingle_hashes(pieces)
+    seen = False
+    while block := list(islice(shingles, _BLOCK)):
+        hv = np.array(block, dtype=np.uint64)
+        # uint64 products wrap; that is fine for a hash family
+        permuted = ((np.outer(hv, a) + b) % _MERSENNE) & _MAX_HASH
+        np.minimum(sig, permuted.min(axis=0), out=sig)
+        seen = True
+    return sig if seen else None
+
+
+def similarity(sig_a: np.ndarray, sig_b: np.ndarray) -> float:
+    """Estimated Jaccard similarity of two signatures."""
+    return float(np.mean(sig_a == sig_b))
+
+
+def band_keys(sig: np.ndarray, bands: int | None = None) -> list[str]:
+    """LSH band keys: documents sharing any key are candidate near-duplicates."""
+    bands = bands or get_settings().minhash_bands
+    rows = len(sig) // bands
+    keys = []
+    for band in range(bands):
+        digest = hashlib.blake2b(sig[band * rows:(band + 1) * rows].tobytes(), digest_size=8)
+        keys.append(f"{band}:{digest.hexdigest()}")
+    return keys
+
+
+# --- Index ---
+
+def _signatures_table(supabase):
+    return supabase.schema(get_settings().db_schema).table("document_signatures")
+
+
+def find_near_duplicate(supabase, sig: np.ndarray) -> tuple[str, float] | None:
+    """Most similar indexed document at or above the threshold, if any."""
+    settings = get_settings()
+    rows = _signatures_table(supabase) \
+        .select("document_id, minhash") \
+        .overlaps("band_keys", band_keys(sig)) \
+        .limit(_MAX_CANDIDATES) \
+        .execute().data
+    best = None
+    for row in rows:
+        score = similarity(sig, np.array(row["minhash"], dtype=np.uint64))
+        if score >= settings.near_duplicate_threshold and (best is None or score > best[1]):
+            best = (row["document_id"], score)
+    logger.debug("near_duplicate_lookup", candidates=len(rows), match=best)
+    return best
+
+
+def save_signature(supabase, document_id: str, sig: np.ndarray) -> None:
+    _signatures_table(supabase).upsert({
+        "document_id": document_id,
+        "minhash": [int(v) for v in sig],
+        "band_keys": band_keys(sig),
+    }).execute()
+
+
+def record_alias(supabase, document_id: str, alias: dict) -> None:
+    """Note on the kept document that another source matched it.
+
+    alias carries title, source_url, town and similarity; a source already
+    noted (same title, URL and town) is not added twice.
+    """
+    schema = get_settings().db_schema
+    docs = supabase.schema(schema).table("documents")
+    metadata = docs.select("metadata").eq("id", document_id).execute().data[0]["metadata"] or {}
+    aliases = metadata.get("near_duplicates", [])
+    identity = ("title", "source_url", "town")
+    if not any(all(a.get(k) == alias.get(k) for k in identity) for a in aliases):
+        docs.update({"metadata": {**metadata, "near_duplicates": aliases + [alias]}}) \
+            .eq("id", document_id).execute()
+# end near_duplicate.py
@@ -5,14 +5,16 @@ Converts user questions into safe SQL queries against the maritime database.
 Uses Gemini Flash for speed. Validates generated SQL before execution.
 
 Schema is defined here as the single source of truth for SQL generation.
+Common statistics questions are answered from the maritime_stats rollups
+with fixed SQL (app/services/stats.py) without calling the LLM.
 """
 
 import re
 import structlog
-import psycopg
 
-from app.core.config import get_settings
+from app.core.database import connect
 from app.services.llm_router import call_gemini
+from app.services.stats import sql_for_question
 
 logger = structlog.get_logger()
 
@@ -76,6 +78,8 @@ TABLE: vessel_events
                             Enables voyage reconstruction: departed previous_port → arrived event_port
   - doc_number (TEXT) — enrollment/registration document number
   - master (TEXT) — captain at that time, e.g. 'Nelson Ingalls', '(same as previous)'
+  - master_key (TEXT) — master as lowercase letters with single spaces, e.g. 'nelson ingalls';
+                        same form as person_roles.person_key, indexed
   - owners_text (TEXT) — full ownership string for text search
   - owner_shares (JSONB) — parsed ownership shares (when available)
   - notes (TEXT) — 'surrendered', 'tonnage_amended', 'trade_changed', etc.
@@ -99,16 +103,35 @@ TABLE: person_roles
   - last_date (DATE) — latest date in this role for this vessel
   - event_count (INTEGER) — how many events with this person+vessel+role
   - document_id (UUID, FK → documents.id)
+  - person_key (TEXT) — name as lowercase letters with single spaces, e.g. 'john b chandler'
+  - person_id (TEXT) — same value for every spelling of one person's name; use it to
+    gather a person's roles ('A. A. Lowell', 'A A Lowell' and 'Albert A. Lowell' share one)
 
-VIEW: captain_careers
-  - person_name, last_name, vessels_commanded, career_start, career_end, vessel_list (array)
+VIEW: captain_careers (one row per person_id)
+  - person_name, last_name, vessels_commanded, career_start, career_end, vessel_list (array), person_id
 
-VIEW: builder_portfolios
-  - builder, last_name, vessels_built, vessel_list (array), first_build, last_build
+VIEW: builder_portfolios (one row per person_id)
+  - builder, last_name, vessels_built, vessel_list (array), first_build, last_build, person_id
 
 VIEW: family_vessel_connections
   - family_name, person_a, role_a, person_b, role_b, vessel_name, first_date
 
+MATERIALIZED VIEW: maritime_stats (precomputed counts; prefer it for aggregates it covers)
+  - kind (TEXT) — 'vessels' (one fact per ship) or 'events' (one fact per vessel_events row)
+  - dims (TEXT) — the dimensions the row is grouped by, comma-separated in the order
+    decade, vessel_type, place_built, hailing_port, builder, event_type, port;
+    '' is the grand total. ALWAYS filter on kind AND dims, e.g. dims = 'decade,vessel_type'
+  - decade (INTEGER) — 1840 for 1840-1849; year built (vessels) or event year (events)
+  - vessel_type (TEXT, lowercase), place_built, hailing_port, builder (vessels only)
+  - event_type, port (events only; port is event_port)
+  - place_built_key, hailing_port_key, builder_key, port_key (TEXT) — lowercase keys the
+    names are grouped by; filter names on these with =, e.g. port_key = 'machias'
+  - vessels (BIGINT) — ships (kind 'vessels') or distinct vessel documents (kind 'events')
+  - events (BIGINT), tonnage_total (NUMERIC), tonnage_avg (NUMERIC)
+  - kind 'vessels' rolls up every combination of decade, vessel_type, place_built and
+    hailing_port, plus builder alone and decade + builder; kind 'events' every combination
+    of decade, vessel_type, event_type and port
+
 IMPORTANT NOTES about the data:
 - The raw_content field contains the FULL enrollment history — every time the
   vessel was enrolled, registered, or changed owners/masters, that record
@@ -245,7 +268,7 @@ A: SELECT event_port AS port, event_date, event_type, master
 Q: Which vessels did Nelson Ingalls captain?
 A: SELECT DISTINCT vessel_name, MIN(event_date) AS first_date, MAX(event_date) AS last_date
    FROM vessel_events
-   WHERE master ILIKE '%Ingalls%'
+   WHERE master_key = 'nelson ingalls'
    GROUP BY vessel_name
    ORDER BY first_date
 
@@ -280,7 +303,7 @@ A: SELECT person_name AS captain, vessels_commanded, career_start, career_end, v
 Q: Show me the career of Captain Nelson Ingalls
 A: SELECT vessel_name, role, first_date, last_date, event_count
    FROM person_roles
-   WHERE person_name_normalized ILIKE '%nelson ingalls%'
+   WHERE person_id IN (SELECT person_id FROM person_roles WHERE person_key = 'nelson ingalls')
    ORDER BY first_date
 
 Q: What vessels did the Sawyer family own or command?
@@ -295,6 +318,12 @@ A: SELECT builder, vessels_built, vessel_list, first_build, last_build
    ORDER BY vessels_built DESC
    LIMIT 20
 
+Q: How many schooners were built in each decade?
+A: SELECT decade, vessels, tonnage_avg
+   FROM maritime_stats
+   WHERE kind = 'vessels' AND dims = 'decade,vessel_type' AND vessel_type = 'schooner'
+   ORDER BY decade
+
 Q: What family connections exist on the vessel Acara?
 A: SELECT family_name, person_a, role_a, person_b, role_b
    FROM family_vessel_connections
@@ -345,6 +374,10 @@ def generate_sql(question: str) -> str | None:
 
     Returns the SQL string, or None if generation fails.
     """
+    sql = sql_for_question(question)
+    if sql:
+        logger.info("sql_from_stats", question=question)
+        return sql
     try:
         raw = call_gemini(SQL_SYSTEM_PROMPT, question)
         sql = _clean_sql(raw)
@@ -395,21 +428,8 @@ def execute_sql(sql: str) -> tuple[list[dict], list[str]]:
     Returns (rows_as_dicts, column_names).
     Uses direct connection (not pooler) for reliable access.
     """
-    settings = get_settings()
-
-    # Use DATABASE_URL from env if available, otherwise build direct connection
-    if settings.database_url:
-        conn_string = settings.database_url
-    else:
-        # Fallback: build direct connection from Supabase URL
-        project_ref = settings.supabase_url.replace("https://", "").replace(".supabase.co", "")
-        conn_string = (
-            f"postgresql://postgres:{settings.supabase_service_role_key}"
-            f"@db.{project_ref}.supabase.co:5432/postgres"
-        )
-
     try:
-        with psycopg.connect(conn_string, autocommit=True) as conn:
+        with connect(autocommit=True) as conn:
             with conn.cursor() as cur:
                 cur.execute(sql)
                 columns = [desc[0] for desc in cur.description] if cur.description else []
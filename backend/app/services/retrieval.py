@@ -2,11 +2,17 @@
 Astoria v2 — Vector retrieval service.
 
 Performs semantic search using the Supabase match_chunks() and
-match_chunks_filtered() functions with E5-large-v2 embeddings.
+match_chunks_tagged() functions with E5-large-v2 embeddings.
 
 When a query references a specific vessel, uses metadata-filtered
 search to retrieve ALL relevant chunks for that vessel, then
-supplements with structured event data from vessel_events.
+supplements with structured event data from vessel_events. Chunks
+are matched by the seeded ship_name or by the ship_names/people tags
+the loader adds to every ingested chunk (see entity_tagger).
+
+People are looked up by person_key and person_id (migration 015), and
+their voyages by vessel_events.master_key (migration 021), so every
+spelling of a person's name resolves to the same roles and events.
 """
 
 import re
@@ -22,7 +28,8 @@ logger = structlog.get_logger()
 def _detect_vessel_name(question: str, supabase) -> str | None:
     """Check if the question references a specific vessel by name.
 
-    Queries the documents table for ship_name metadata matches.
+    Queries the documents table for ship_name metadata matches, then the
+    vessel_events names that the chunk tagger uses.
     Returns the matched vessel name or None.
     """
     # Extract potential vessel names — look for quoted names or capitalized multi-word names
@@ -71,6 +78,19 @@ def _detect_vessel_name(question: str, supabase) -> str | None:
                 logger.info("vessel_detected", candidate=candidate, matched=ship_name)
                 return ship_name
 
+    # Vessels known only from tagged chunks (uploads, scraped pages)
+    for candidate in candidates:
+        result = (
+            supabase.table("vessel_events")
+            .select("vessel_name")
+            .ilike("vessel_name", f"%{candidate}%")
+            .limit(1)
+            .execute()
+        )
+        if result.data:
+            logger.info("vessel_detected", candidate=candidate, matched=result.data[0]["vessel_name"])
+            return result.data[0]["vessel_name"]
+
     return None
 
 
@@ -90,6 +110,14 @@ def _get_vessel_events(vessel_name: str, supabase) -> list[dict]:
         return []
 
 
+def _person_key(name: str) -> str:
+    """Lowercase letters-only words: "A. A. Lowell" -> "a a lowell".
+
+    Same as extraction/resolve.py person_key, which fills person_roles.person_key.
+    """
+    return " ".join(re.findall(r"[a-z]+", name.lower()))
+
+
 def _detect_person_query(question: str, supabase) -> str | None:
     """Check if the question is about a specific person (captain, owner, builder).
 
@@ -114,52 +142,105 @@ def _detect_person_query(question: str, supabase) -> str | None:
     if not candidates:
         return None
 
-    # Check each candidate against person_roles
+    # Check each candidate against person_roles, by indexed equality
+    # only: first person_key on its leading words ("Nelson Ingalls
+    # commanded which ships" -> "nelson ingalls"), then last_key on its
+    # first words, for a surname alone ("Ingalls")
     for candidate in candidates:
+        words = _person_key(candidate).split()
+        keys = [" ".join(words[:n]) for n in range(len(words), 1, -1)]
         try:
-            result = (
-                supabase.table("person_roles")
-                .select("person_name, person_name_normalized")
-                .ilike("person_name_normalized", f"%{candidate.lower()}%")
-                .limit(1)
-                .execute()
-            )
+            if keys:
+                result = (
+                    supabase.table("person_roles")
+                    .select("person_key, person_name_normalized")
+                    .in_("person_key", keys)
+                    .execute()
+                )
+                if result.data:
+                    matched = max(result.data, key=lambda r: len(r["person_key"]))["person_name_normalized"]
+                    logger.info("person_detected", candidate=candidate, matched=matched, by="key")
+                    return matched
+        except Exception:
+            pass  # person_key needs migration 015
+
+        for word in [w for w in words if len(w) > 2][:3]:
+            try:
+                result = (
+                    supabase.table("person_roles")
+                    .select("person_name_normalized")
+                    .eq("last_key", word)
+                    .order("event_count", desc=True)
+                    .limit(1)
+                    .execute()
+                )
+            except Exception:
+                break  # last_key needs migration 021
             if result.data:
                 matched = result.data[0]["person_name_normalized"]
-                logger.info("person_detected", candidate=candidate, matched=matched)
+                logger.info("person_detected", candidate=candidate, matched=matched, by="last_name")
                 return matched
-        except Exception:
-            pass
 
     return None
 
 
-def _get_person_roles(person_name_norm: str, supabase) -> list[dict]:
-    """Fetch all roles for a person from person_roles table."""
+def _get_person_id(person_name_norm: str, supabase) -> str | None:
     try:
         result = (
             supabase.table("person_roles")
-            .select("*")
-            .ilike("person_name_normalized", f"%{person_name_norm}%")
-            .order("first_date")
+            .select("person_id")
+            .eq("person_name_normalized", person_name_norm)
+            .limit(1)
             .execute()
         )
+        return result.data[0].get("person_id") if result.data else None
+    except Exception:
+        return None  # person_id needs migration 015
+
+
+def _get_person_roles(person_name_norm: str, supabase) -> list[dict]:
+    """Fetch all roles for a person, under every form of their name."""
+    person_id = _get_person_id(person_name_norm, supabase)
+    try:
+        query = supabase.table("person_roles").select("*")
+        if person_id:
+            query = query.eq("person_id", person_id)
+        else:
+            query = query.eq("person_name_normalized", person_name_norm)
+        result = query.order("first_date").execute()
         return result.data or []
     except Exception as e:
         logger.warning("person_roles_query_failed", error=str(e))
         return []
 
 
-def _get_person_events(person_name_norm: str, supabase) -> list[dict]:
-    """Fetch all vessel_events where this person was master."""
+def _get_person_events(person_name_norm: str, person_roles: list[dict], supabase) -> list[dict]:
+    """Fetch all vessel_events where this person was master, under every
+    form of their name in person_roles."""
+    keys = {_person_key(person_name_norm)}
+    keys.update(r.get("person_key") or _person_key(r["person_name"]) for r in person_roles)
+    keys.discard("")
+    names = sorted({r["person_name"] for r in person_roles})
     try:
-        result = (
-            supabase.table("vessel_events")
-            .select("*")
-            .ilike("master", f"%{person_name_norm}%")
-            .order("event_date")
-            .execute()
-        )
+        try:
+            result = (
+                supabase.table("vessel_events")
+                .select("*")
+                .in_("master_key", sorted(keys))
+                .order("event_date")
+                .execute()
+            )
+        except Exception:
+            if not names:
+                raise
+            # master_key needs migration 021; the plain master column is indexed too
+            result = (
+                supabase.table("vessel_events")
+                .select("*")
+                .in_("master", names)
+                .order("event_date")
+                .execute()
+            )
         return result.data or []
     except Exception as e:
         logger.warning("person_events_query_failed", error=str(e))
@@ -218,7 +299,7 @@ def search_chunks(
         # Person-specific query: fetch their roles and events
         logger.info("person_search", person=person_name)
         person_roles = _get_person_roles(person_name, supabase)
-        person_events = _get_person_events(person_name, supabase)
+        person_events = _get_person_events(person_name, person_roles, supabase)
 
         # Also check for family connections
         family_members = []
@@ -227,16 +308,20 @@ def search_chunks(
             if last_name:
                 family_members = _get_family_connections(last_name, supabase)
 
-        # Get chunks for all vessels this person was associated with
+        # Get chunks that name this person, then chunks for all vessels
+        # this person was associated with
         vessel_names = list(set(r["vessel_name"] for r in person_roles))
+        name_forms = sorted({r["person_name_normalized"] for r in person_roles} - {person_name})
         result_data = []
-        for vn in vessel_names[:10]:  # limit to avoid too many queries
+        tag_filters = ([{"person": name} for name in [person_name, *name_forms[:2]]]
+                       + [{"vessel": vn} for vn in vessel_names[:10]])
+        for tag_filter in tag_filters:  # vessels limited to avoid too many queries
             try:
                 vr = supabase.rpc(
-                    "match_chunks_filtered",
+                    "match_chunks_tagged",
                     {
                         "query_embedding": query_vector,
-                        "filter_metadata": {"ship_name": vn},
+                        **tag_filter,
                         "match_threshold": 0.2,
                         "match_count": 5,
                     },
@@ -265,10 +350,10 @@ def search_chunks(
 
         # Get vessel-specific chunks
         filtered_result = supabase.rpc(
-            "match_chunks_filtered",
+            "match_chunks_tagged",
             {
                 "query_embedding": query_vector,
-                "filter_metadata": {"ship_name": vessel_name},
+                "vessel": vessel_name,
                 "match_threshold": 0.2,   # low threshold — we want ALL chunks for this vessel
                 "match_count": 20,         # capture full history
             },
@@ -0,0 +1,165 @@
+"""
+Astoria v2 — Maritime statistics.
+
+Reads the maritime_stats rollups (migration 020): each row is one cell
+of a cube over vessels or vessel events, and its dims column names the
+dimensions it is grouped by, in canonical order. A query is therefore a
+lookup on (kind, dims) rather than an aggregate over documents.
+
+Also the NL2SQL fast path: the common dashboard questions (vessels per
+decade, tonnage by type, top builders, busiest ports, enrolled vs
+registered per decade) map to fixed SQL over maritime_stats, so they
+skip LLM SQL generation.
+"""
+
+import re
+
+# Dimensions per kind, in the canonical order of maritime_stats.dims
+DIMENSIONS = {
+    "vessels": ("decade", "vessel_type", "place_built", "hailing_port", "builder"),
+    "events": ("decade", "vessel_type", "event_type", "port"),
+}
+METRICS = {
+    "vessels": ("vessels", "tonnage_total", "tonnage_avg"),
+    "events": ("events", "vessels"),
+}
+# builder is outside the vessels cube: only builder and decade x builder are rolled up
+_BUILDER_WITH = {"decade"}
+# names are grouped by a lowercase key; the dimension column is its usual spelling
+_KEYS = {
+    "place_built": "place_built_key",
+    "hailing_port": "hailing_port_key",
+    "builder": "builder_key",
+    "port": "port_key",
+}
+
+
+def dims_key(kind: str, dimensions) -> str:
+    """The maritime_stats.dims value for a set of dimensions.
+
+    Raises ValueError for an unknown kind or dimension, or a combination
+    the view doesn't roll up.
+    """
+    if kind not in DIMENSIONS:
+        raise ValueError(f"Unknown statistics kind '{kind}'")
+    wanted = set(dimensions)
+    unknown = wanted - set(DIMENSIONS[kind])
+    if unknown:
+        raise ValueError(f"{kind} can't be grouped by {', '.join(sorted(unknown))}")
+    if "builder" in wanted and wanted - {"builder"} - _BUILDER_WITH:
+        raise ValueError("builder can only be combined with decade")
+    return ",".join(d for d in DIMENSIONS[kind] if d in wanted)
+
+
+def query_stats(
+    supabase,
+    kind: str,
+    group_by: list[str],
+    filters: dict | None = None,
+    metric: str | None = None,
+    limit: int = 100,
+) -> list[dict]:
+    """Rows of maritime_stats grouped by group_by, optionally filtered.
+
+    A filtered dimension is grouped too (its other values are dropped by
+    the filter). Text filters match case-insensitively, on the lowercase
+    keys the view groups by. Rows are ordered by metric, highest first; without a
+    metric, a decade breakdown is in decade order and anything else by
+    the kind's first metric.
+    """
+    filters = {k: v for k, v in (filters or {}).items() if v is not None}
+    dims = dims_key(kind, [*group_by, *filters])
+    if metric is not None and metric not in METRICS[kind]:
+        raise ValueError(f"Unknown metric '{metric}' for {kind}; use {', '.join(METRICS[kind])}")
+
+    columns = [d for d in DIMENSIONS[kind] if d in dims.split(",")] + list(METRICS[kind])
+    query_builder = (
+        supabase.table("maritime_stats")
+        .select(", ".join(columns))
+        .eq("kind", kind)
+        .eq("dims", dims)
+    )
+    for name, value in filters.items():
+        if name == "decade":
+            query_builder = query_builder.eq("decade", int(value))
+        else:
+            query_builder = query_builder.eq(_KEYS.get(name, name), str(value).strip().lower())
+
+    if metric is None and "decade" in group_by:
+        query_builder = query_builder.order("decade")
+    else:
+        query_builder = query_builder.order(metric or METRICS[kind][0], desc=True, nullsfirst=False)
+
+    result = query_builder.limit(limit).execute()
+    return result.data or []
+
+
+# ── NL2SQL fast path ────────────────────────────────────────
+
+_LEAD = (r"(?:(?:show|list|give|count|chart|plot)(?: me)? |how many |"
+         r"what (?:is|are|was|were) |which (?:are|were) )?(?:the )?(?:number of )?")
+_VESSELS = r"(?:vessels|ships)(?: were)?(?: built)?"
+
+_QUESTIONS = [
+    (rf"{_LEAD}{_VESSELS} (?:per|by|in each|each) decade", """
+SELECT decade, vessels, tonnage_total, tonnage_avg
+FROM maritime_stats
+WHERE kind = 'vessels' AND dims = 'decade' AND decade IS NOT NULL
+ORDER BY decade"""),
+    (rf"{_LEAD}(?:total |average )?tonnage (?:by|per) (?:vessel |ship )?type", """
+SELECT vessel_type, vessels, tonnage_total, tonnage_avg
+FROM maritime_stats
+WHERE kind = 'vessels' AND dims = 'vessel_type' AND vessel_type IS NOT NULL
+ORDER BY tonnage_total DESC NULLS LAST"""),
+    (rf"{_LEAD}{_VESSELS} (?:by|per|of each) (?:vessel |ship )?type", """
+SELECT vessel_type, vessels, tonnage_avg
+FROM maritime_stats
+WHERE kind = 'vessels' AND dims = 'vessel_type' AND vessel_type IS NOT NULL
+ORDER BY vessels DESC"""),
+    (rf"{_LEAD}(?:top|leading|biggest|most prolific) (?:ship ?)?builders", """
+SELECT builder, vessels, tonnage_total
+FROM maritime_stats
+WHERE kind = 'vessels' AND dims = 'builder' AND builder IS NOT NULL
+ORDER BY vessels DESC
+LIMIT 20"""),
+    (rf"{_LEAD}(?:busiest|most active|most visited) ports", """
+SELECT port, events, vessels
+FROM maritime_stats
+WHERE kind = 'events' AND dims = 'port' AND port IS NOT NULL
+ORDER BY events DESC
+LIMIT 20"""),
+    (rf"{_LEAD}(?:enrolled|enrollments?) (?:vs|versus|and) (?:registered|registrations?)"
+     rf"(?: vessels)? (?:per|by|in each|each) decade", """
+SELECT decade, event_type, events, vessels
+FROM maritime_stats
+WHERE kind = 'events' AND dims = 'decade,event_type'
+  AND decade IS NOT NULL AND event_type IN ('enrolled', 'registered')
+ORDER BY decade, event_type"""),
+    (rf"{_LEAD}{_VESSELS} (?:by|per) (?:hailing|home) port", """
+SELECT hailing_port, vessels, tonnage_avg
+FROM maritime_stats
+WHERE kind = 'vessels' AND dims = 'hailing_port' AND hailing_port IS NOT NULL
+ORDER BY vessels DESC
+LIMIT 50"""),
+    (rf"{_LEAD}{_VESSELS} (?:by|per|in each) (?:place|town)(?: built| of build)?", """
+SELECT place_built, vessels, tonnage_avg
+FROM maritime_stats
+WHERE kind = 'vessels' AND dims = 'place_built' AND place_built IS NOT NULL
+ORDER BY vessels DESC
+LIMIT 50"""),
+]
+_QUESTIONS = [(re.compile(pattern), sql.strip()) for pattern, sql in _QUESTIONS]
+
+
+def sql_for_question(question: str) -> str | None:
+    """Fixed maritime_stats SQL if the question is a known statistics
+    question as a whole, else None.
+
+    Only the whole question matches, so one with extra conditions
+    ("... per decade in Machias") still goes to the LLM.
+    """
+    text = " ".join(re.sub(r"[^a-z]+", " ", question.lower()).split())
+    for pattern, sql in _QUESTIONS:
+        if pattern.fullmatch(text):
+            return sql
+    return None
@@ -3,10 +3,21 @@
 # Astoria v2 — Maine maritime history web scraper.
 # Targets known historical sources for Blue Hill, Sullivan,
 # Milbridge, and Machias, Maine.
+# Pages are fetched concurrently over one shared async client with a
+# per-host limit, each URL at most once per scrape, and with conditional
+# GETs against the validators kept in scrape_cache (migration 009).
 # All config sourced from app.core.config (get_settings).
 """
 
+import asyncio
+from datetime import datetime, timezone
+from typing import Callable
+from urllib.parse import urlsplit
+
+import httpx
 import structlog
+from app.core.config import get_settings
+from app.core.supabase import get_supabase_admin
 from app.services.loader_agent import load_document
 
 logger = structlog.get_logger()
@@ -31,53 +42,178 @@ TOWN_SOURCES = {
 }
 
 
-def scrape_town(town: str, loaded_by: str = None) -> dict:
+def _cache_table():
+    settings = get_settings()
+    return get_supabase_admin().schema(settings.db_schema).table("scrape_cache")
+
+
+def _load_validators(urls: list[str]) -> dict[str, dict]:
+    rows = _cache_table().select("url, etag, last_modified, document_id") \
+        .in_("url", urls).execute().data
+    return {row["url"]: row for row in rows}
+
+
+def _save_validators(url: str, response: httpx.Response, document_id: str) -> None:
+    _cache_table().upsert({
+        "url": url,
+        "etag": response.headers.get("etag"),
+        "last_modified": response.headers.get("last-modified"),
+        "document_id": document_id,
+        "fetched_at": datetime.now(timezone.utc).isoformat(),
+    }).execute()
+
+
+async def _fetch(
+    client: httpx.AsyncClient,
+    url: str,
+    cached: dict | None,
+    host_limits: dict[str, asyncio.Semaphore],
+) -> httpx.Response:
+    """GET url, conditionally when validators are known."""
+    headers = {}
+    if cached:
+        if cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        if cached.get("last_modified"):
+            headers["If-Modified-Since"] = cached["last_modified"]
+    async with host_limits[urlsplit(url).netloc]:
+        response = await client.get(url, headers=headers)
+    if response.status_code != 304:
+        response.raise_for_status()
+    return response
+
+
+async def _scrape(
+    sources: dict[str, list[str]],
+    loaded_by: str | None,
+    on_result: Callable[[dict, str], None] | None,
+) -> dict:
+    """Fetch every distinct URL concurrently and load pages as they arrive.
+
+    A URL listed under several towns is fetched and loaded once, under the
+    first town that lists it; the other towns report it as a duplicate,
+    exactly as the checksum check used to after re-downloading it.
+    """
+    settings = get_settings()
+    results = {
+        town: {
+            "town": town,
+            "sources_attempted": len(urls),
+            "docs_loaded": 0,
+            "chunks_created": 0,
+            "duplicates": 0,
+            "errors": [],
+        }
+        for town, urls in sources.items()
+    }
+
+    owners: dict[str, list[str]] = {}
+    for town, urls in sources.items():
+        for url in urls:
+            owners.setdefault(url, []).append(town)
+
+    validators = await asyncio.to_thread(_load_validators, list(owners))
+    host_limits = {
+        urlsplit(url).netloc: asyncio.Semaphore(settings.scrape_per_host_limit)
+        for url in owners
+    }
+
+    async def report(town: str, url: str, result: dict) -> None:
+        counters = results[town]
+        if result["status"] in ("success", "updated"):
+            counters["docs_loaded"] += 1
+            counters["chunks_created"] += result["chunks_created"]
+        elif result["status"] == "duplicate":
+            counters["duplicates"] += 1
+        else:
+            counters["errors"].append(f"{url}: {result['message']}")
+        if on_result:
+            await asyncio.to_thread(on_result, result, url)
+
+    async with httpx.AsyncClient(
+        timeout=settings.scrape_timeout,
+        follow_redirects=True,
+        headers={"User-Agent": settings.scrape_user_agent},
+    ) as client:
+        async def fetch(url: str):
+            try:
+                return url, await _fetch(client, url, validators.get(url), host_limits), None
+            except Exception as e:
+                return url, None, e
+
+        # Loads run one at a time in a worker thread while fetches continue.
+        for next_fetch in asyncio.as_completed([fetch(url) for url in owners]):
+            url, response, error = await next_fetch
+            town, *other_towns = owners[url]
+            if error is not None:
+                logger.error("scrape_error", town=town, url=url, error=str(error))
+                result = {"status": "error", "message": str(error)}
+            elif response.status_code == 304:
+                logger.info("scrape_not_modified", town=town, url=url)
+                result = {
+                    "status": "duplicate",
+                    "document_id": validators[url]["document_id"],
+                    "chunks_created": 0,
+                    "not_modified": True,
+                }
+            else:
+                logger.info("scraping_url", town=town, url=url)
+                try:
+                    result = await asyncio.to_thread(
+                        load_document,
+                        source=url,
+                        town=town,
+                        archive_name="Web Archive",
+                        loaded_by=loaded_by,
+                        html=response.text,
+                    )
+                    if result["status"] in ("success", "updated", "duplicate"):
+                        await asyncio.to_thread(
+                            _save_validators, url, response, result["document_id"]
+                        )
+                except Exception as e:
+                    logger.error("scrape_error", town=town, url=url, error=str(e))
+                    result = {"status": "error", "message": str(e)}
+
+            await report(town, url, result)
+            shared = result if result["status"] == "error" else {
+                "status": "duplicate",
+                "document_id": result["document_id"],
+                "chunks_created": 0,
+            }
+            for other in other_towns:
+                await report(other, url, shared)
+
+    for counters in results.values():
+        counters["status"] = "completed"
+    return results
+
+
+def scrape_town(
+    town: str,
+    loaded_by: str = None,
+    on_result: Callable[[dict, str], None] | None = None,
+) -> dict:
     """
     Scrape all known sources for a given town.
 
+    on_result, if given, is called with (load_document result, url) after
+    each source so callers can report progress.
+
     Returns:
         dict with total docs loaded, chunks created, errors
     """
     sources = TOWN_SOURCES.get(town)
     if not sources:
         return {"status": "error", "message": f"Unknown town: {town}"}
-
-    results = {
-        "town": town,
-        "sources_attempted": len(sources),
-        "docs_loaded": 0,
-        "chunks_created": 0,
-        "duplicates": 0,
-        "errors": [],
-    }
-
-    for url in sources:
-        try:
-            logger.info("scraping_url", town=town, url=url)
-            result = load_document(
-                source=url,
-                town=town,
-                archive_name="Web Archive",
-                loaded_by=loaded_by,
-            )
-            if result["status"] == "success":
-                results["docs_loaded"] += 1
-                results["chunks_created"] += result["chunks_created"]
-            elif result["status"] == "duplicate":
-                results["duplicates"] += 1
-        except Exception as e:
-            logger.error("scrape_error", town=town, url=url, error=str(e))
-            results["errors"].append(f"{url}: {str(e)}")
-
-    results["status"] = "completed"
-    return results
+    return asyncio.run(_scrape({town: sources}, loaded_by, on_result))[town]
 
 
-def scrape_all_towns(loaded_by: str = None) -> dict:
-    """Scrape all four Maine towns."""
-    all_results = {}
-    for town in TOWN_SOURCES:
-        logger.info("scraping_town", town=town)
-        all_results[town] = scrape_town(town, loaded_by=loaded_by)
-    return all_results
+def scrape_all_towns(
+    loaded_by: str = None,
+    on_result: Callable[[dict, str], None] | None = None,
+) -> dict:
+    """Scrape all four Maine towns in one concurrent pass."""
+    logger.info("scraping_all_towns", towns=list(TOWN_SOURCES))
+    return asyncio.run(_scrape(TOWN_SOURCES, loaded_by, on_result))
 # end web_scraper.py
@@ -0,0 +1,51 @@
+"""
+Astoria v2 — Ingestion worker process.
+
+    python -m app.worker
+
+Runs the ingestion runs the API queues in ingestion_runs, in a process
+of its own, so parsing, chunking and embedding don't compete with
+queries for the API's CPU, GIL and embedding model. Any number of
+workers can run; each claims pending runs atomically (migration 023).
+Uploads reach the worker through settings.ingest_upload_dir, which it
+must share with the API (a volume in docker-compose.yml).
+"""
+
+import signal
+import threading
+
+from app.core.config import get_settings
+from app.core.logging import get_logger, setup_logging
+from app.services import document_parser, embedding, ingest_jobs
+from app.services.ingest_tasks import JOBS
+
+
+def main() -> None:
+    setup_logging()
+    logger = get_logger()
+    settings = get_settings()
+
+    # Runs a crashed worker left running would never finish
+    try:
+        ingest_jobs.recover_stale_runs()
+    except Exception as e:
+        logger.warning("ingest_recovery_failed", error=str(e))
+
+    embedding.load_model()
+
+    stop = threading.Event()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(sig, lambda *_: stop.set())
+
+    worker = ingest_jobs.Worker(JOBS, settings.ingest_workers)
+    worker.start()
+    logger.info("ingest_worker_started", worker=worker.worker_id, threads=settings.ingest_workers)
+    while not stop.wait(1):
+        pass
+
+    worker.stop()
+    document_parser.shutdown_pdf_pool()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+-- ============================================================
+-- Astoria v2 — Migration 006: Paginated embedding scan
+-- ============================================================
+-- Server-side helpers for scripts/seed_embeddings.py.
+--
+-- PostgREST caps every response at its max-rows setting (1000 on
+-- Supabase), so selecting all documents — or every document_chunks
+-- row to work out which documents are already embedded — silently
+-- truncates on a large corpus. These functions let the script walk
+-- un-embedded documents one keyset page at a time and compute the
+-- "already embedded" set with an anti-join inside the database.
+--
+-- Run in Supabase SQL Editor.
+-- ============================================================
+
+-- 1. Keyset index matching the scan order (title, id)
+CREATE INDEX IF NOT EXISTS idx_documents_title_id
+    ON documents (title, id);
+
+-- 2. One page of documents that have no chunks yet, after (after_title, after_id)
+CREATE OR REPLACE FUNCTION documents_pending_embedding(
+    after_title TEXT DEFAULT NULL,
+    after_id UUID DEFAULT NULL,
+    page_size INT DEFAULT 100
+)
+RETURNS TABLE (
+    id UUID,
+    title TEXT,
+    raw_content TEXT,
+    metadata JSONB
+)
+LANGUAGE sql STABLE
+AS $$
+    SELECT d.id, d.title, d.raw_content, d.metadata
+    FROM documents d
+    WHERE (after_title IS NULL OR (d.title, d.id) > (after_title, after_id))
+      AND NOT EXISTS (
+          SELECT 1 FROM document_chunks dc WHERE dc.document_id = d.id
+      )
+    ORDER BY d.title, d.id
+    LIMIT page_size;
+$$;
+
+-- 3. Corpus-wide progress counters (distinct embedded documents)
+CREATE OR REPLACE FUNCTION embedding_progress()
+RETURNS TABLE (
+    total_documents BIGINT,
+    embedded_documents BIGINT
+)
+LANGUAGE sql STABLE
+AS $$
+    SELECT
+        (SELECT COUNT(*) FROM documents),
+        (SELECT COUNT(*) FROM documents d
+          WHERE EXISTS (SELECT 1 FROM document_chunks dc WHERE dc.document_id = d.id));
+$$;
+
+COMMENT ON FUNCTION documents_pending_embedding IS 'Keyset page of documents without chunks, ordered by (title, id)';
+COMMENT ON FUNCTION embedding_progress IS 'Total vs embedded document counts for seed_embeddings.py';
@@ -0,0 +1,45 @@
+-- ============================================================
+-- Astoria v2 — Migration 007: Ingestion Runs
+-- ============================================================
+-- Persists the state of background ingestion jobs started from
+-- /api/ingest/*. The request returns a run_id immediately; any
+-- backend worker can then report progress from this table via
+-- GET /api/ingest/runs/{run_id} (and its SSE stream).
+--
+-- Run in Supabase SQL Editor.
+-- ============================================================
+
+CREATE TABLE IF NOT EXISTS ingestion_runs (
+    id                  UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    source_id           TEXT NOT NULL,        -- 'upload:<file>', 'url:<url>', 'scrape:<town>', 'scrape-all'
+    status              TEXT NOT NULL DEFAULT 'pending',  -- pending | running | completed | failed
+    documents_processed INTEGER DEFAULT 0,
+    chunks_created      INTEGER DEFAULT 0,
+    duplicates          INTEGER DEFAULT 0,
+    errors              JSONB DEFAULT '[]',
+    result              JSONB,                -- final loader/scraper result payload
+    created_by          UUID REFERENCES auth.users(id),
+    started_at          TIMESTAMPTZ DEFAULT NOW(),
+    updated_at          TIMESTAMPTZ DEFAULT NOW(),
+    completed_at        TIMESTAMPTZ
+);
+
+CREATE INDEX IF NOT EXISTS idx_ingestion_runs_started
+    ON ingestion_runs (started_at DESC);
+
+CREATE INDEX IF NOT EXISTS idx_ingestion_runs_status
+    ON ingestion_runs (status);
+
+CREATE TRIGGER ingestion_runs_updated_at
+    BEFORE UPDATE ON ingestion_runs
+    FOR EACH ROW EXECUTE FUNCTION update_updated_at();
+
+-- Row Level Security: written and read by the backend service role only
+ALTER TABLE ingestion_runs ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "ingestion_runs_service_all"
+    ON ingestion_runs FOR ALL
+    USING (auth.role() = 'service_role')
+    WITH CHECK (auth.role() = 'service_role');
+
+COMMENT ON TABLE ingestion_runs IS 'Background ingestion jobs: status, progress counters, final result';
@@ -0,0 +1,24 @@
+-- ============================================================
+-- Astoria v2 — Migration 008: Streaming ingestion
+-- ============================================================
+-- The loader now streams a document through parse -> chunk ->
+-- embed -> store instead of holding it in memory. raw_content is
+-- written in bounded pieces with this function, so no single
+-- PostgREST request carries the whole text of a large register.
+--
+-- Run in Supabase SQL Editor.
+-- ============================================================
+
+CREATE OR REPLACE FUNCTION append_document_content(
+    p_document_id UUID,
+    p_piece TEXT
+)
+RETURNS VOID
+LANGUAGE sql
+AS $$
+    UPDATE documents
+    SET raw_content = COALESCE(raw_content, '') || p_piece
+    WHERE id = p_document_id;
+$$;
+
+COMMENT ON FUNCTION append_document_content IS 'Append one piece of raw_content during streaming ingestion';
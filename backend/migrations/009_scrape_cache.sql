@@ -0,0 +1,33 @@
+-- ============================================================
+-- Astoria v2 — Migration 009: Scrape cache
+-- ============================================================
+-- HTTP validators for every URL the web scraper has loaded.
+-- The scraper sends them back as If-None-Match / If-Modified-Since,
+-- so a page that has not changed costs a single 304 response and
+-- is never downloaded or parsed again.
+--
+-- Run in Supabase SQL Editor.
+-- ============================================================
+
+CREATE TABLE IF NOT EXISTS scrape_cache (
+    url             TEXT PRIMARY KEY,
+    etag            TEXT,
+    last_modified   TEXT,                 -- raw Last-Modified header value
+    document_id     UUID REFERENCES documents(id) ON DELETE CASCADE,
+    fetched_at      TIMESTAMPTZ DEFAULT NOW(),
+    updated_at      TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE TRIGGER scrape_cache_updated_at
+    BEFORE UPDATE ON scrape_cache
+    FOR EACH ROW EXECUTE FUNCTION update_updated_at();
+
+-- Row Level Security: backend service role only
+ALTER TABLE scrape_cache ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "scrape_cache_service_all"
+    ON scrape_cache FOR ALL
+    USING (auth.role() = 'service_role')
+    WITH CHECK (auth.role() = 'service_role');
+
+COMMENT ON TABLE scrape_cache IS 'ETag / Last-Modified per scraped URL and the document it produced';
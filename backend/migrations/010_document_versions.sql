@@ -0,0 +1,147 @@
+-- ============================================================
+-- Astoria v2 — Migration 010: Versioned documents
+-- ============================================================
+-- Lets the loader re-ingest a changed source as a new version of
+-- the same document instead of a brand-new one:
+--
+--   * documents.version counts re-ingests of a source
+--   * document_chunks.content_hash (SHA-256 of the chunk text) lets
+--     the loader tell which chunks are unchanged
+--   * the new version's chunks and raw text are staged first, then
+--     apply_document_version() swaps them in within one transaction:
+--     unchanged chunks are kept (and renumbered), stale chunks are
+--     retired, new chunks appear — readers never see a mix.
+--
+-- Run in Supabase SQL Editor.
+-- ============================================================
+
+-- 1. Version counter
+ALTER TABLE documents ADD COLUMN IF NOT EXISTS version INTEGER NOT NULL DEFAULT 1;
+
+CREATE INDEX IF NOT EXISTS idx_documents_source_url
+    ON documents (source_url) WHERE source_url IS NOT NULL;
+
+-- 2. Per-chunk content hash, filled by trigger so every writer
+--    (loader, seed_embeddings COPY, SQL) agrees with Python's
+--    hashlib.sha256(content.encode()).hexdigest()
+ALTER TABLE document_chunks ADD COLUMN IF NOT EXISTS content_hash TEXT;
+
+CREATE OR REPLACE FUNCTION set_chunk_content_hash()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.content_hash := encode(sha256(convert_to(NEW.content, 'UTF8')), 'hex');
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS document_chunks_content_hash ON document_chunks;
+CREATE TRIGGER document_chunks_content_hash
+    BEFORE INSERT OR UPDATE OF content ON document_chunks
+    FOR EACH ROW EXECUTE FUNCTION set_chunk_content_hash();
+
+UPDATE document_chunks
+SET content_hash = encode(sha256(convert_to(content, 'UTF8')), 'hex')
+WHERE content_hash IS NULL;
+
+CREATE INDEX IF NOT EXISTS idx_chunks_document_hash
+    ON document_chunks (document_id, content_hash);
+
+-- 3. Staging for a version being prepared
+CREATE TABLE IF NOT EXISTS document_staging (
+    document_id     UUID PRIMARY KEY REFERENCES documents(id) ON DELETE CASCADE,
+    raw_content     TEXT NOT NULL DEFAULT '',
+    created_at      TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE TABLE IF NOT EXISTS document_chunk_staging (
+    document_id     UUID NOT NULL REFERENCES documents(id) ON DELETE CASCADE,
+    chunk_index     INTEGER NOT NULL,
+    content         TEXT NOT NULL,
+    embedding       vector(1024),
+    metadata        JSONB DEFAULT '{}',
+    token_count     INTEGER,
+    PRIMARY KEY (document_id, chunk_index)
+);
+
+ALTER TABLE document_staging ENABLE ROW LEVEL SECURITY;
+ALTER TABLE document_chunk_staging ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "document_staging_service_all"
+    ON document_staging FOR ALL
+    USING (auth.role() = 'service_role')
+    WITH CHECK (auth.role() = 'service_role');
+
+CREATE POLICY "document_chunk_staging_service_all"
+    ON document_chunk_staging FOR ALL
+    USING (auth.role() = 'service_role')
+    WITH CHECK (auth.role() = 'service_role');
+
+-- 4. Append one piece of a staged version's raw text
+CREATE OR REPLACE FUNCTION append_staged_content(
+    p_document_id UUID,
+    p_piece TEXT
+)
+RETURNS VOID
+LANGUAGE sql
+AS $$
+    INSERT INTO document_staging (document_id, raw_content)
+    VALUES (p_document_id, p_piece)
+    ON CONFLICT (document_id)
+    DO UPDATE SET raw_content = document_staging.raw_content || EXCLUDED.raw_content;
+$$;
+
+-- 5. Swap a staged version in
+--    p_reused: [{"id": <chunk uuid>, "chunk_index": <new position>}, ...]
+CREATE OR REPLACE FUNCTION apply_document_version(
+    p_document_id UUID,
+    p_base_version INTEGER,
+    p_checksum TEXT,
+    p_reused JSONB
+)
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_version INTEGER;
+BEGIN
+    SELECT version INTO v_version FROM documents WHERE id = p_document_id FOR UPDATE;
+    IF v_version IS DISTINCT FROM p_base_version THEN
+        RAISE EXCEPTION 'document % is at version %, expected %',
+            p_document_id, v_version, p_base_version;
+    END IF;
+
+    -- Retire chunks that are not part of the new version
+    DELETE FROM document_chunks dc
+    WHERE dc.document_id = p_document_id
+      AND dc.id NOT IN (SELECT (r->>'id')::UUID FROM jsonb_array_elements(p_reused) r);
+
+    -- Renumber kept chunks (via negative indexes to dodge the unique constraint)
+    UPDATE document_chunks SET chunk_index = -1 - chunk_index
+    WHERE document_id = p_document_id;
+
+    UPDATE document_chunks dc SET chunk_index = (r->>'chunk_index')::INTEGER
+    FROM jsonb_array_elements(p_reused) r
+    WHERE dc.id = (r->>'id')::UUID;
+
+    INSERT INTO document_chunks (document_id, chunk_index, content, embedding, metadata, token_count)
+    SELECT document_id, chunk_index, content, embedding, metadata, token_count
+    FROM document_chunk_staging
+    WHERE document_id = p_document_id;
+
+    UPDATE documents d
+    SET version = v_version + 1,
+        checksum = p_checksum,
+        raw_content = s.raw_content
+    FROM document_staging s
+    WHERE d.id = p_document_id AND s.document_id = d.id;
+
+    DELETE FROM document_chunk_staging WHERE document_id = p_document_id;
+    DELETE FROM document_staging WHERE document_id = p_document_id;
+
+    RETURN v_version + 1;
+END;
+$$;
+
+COMMENT ON COLUMN documents.version IS 'Incremented each time a changed source is re-ingested';
+COMMENT ON COLUMN document_chunks.content_hash IS 'SHA-256 (hex) of content, maintained by trigger';
+COMMENT ON FUNCTION apply_document_version IS 'Atomically swap a staged document version in, keeping unchanged chunks';
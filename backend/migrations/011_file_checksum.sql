@@ -0,0 +1,17 @@
+-- ============================================================
+-- Astoria v2 — Migration 011: Raw-file checksum
+-- ============================================================
+-- SHA-256 of an uploaded file's bytes, recorded at ingest. The
+-- loader checks it before parsing, so re-uploading an identical
+-- file (e.g. a several-hundred-page register PDF) is recognised
+-- as a duplicate without extracting a single page.
+--
+-- Run in Supabase SQL Editor.
+-- ============================================================
+
+ALTER TABLE documents ADD COLUMN IF NOT EXISTS file_checksum TEXT;
+
+CREATE INDEX IF NOT EXISTS idx_documents_file_checksum
+    ON documents (file_checksum) WHERE file_checksum IS NOT NULL;
+
+COMMENT ON COLUMN documents.file_checksum IS 'SHA-256 of the original file bytes (NULL for web pages)';
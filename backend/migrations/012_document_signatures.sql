@@ -0,0 +1,32 @@
+-- ============================================================
+-- Astoria v2 — Migration 012: Near-duplicate signatures
+-- ============================================================
+-- One MinHash signature per document (word 5-gram shingles) and its
+-- LSH band keys. The loader looks up documents sharing any band key
+-- with a new one (GIN overlap query), compares signatures, and
+-- merges or flags near-duplicates above NEAR_DUPLICATE_THRESHOLD.
+-- See app/services/near_duplicate.py.
+--
+-- Run in Supabase SQL Editor, then backfill existing documents:
+--   python scripts/backfill_signatures.py
+-- ============================================================
+
+CREATE TABLE IF NOT EXISTS document_signatures (
+    document_id     UUID PRIMARY KEY REFERENCES documents(id) ON DELETE CASCADE,
+    minhash         BIGINT[] NOT NULL,    -- MINHASH_NUM_PERM 32-bit minimums
+    band_keys       TEXT[] NOT NULL,      -- '<band>:<hash of band rows>'
+    created_at      TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_document_signatures_bands
+    ON document_signatures USING GIN (band_keys);
+
+-- Row Level Security: backend service role only
+ALTER TABLE document_signatures ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "document_signatures_service_all"
+    ON document_signatures FOR ALL
+    USING (auth.role() = 'service_role')
+    WITH CHECK (auth.role() = 'service_role');
+
+COMMENT ON TABLE document_signatures IS 'MinHash/LSH signatures for near-duplicate detection at ingest';
@@ -0,0 +1,57 @@
+-- ============================================================
+-- Astoria v2 — Migration 013: Chunk entity tags
+-- ============================================================
+-- The loader tags every new chunk with the vessels and people it
+-- mentions (app/services/entity_tagger.py):
+--   metadata.ship_names  vessel names as in vessel_events / person_roles
+--   metadata.people      person_roles.person_name_normalized values
+-- Seeded register chunks carry a single metadata.ship_name instead.
+-- match_chunks_tagged() searches chunks matching either form, so
+-- vessel and person questions are narrowed for uploaded PDFs and
+-- scraped pages too. Both filters are JSONB containment tests and
+-- use the existing GIN index idx_chunks_metadata.
+--
+-- Run in Supabase SQL Editor, then tag existing chunks:
+--   python scripts/backfill_entity_tags.py
+-- ============================================================
+
+CREATE OR REPLACE FUNCTION match_chunks_tagged(
+    query_embedding vector(1024),
+    vessel TEXT DEFAULT NULL,
+    person TEXT DEFAULT NULL,
+    match_threshold float DEFAULT 0.2,
+    match_count int DEFAULT 20
+)
+RETURNS TABLE (
+    id UUID,
+    document_id UUID,
+    content TEXT,
+    metadata JSONB,
+    similarity float
+)
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    RETURN QUERY
+    SELECT
+        dc.id,
+        dc.document_id,
+        dc.content,
+        dc.metadata,
+        1 - (dc.embedding <=> query_embedding) AS similarity
+    FROM document_chunks dc
+    WHERE (
+            (vessel IS NOT NULL AND (
+                dc.metadata @> jsonb_build_object('ship_name', vessel)
+                OR dc.metadata @> jsonb_build_object('ship_names', jsonb_build_array(vessel))
+            ))
+            OR (person IS NOT NULL AND
+                dc.metadata @> jsonb_build_object('people', jsonb_build_array(person)))
+          )
+      AND 1 - (dc.embedding <=> query_embedding) > match_threshold
+    ORDER BY dc.embedding <=> query_embedding
+    LIMIT match_count;
+END;
+$$;
+
+COMMENT ON FUNCTION match_chunks_tagged IS 'Semantic search over chunks tagged with a vessel (ship_name/ship_names) or person (people)';
@@ -0,0 +1,47 @@
+-- ============================================================
+-- Astoria v2 — Migration 014: Natural keys for bulk loading
+-- ============================================================
+-- The register loader (python -m extraction.load) stages rows with
+-- COPY and merges them with INSERT ... ON CONFLICT, so re-seeding
+-- updates rows in place instead of deleting the table first:
+--   vessel_events  one row per (document, event_index)
+--   person_roles   one row per (document, person, role)
+-- Rows are matched to their vessel documents inside the database
+-- (events by register entry number, roles by vessel name).
+--
+-- Earlier seed runs mapped events by vessel name only, so vessels
+-- sharing a name (e.g. the two "A. Richards") could collect duplicate
+-- rows; the newest of each is kept before the keys are added.
+--
+-- Run in Supabase SQL Editor, then re-seed:
+--   python -m extraction.load vessels events people
+-- ============================================================
+
+-- 1. Drop duplicates left by earlier seed runs
+DELETE FROM vessel_events ve
+USING (
+    SELECT id, ROW_NUMBER() OVER (
+        PARTITION BY document_id, event_index ORDER BY created_at DESC, id
+    ) AS rn
+    FROM vessel_events
+) dup
+WHERE ve.id = dup.id AND dup.rn > 1;
+
+DELETE FROM person_roles pr
+USING (
+    SELECT id, ROW_NUMBER() OVER (
+        PARTITION BY document_id, person_name_normalized, role ORDER BY created_at DESC, id
+    ) AS rn
+    FROM person_roles
+) dup
+WHERE pr.id = dup.id AND dup.rn > 1;
+
+-- 2. Conflict targets for the loader's merge
+CREATE UNIQUE INDEX IF NOT EXISTS uq_vessel_events_doc_index
+    ON vessel_events (document_id, event_index);
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_person_roles_doc_person_role
+    ON person_roles (document_id, person_name_normalized, role);
+
+COMMENT ON INDEX uq_vessel_events_doc_index IS 'Conflict target for extraction.load (one row per event of a vessel document)';
+COMMENT ON INDEX uq_person_roles_doc_person_role IS 'Conflict target for extraction.load (one row per person and role on a vessel document)';
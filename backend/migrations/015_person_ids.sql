@@ -0,0 +1,62 @@
+-- ============================================================
+-- Astoria v2 — Migration 015: Resolved person ids
+-- ============================================================
+-- The extraction's entity-resolution stage (extraction/resolve.py)
+-- gives every person_roles row:
+--   person_key  the name as lowercase letters, one space between
+--               words ("A. A. Lowell" -> 'a a lowell')
+--   person_id   shared by all the name forms taken to be one person
+--               ("A. A. Lowell", "A A Lowell", "Albert A. Lowell")
+-- Person lookups become indexed equality matches: the question's
+-- name -> person_key -> person_id -> every role of that person,
+-- instead of '%name%' ILIKE scans over person_name_normalized.
+-- The career views now group by person_id, so a captain's vessels
+-- are no longer split across spellings of their name.
+--
+-- Run in Supabase SQL Editor, then re-extract and re-seed the people:
+--   python -m extraction all --input vessel_records_raw.txt
+--   python -m extraction.load people
+-- ============================================================
+
+ALTER TABLE person_roles ADD COLUMN IF NOT EXISTS person_key TEXT;
+ALTER TABLE person_roles ADD COLUMN IF NOT EXISTS person_id TEXT;
+
+CREATE INDEX IF NOT EXISTS idx_person_roles_person_key
+    ON person_roles (person_key);
+
+CREATE INDEX IF NOT EXISTS idx_person_roles_person_id
+    ON person_roles (person_id, first_date);
+
+-- Career views: one row per resolved person (rows loaded before this
+-- migration, without a person_id, still group by their own name).
+-- The best-attested spelling names the person; person_id is appended.
+CREATE OR REPLACE VIEW captain_careers AS
+SELECT
+    (ARRAY_AGG(person_name ORDER BY event_count DESC, person_name))[1] AS person_name,
+    (ARRAY_AGG(last_name ORDER BY event_count DESC, person_name))[1] AS last_name,
+    COUNT(DISTINCT vessel_name) AS vessels_commanded,
+    MIN(first_date) AS career_start,
+    MAX(last_date) AS career_end,
+    ARRAY_AGG(DISTINCT vessel_name ORDER BY vessel_name) AS vessel_list,
+    COALESCE(person_id, person_name_normalized) AS person_id
+FROM person_roles
+WHERE role = 'master'
+GROUP BY COALESCE(person_id, person_name_normalized)
+ORDER BY vessels_commanded DESC;
+
+CREATE OR REPLACE VIEW builder_portfolios AS
+SELECT
+    (ARRAY_AGG(pr.person_name ORDER BY pr.event_count DESC, pr.person_name))[1] AS builder,
+    (ARRAY_AGG(pr.last_name ORDER BY pr.event_count DESC, pr.person_name))[1] AS last_name,
+    COUNT(DISTINCT pr.vessel_name) AS vessels_built,
+    ARRAY_AGG(DISTINCT pr.vessel_name ORDER BY pr.vessel_name) AS vessel_list,
+    MIN(pr.first_date) AS first_build,
+    MAX(pr.last_date) AS last_build,
+    COALESCE(pr.person_id, pr.person_name_normalized) AS person_id
+FROM person_roles pr
+WHERE pr.role = 'builder'
+GROUP BY COALESCE(pr.person_id, pr.person_name_normalized)
+ORDER BY vessels_built DESC;
+
+COMMENT ON COLUMN person_roles.person_key IS 'Name as lowercase letters, single spaces (extraction/resolve.py person_key)';
+COMMENT ON COLUMN person_roles.person_id IS 'Resolved person: shared by every name form of one person';
@@ -0,0 +1,72 @@
+-- ============================================================
+-- Astoria v2 — Migration 016: Ship registry view
+-- ============================================================
+-- /api/explore/ships filters and pages ship documents in the
+-- database instead of in Python. ship_registry gives every ship
+-- document typed columns, whichever metadata form it was seeded with
+-- (ship_name/ship_type/tonnage_gross in 002, vessel_name/vessel_type
+-- in 003, ship_name/ship_type/tonnage from extraction.load):
+--   name, name_key    display name; lowercase sort/prefix key (C collation)
+--   ship_type         lowercase vessel type
+--   year_built        integer year, NULL if not a number
+--   hailing_port, port_key   home port; lowercase match key
+--   tonnage           gross tonnage, NULL if not a number
+-- Every column is backed by a partial expression index on documents,
+-- and (name_key, id) is the keyset: a page is "after the last row of
+-- the previous page", one index range scan however deep the page.
+--
+-- Run in Supabase SQL Editor.
+-- ============================================================
+
+-- Numbers in metadata are JSON numbers, or numeric strings in
+-- hand-entered rows; anything else reads as NULL instead of failing.
+CREATE OR REPLACE FUNCTION metadata_number(value JSONB)
+RETURNS NUMERIC
+LANGUAGE sql
+IMMUTABLE
+AS $$
+    SELECT CASE
+        WHEN jsonb_typeof(value) = 'number' THEN value::numeric
+        WHEN jsonb_typeof(value) = 'string' AND value #>> '{}' ~ '^\s*\d+(\.\d+)?\s*$'
+            THEN (value #>> '{}')::numeric
+    END
+$$;
+
+CREATE OR REPLACE VIEW ship_registry AS
+SELECT
+    d.id,
+    d.title,
+    COALESCE(d.metadata->>'ship_name', INITCAP(d.metadata->>'vessel_name'), d.title) AS name,
+    LOWER(COALESCE(d.metadata->>'ship_name', d.metadata->>'vessel_name', d.title)) COLLATE "C" AS name_key,
+    LOWER(COALESCE(d.metadata->>'ship_type', d.metadata->>'vessel_type')) AS ship_type,
+    metadata_number(d.metadata->'year_built')::int AS year_built,
+    d.metadata->>'hailing_port' AS hailing_port,
+    LOWER(d.metadata->>'hailing_port') AS port_key,
+    COALESCE(metadata_number(d.metadata->'tonnage'), metadata_number(d.metadata->'tonnage_gross')) AS tonnage
+FROM documents d
+WHERE d.metadata->>'type' = 'ship';
+
+-- Index expressions repeat the view's column expressions exactly, so
+-- the planner matches them once the view is inlined.
+CREATE INDEX IF NOT EXISTS idx_ship_registry_name
+    ON documents ((LOWER(COALESCE(metadata->>'ship_name', metadata->>'vessel_name', title)) COLLATE "C"), id)
+    WHERE metadata->>'type' = 'ship';
+
+CREATE INDEX IF NOT EXISTS idx_ship_registry_year
+    ON documents ((metadata_number(metadata->'year_built')::int))
+    WHERE metadata->>'type' = 'ship';
+
+CREATE INDEX IF NOT EXISTS idx_ship_registry_type
+    ON documents ((LOWER(COALESCE(metadata->>'ship_type', metadata->>'vessel_type'))))
+    WHERE metadata->>'type' = 'ship';
+
+CREATE INDEX IF NOT EXISTS idx_ship_registry_port
+    ON documents ((LOWER(metadata->>'hailing_port')))
+    WHERE metadata->>'type' = 'ship';
+
+CREATE INDEX IF NOT EXISTS idx_ship_registry_tonnage
+    ON documents ((COALESCE(metadata_number(metadata->'tonnage'), metadata_number(metadata->'tonnage_gross'))))
+    WHERE metadata->>'type' = 'ship';
+
+COMMENT ON VIEW ship_registry IS 'Ship documents with typed, indexed columns; keyset (name_key, id)';
+COMMENT ON FUNCTION metadata_number IS 'JSON number or numeric string as NUMERIC, else NULL';
@@ -0,0 +1,108 @@
+-- ============================================================
+-- Astoria v2 — Migration 017: Voyage legs
+-- ============================================================
+-- /api/explore/voyages browses voyages reconstructed from
+-- vessel_events, not the 'voyage' documents no seed produces.
+-- Each event is a leg arriving at event_port, departing from:
+--   previous_port   when the register says so ("Previously enrolled
+--                   at X"), as in the vessel_voyages view
+--   the vessel's previous event port otherwise (inferred = true);
+--                   a re-enrollment in the same port is not a leg
+-- master is the event's named master, with "(same as previous)"
+-- resolved to the last named one.
+--
+-- Window functions can't be filtered through an index in a plain
+-- view, so voyage_legs is materialized with one index per explorer
+-- filter and a (sort_date, id) keyset index. python -m
+-- extraction.load refreshes it after loading events; refresh by hand
+-- after editing vessel_events otherwise:
+--   REFRESH MATERIALIZED VIEW CONCURRENTLY voyage_legs;
+--
+-- Run in Supabase SQL Editor.
+-- ============================================================
+
+DROP MATERIALIZED VIEW IF EXISTS voyage_legs;
+
+CREATE MATERIALIZED VIEW voyage_legs AS
+WITH ordered AS (
+    SELECT
+        ve.*,
+        LAG(ve.event_port) OVER w AS prior_port,
+        COUNT(NULLIF(ve.master, '(same as previous)')) OVER w AS master_run
+    FROM vessel_events ve
+    WINDOW w AS (PARTITION BY ve.document_id ORDER BY ve.event_index)
+),
+legs AS (
+    SELECT
+        o.id,
+        o.document_id,
+        o.vessel_name,
+        COALESCE(o.previous_port, o.prior_port) AS departed_from,
+        o.event_port AS arrived_at,
+        o.event_date,
+        o.event_type,
+        FIRST_VALUE(NULLIF(o.master, '(same as previous)')) OVER (
+            PARTITION BY o.document_id, o.master_run ORDER BY o.event_index
+        ) AS master,
+        o.doc_number,
+        o.previous_port IS NULL AS inferred
+    FROM ordered o
+)
+SELECT
+    l.*,
+    LOWER(l.vessel_name) AS vessel_key,
+    LOWER(l.departed_from) AS from_key,
+    LOWER(l.arrived_at) AS to_key,
+    LOWER(l.master) AS master_key,
+    COALESCE(l.event_date, 'infinity') AS sort_date     -- undated legs page last
+FROM legs l
+WHERE l.departed_from IS NOT NULL
+  AND l.arrived_at IS NOT NULL
+  AND NOT (l.inferred AND LOWER(l.departed_from) = LOWER(l.arrived_at));
+
+-- CONCURRENTLY refreshes need a unique index
+CREATE UNIQUE INDEX idx_voyage_legs_id ON voyage_legs (id);
+CREATE INDEX idx_voyage_legs_date ON voyage_legs (sort_date, id);
+CREATE INDEX idx_voyage_legs_vessel ON voyage_legs (vessel_key, sort_date, id);
+CREATE INDEX idx_voyage_legs_from ON voyage_legs (from_key, sort_date, id);
+CREATE INDEX idx_voyage_legs_to ON voyage_legs (to_key, sort_date, id);
+CREATE INDEX idx_voyage_legs_master ON voyage_legs (master_key, sort_date, id);
+
+-- Route counts for the explorer's filters, busiest first
+CREATE OR REPLACE FUNCTION voyage_route_counts(
+    vessel TEXT DEFAULT NULL,
+    port TEXT DEFAULT NULL,
+    master_name TEXT DEFAULT NULL,
+    date_from DATE DEFAULT NULL,
+    date_to DATE DEFAULT NULL,
+    route_count INT DEFAULT 20
+)
+RETURNS TABLE (
+    departed_from TEXT,
+    arrived_at TEXT,
+    legs BIGINT,
+    first_date DATE,
+    last_date DATE
+)
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT
+        MIN(vl.departed_from),
+        MIN(vl.arrived_at),
+        COUNT(*),
+        MIN(vl.event_date),
+        MAX(vl.event_date)
+    FROM voyage_legs vl
+    WHERE (vessel IS NULL OR vl.vessel_key = LOWER(vessel))
+      AND (port IS NULL OR vl.from_key = LOWER(port) OR vl.to_key = LOWER(port))
+      AND (master_name IS NULL OR vl.master_key = LOWER(master_name))
+      AND (date_from IS NULL OR vl.event_date >= date_from)
+      AND (date_to IS NULL OR vl.event_date <= date_to)
+    GROUP BY vl.from_key, vl.to_key
+    ORDER BY COUNT(*) DESC, vl.from_key, vl.to_key
+    LIMIT route_count
+$$;
+
+COMMENT ON MATERIALIZED VIEW voyage_legs IS 'Voyage legs from vessel_events (explicit or inferred departure); refreshed by extraction.load';
+COMMENT ON FUNCTION voyage_route_counts IS 'Legs per (departed_from, arrived_at) route for the voyage explorer filters';
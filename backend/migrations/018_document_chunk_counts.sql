@@ -0,0 +1,120 @@
+-- ============================================================
+-- Astoria v2 — Migration 018: Maintained chunk counts
+-- ============================================================
+-- /api/sources showed each document's chunk count by running one
+-- count query per document on the page (up to 200 extra requests).
+-- documents.chunk_count is now kept up to date by statement-level
+-- triggers on document_chunks, so the page is a single select:
+--   - one UPDATE per INSERT/DELETE statement, grouped by document
+--     (a 500-chunk embedding batch is one UPDATE, not 500)
+--   - chunks removed by ON DELETE CASCADE are counted too (their
+--     document row is gone, so the UPDATE simply finds nothing)
+-- documents.updated_at no longer moves when only chunk_count does.
+--
+-- Also adds the keyset indexes for the sources page, newest first,
+-- with or without an archive filter, and archive_facets() for the
+-- page's archive filter list.
+--
+-- Run in Supabase SQL Editor.
+-- ============================================================
+
+-- 1. Column and backfill
+ALTER TABLE documents ADD COLUMN IF NOT EXISTS chunk_count INTEGER NOT NULL DEFAULT 0;
+
+UPDATE documents d
+SET chunk_count = c.n
+FROM (SELECT document_id, COUNT(*) AS n FROM document_chunks GROUP BY document_id) c
+WHERE d.id = c.document_id AND d.chunk_count IS DISTINCT FROM c.n;
+
+-- 2. Triggers
+CREATE OR REPLACE FUNCTION document_chunks_count_insert()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE documents d
+    SET chunk_count = d.chunk_count + c.n
+    FROM (SELECT document_id, COUNT(*) AS n FROM new_chunks GROUP BY document_id) c
+    WHERE d.id = c.document_id;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION document_chunks_count_delete()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE documents d
+    SET chunk_count = GREATEST(d.chunk_count - c.n, 0)
+    FROM (SELECT document_id, COUNT(*) AS n FROM old_chunks GROUP BY document_id) c
+    WHERE d.id = c.document_id;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION document_chunks_count_update()
+RETURNS TRIGGER AS $$
+BEGIN
+    -- only chunks moved to another document change any count
+    UPDATE documents d
+    SET chunk_count = GREATEST(d.chunk_count + c.n, 0)
+    FROM (
+        SELECT document_id, SUM(n) AS n FROM (
+            SELECT document_id, 1 AS n FROM new_chunks
+            UNION ALL
+            SELECT document_id, -1 AS n FROM old_chunks
+        ) moves
+        GROUP BY document_id
+        HAVING SUM(n) <> 0
+    ) c
+    WHERE d.id = c.document_id;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS document_chunks_count_insert ON document_chunks;
+CREATE TRIGGER document_chunks_count_insert
+    AFTER INSERT ON document_chunks
+    REFERENCING NEW TABLE AS new_chunks
+    FOR EACH STATEMENT EXECUTE FUNCTION document_chunks_count_insert();
+
+DROP TRIGGER IF EXISTS document_chunks_count_delete ON document_chunks;
+CREATE TRIGGER document_chunks_count_delete
+    AFTER DELETE ON document_chunks
+    REFERENCING OLD TABLE AS old_chunks
+    FOR EACH STATEMENT EXECUTE FUNCTION document_chunks_count_delete();
+
+DROP TRIGGER IF EXISTS document_chunks_count_update ON document_chunks;
+CREATE TRIGGER document_chunks_count_update
+    AFTER UPDATE ON document_chunks
+    REFERENCING OLD TABLE AS old_chunks NEW TABLE AS new_chunks
+    FOR EACH STATEMENT EXECUTE FUNCTION document_chunks_count_update();
+
+-- updated_at tracks edits to the document itself, not its chunk count
+DROP TRIGGER IF EXISTS documents_updated_at ON documents;
+CREATE TRIGGER documents_updated_at
+    BEFORE UPDATE OF title, source_url, archive_name, content_type, raw_content,
+                     checksum, metadata, ingested_by ON documents
+    FOR EACH ROW EXECUTE FUNCTION update_updated_at();
+
+-- 3. Keyset indexes for the sources page (newest first)
+CREATE INDEX IF NOT EXISTS idx_documents_ingested_id
+    ON documents (ingested_at DESC, id DESC);
+
+CREATE INDEX IF NOT EXISTS idx_documents_archive_ingested_id
+    ON documents (archive_name, ingested_at DESC, id DESC);
+
+-- 4. Archive facet: documents and chunks per archive
+CREATE OR REPLACE FUNCTION archive_facets()
+RETURNS TABLE (
+    archive_name TEXT,
+    documents BIGINT,
+    chunks BIGINT
+)
+LANGUAGE sql STABLE
+AS $$
+    SELECT d.archive_name, COUNT(*), COALESCE(SUM(d.chunk_count), 0)
+    FROM documents d
+    GROUP BY d.archive_name
+    ORDER BY COUNT(*) DESC, d.archive_name;
+$$;
+
+COMMENT ON COLUMN documents.chunk_count IS 'Rows in document_chunks for this document (maintained by triggers)';
+COMMENT ON FUNCTION archive_facets IS 'Documents and chunks per archive_name, for the sources archive filter';
@@ -0,0 +1,31 @@
+-- ============================================================
+-- Astoria v2 — Migration 019: Raw text slices
+-- ============================================================
+-- /api/sources/{id} no longer returns a document's whole raw_content
+-- (megabytes for a register PDF). The text is read a slice at a time
+-- through /api/sources/{id}/raw, which calls document_raw_slice():
+-- the substring is cut inside the database, so only the slice
+-- crosses the wire, and the total length comes back with it.
+--
+-- Run in Supabase SQL Editor.
+-- ============================================================
+
+CREATE OR REPLACE FUNCTION document_raw_slice(
+    doc_id UUID,
+    start_at INT DEFAULT 0,         -- 0-based character offset
+    slice_length INT DEFAULT 65536
+)
+RETURNS TABLE (
+    content TEXT,
+    total_length INT
+)
+LANGUAGE sql STABLE
+AS $$
+    SELECT
+        SUBSTR(COALESCE(d.raw_content, ''), GREATEST(start_at, 0) + 1, GREATEST(slice_length, 0)),
+        COALESCE(LENGTH(d.raw_content), 0)
+    FROM documents d
+    WHERE d.id = doc_id;
+$$;
+
+COMMENT ON FUNCTION document_raw_slice IS 'slice_length characters of raw_content from start_at (0-based), with its total length';
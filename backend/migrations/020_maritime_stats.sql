@@ -0,0 +1,141 @@
+-- ============================================================
+-- Astoria v2 — Migration 020: Maritime statistics cube
+-- ============================================================
+-- Dashboard questions (vessels per decade, tonnage by type, top
+-- builders, busiest ports, enrolled vs registered per decade) were
+-- answered by LLM-written SQL over documents.metadata every time.
+-- maritime_stats precomputes them as rollups, one row per cell:
+--
+--   kind 'vessels'  one fact per ship document (ship_registry)
+--       dims: decade (built), vessel_type, place_built, hailing_port
+--             (full cube), builder and builder x decade
+--       measures: vessels, tonnage_total, tonnage_avg
+--   kind 'events'   one fact per vessel_events row
+--       dims: decade (of the event), vessel_type, event_type, port
+--             (event_port), full cube
+--       measures: events, vessels (distinct documents)
+--
+-- dims lists the grouped dimensions of the row in canonical order
+-- (decade, vessel_type, place_built, hailing_port, builder,
+-- event_type, port); '' is the grand total. A dimension not in dims
+-- is rolled up, so "vessels per decade for schooners" is
+--   WHERE kind = 'vessels' AND dims = 'decade,vessel_type'
+--     AND vessel_type = 'schooner'
+--
+-- Place, port and builder names are grouped by a lowercase key
+-- (place_built_key, hailing_port_key, builder_key, port_key, as
+-- ship_registry.port_key in 016), so 'Machias' and 'MACHIAS' are one
+-- cell; the display column is the key's most common spelling. Filter
+-- on the key: AND hailing_port_key = 'machias'. vessel_type and
+-- event_type are lowercase already.
+--
+-- Served by GET /api/explore/stats and the NL2SQL fast path
+-- (app/services/stats.py). Refreshed by python -m extraction.load
+-- and after ingestion runs, via refresh_maritime_stats().
+-- Needs migration 016 (ship_registry).
+--
+-- Run in Supabase SQL Editor.
+-- ============================================================
+
+DROP MATERIALIZED VIEW IF EXISTS maritime_stats;
+
+CREATE MATERIALIZED VIEW maritime_stats AS
+WITH vessel_facts AS (
+    SELECT
+        (sr.year_built / 10) * 10 AS decade,
+        sr.ship_type AS vessel_type,
+        d.metadata->>'place_built' AS place_built,
+        LOWER(d.metadata->>'place_built') AS place_built_key,
+        sr.hailing_port,
+        sr.port_key AS hailing_port_key,
+        d.metadata->>'builder' AS builder,
+        LOWER(d.metadata->>'builder') AS builder_key,
+        sr.tonnage
+    FROM ship_registry sr
+    JOIN documents d ON d.id = sr.id
+),
+event_facts AS (
+    SELECT
+        (EXTRACT(YEAR FROM ve.event_date)::int / 10) * 10 AS decade,
+        sr.ship_type AS vessel_type,
+        ve.event_type,
+        ve.event_port AS port,
+        LOWER(ve.event_port) AS port_key,
+        ve.document_id
+    FROM vessel_events ve
+    LEFT JOIN ship_registry sr ON sr.id = ve.document_id
+),
+cells AS (
+    SELECT
+        'vessels' AS kind,
+        CONCAT_WS(',',
+            CASE WHEN GROUPING(decade) = 0 THEN 'decade' END,
+            CASE WHEN GROUPING(vessel_type) = 0 THEN 'vessel_type' END,
+            CASE WHEN GROUPING(place_built_key) = 0 THEN 'place_built' END,
+            CASE WHEN GROUPING(hailing_port_key) = 0 THEN 'hailing_port' END,
+            CASE WHEN GROUPING(builder_key) = 0 THEN 'builder' END) AS dims,
+        decade, vessel_type,
+        CASE WHEN GROUPING(place_built_key) = 0
+             THEN MODE() WITHIN GROUP (ORDER BY place_built) END AS place_built,
+        CASE WHEN GROUPING(hailing_port_key) = 0
+             THEN MODE() WITHIN GROUP (ORDER BY hailing_port) END AS hailing_port,
+        CASE WHEN GROUPING(builder_key) = 0
+             THEN MODE() WITHIN GROUP (ORDER BY builder) END AS builder,
+        NULL::text AS event_type, NULL::text AS port,
+        place_built_key, hailing_port_key, builder_key, NULL::text AS port_key,
+        COUNT(*) AS vessels,
+        NULL::bigint AS events,
+        ROUND(SUM(tonnage), 2) AS tonnage_total,
+        ROUND(AVG(tonnage), 2) AS tonnage_avg
+    FROM vessel_facts
+    GROUP BY GROUPING SETS (
+        CUBE (decade, vessel_type, place_built_key, hailing_port_key),
+        (builder_key),
+        (decade, builder_key)
+    )
+    UNION ALL
+    SELECT
+        'events',
+        CONCAT_WS(',',
+            CASE WHEN GROUPING(decade) = 0 THEN 'decade' END,
+            CASE WHEN GROUPING(vessel_type) = 0 THEN 'vessel_type' END,
+            CASE WHEN GROUPING(event_type) = 0 THEN 'event_type' END,
+            CASE WHEN GROUPING(port_key) = 0 THEN 'port' END),
+        decade, vessel_type, NULL, NULL, NULL,
+        event_type,
+        CASE WHEN GROUPING(port_key) = 0 THEN MODE() WITHIN GROUP (ORDER BY port) END,
+        NULL, NULL, NULL, port_key,
+        COUNT(DISTINCT document_id),
+        COUNT(*),
+        NULL, NULL
+    FROM event_facts
+    GROUP BY CUBE (decade, vessel_type, event_type, port_key)
+)
+SELECT
+    -- one key per cell (a grouped NULL, e.g. unknown decade, stays distinct
+    -- from a rolled-up dimension because dims differs)
+    jsonb_build_array(kind, dims, decade, vessel_type, place_built_key, hailing_port_key,
+                      builder_key, event_type, port_key)::text AS cell,
+    cells.*
+FROM cells;
+
+-- CONCURRENTLY refreshes need a unique index on plain columns
+CREATE UNIQUE INDEX idx_maritime_stats_cell ON maritime_stats (cell);
+CREATE INDEX idx_maritime_stats_dims ON maritime_stats (kind, dims);
+
+-- Runs as the view's owner (REFRESH needs ownership), so it pins
+-- search_path and only the service role (loader, ingestion) may call it.
+CREATE OR REPLACE FUNCTION refresh_maritime_stats()
+RETURNS void
+LANGUAGE sql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+    REFRESH MATERIALIZED VIEW CONCURRENTLY maritime_stats;
+$$;
+
+REVOKE EXECUTE ON FUNCTION refresh_maritime_stats() FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION refresh_maritime_stats() TO service_role;
+
+COMMENT ON MATERIALIZED VIEW maritime_stats IS 'Rollups of vessels and vessel events; dims lists the grouped dimensions of each row, names are grouped by their *_key';
+COMMENT ON FUNCTION refresh_maritime_stats IS 'Refresh maritime_stats (after seeding or ingestion)';
@@ -0,0 +1,43 @@
+-- ============================================================
+-- Astoria v2 — Migration 021: Person lookup keys
+-- ============================================================
+-- Migration 015 made person_roles lookups indexed equality matches
+-- on person_key and person_id, but a person's voyages were still
+-- found with master ILIKE '%name%' over vessel_events, for one form
+-- of the name, and partial names ("Ingalls") with an ILIKE scan of
+-- person_roles. Two generated, indexed keys replace both:
+--   vessel_events.master_key   person_key(master): a person's events
+--       are master_key = ANY(the person_keys of every form of their
+--       name), so "A . A . Lowell" and "A. A. Lowell" both match
+--   person_roles.last_key      person_key(last_name), for questions
+--       that name only a surname
+-- person_key() is extraction/resolve.py person_key in SQL: the name
+-- as lowercase letters, one space between words.
+--
+-- Run in Supabase SQL Editor. The columns fill themselves; nothing
+-- needs re-seeding.
+-- ============================================================
+
+CREATE OR REPLACE FUNCTION person_key(name TEXT)
+RETURNS TEXT
+LANGUAGE sql
+IMMUTABLE
+AS $$
+    SELECT NULLIF(BTRIM(REGEXP_REPLACE(LOWER(name), '[^a-z]+', ' ', 'g')), '')
+$$;
+
+ALTER TABLE vessel_events
+    ADD COLUMN IF NOT EXISTS master_key TEXT GENERATED ALWAYS AS (person_key(master)) STORED;
+
+ALTER TABLE person_roles
+    ADD COLUMN IF NOT EXISTS last_key TEXT GENERATED ALWAYS AS (person_key(last_name)) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_vessel_events_master_key
+    ON vessel_events (master_key, event_date);
+
+CREATE INDEX IF NOT EXISTS idx_person_roles_last_key
+    ON person_roles (last_key);
+
+COMMENT ON FUNCTION person_key IS 'Name as lowercase letters, single spaces (extraction/resolve.py person_key)';
+COMMENT ON COLUMN vessel_events.master_key IS 'person_key(master), matched against person_roles.person_key';
+COMMENT ON COLUMN person_roles.last_key IS 'person_key(last_name), for surname-only lookups';
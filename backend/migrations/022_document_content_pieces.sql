@@ -0,0 +1,114 @@
+-- ============================================================
+-- Astoria v2 — Migration 022: Staged raw_content pieces
+-- ============================================================
+-- append_document_content (008) and append_staged_content (010)
+-- grew raw_content with `raw_content || piece`, one call per piece.
+-- Every call rewrote the whole TOASTed value so far, so storing a
+-- document of n pieces wrote O(n^2) bytes.
+--
+-- The loader now inserts each piece as its own row of
+-- document_content_pieces, keyed by (document_id, seq). The call that
+-- finalizes the document joins the pieces once and clears them:
+--   finalize_document_content()  new documents
+--   apply_document_version()     new versions (replaces 010's)
+-- raw_content is written once, and readers never see half of it.
+-- document_staging.raw_content is no longer used.
+--
+-- Run in Supabase SQL Editor.
+-- ============================================================
+
+CREATE TABLE IF NOT EXISTS document_content_pieces (
+    document_id     UUID NOT NULL REFERENCES documents(id) ON DELETE CASCADE,
+    seq             INTEGER NOT NULL,
+    piece           TEXT NOT NULL,
+    PRIMARY KEY (document_id, seq)
+);
+
+ALTER TABLE document_content_pieces ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "document_content_pieces_service_all"
+    ON document_content_pieces FOR ALL
+    USING (auth.role() = 'service_role')
+    WITH CHECK (auth.role() = 'service_role');
+
+-- Pieces joined in seq order; '' when there are none
+CREATE OR REPLACE FUNCTION staged_document_content(p_document_id UUID)
+RETURNS TEXT
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT COALESCE(STRING_AGG(piece, '' ORDER BY seq), '')
+    FROM document_content_pieces
+    WHERE document_id = p_document_id;
+$$;
+
+-- New document: write its raw_content from the staged pieces
+CREATE OR REPLACE FUNCTION finalize_document_content(p_document_id UUID)
+RETURNS VOID
+LANGUAGE sql
+AS $$
+    UPDATE documents
+    SET raw_content = staged_document_content(p_document_id)
+    WHERE id = p_document_id;
+
+    DELETE FROM document_content_pieces WHERE document_id = p_document_id;
+$$;
+
+-- New version: as in 010, with raw_content from the staged pieces
+--    p_reused: [{"id": <chunk uuid>, "chunk_index": <new position>}, ...]
+CREATE OR REPLACE FUNCTION apply_document_version(
+    p_document_id UUID,
+    p_base_version INTEGER,
+    p_checksum TEXT,
+    p_reused JSONB
+)
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_version INTEGER;
+BEGIN
+    SELECT version INTO v_version FROM documents WHERE id = p_document_id FOR UPDATE;
+    IF v_version IS DISTINCT FROM p_base_version THEN
+        RAISE EXCEPTION 'document % is at version %, expected %',
+            p_document_id, v_version, p_base_version;
+    END IF;
+
+    -- Retire chunks that are not part of the new version
+    DELETE FROM document_chunks dc
+    WHERE dc.document_id = p_document_id
+      AND dc.id NOT IN (SELECT (r->>'id')::UUID FROM jsonb_array_elements(p_reused) r);
+
+    -- Renumber kept chunks (via negative indexes to dodge the unique constraint)
+    UPDATE document_chunks SET chunk_index = -1 - chunk_index
+    WHERE document_id = p_document_id;
+
+    UPDATE document_chunks dc SET chunk_index = (r->>'chunk_index')::INTEGER
+    FROM jsonb_array_elements(p_reused) r
+    WHERE dc.id = (r->>'id')::UUID;
+
+    INSERT INTO document_chunks (document_id, chunk_index, content, embedding, metadata, token_count)
+    SELECT document_id, chunk_index, content, embedding, metadata, token_count
+    FROM document_chunk_staging
+    WHERE document_id = p_document_id;
+
+    UPDATE documents
+    SET version = v_version + 1,
+        checksum = p_checksum,
+        raw_content = staged_document_content(p_document_id)
+    WHERE id = p_document_id;
+
+    DELETE FROM document_chunk_staging WHERE document_id = p_document_id;
+    DELETE FROM document_content_pieces WHERE document_id = p_document_id;
+    DELETE FROM document_staging WHERE document_id = p_document_id;
+
+    RETURN v_version + 1;
+END;
+$$;
+
+DROP FUNCTION IF EXISTS append_document_content(UUID, TEXT);
+DROP FUNCTION IF EXISTS append_staged_content(UUID, TEXT);
+
+COMMENT ON TABLE document_content_pieces IS 'raw_content of a document being ingested, one row per piece until finalized';
+COMMENT ON FUNCTION finalize_document_content IS 'Write a new document''s raw_content from its staged pieces, once';
+COMMENT ON FUNCTION apply_document_version IS 'Atomically swap a staged document version in, keeping unchanged chunks';
@@ -0,0 +1,45 @@
+-- ============================================================
+-- Astoria v2 — Migration 023: Ingestion worker queue
+-- ============================================================
+-- Ingestion runs used to execute on threads inside the API process,
+-- sharing its CPU, GIL and embedding model with queries. The API now
+-- only queues a run: its job is stored on the row, and the ingestion
+-- worker process (python -m app.worker) claims and runs it.
+--   job      {"kind": "load" | "batch" | "scrape" | "scrape_all",
+--             "params": {...}, "upload": <file path> | null}
+--   worker   host:pid of the worker that claimed the run
+-- claim_ingestion_run() hands each pending run to exactly one worker
+-- (FOR UPDATE SKIP LOCKED), oldest first.
+--
+-- Run in Supabase SQL Editor.
+-- ============================================================
+
+ALTER TABLE ingestion_runs ADD COLUMN IF NOT EXISTS job JSONB;
+ALTER TABLE ingestion_runs ADD COLUMN IF NOT EXISTS worker TEXT;
+
+CREATE INDEX IF NOT EXISTS idx_ingestion_runs_pending
+    ON ingestion_runs (started_at)
+    WHERE status = 'pending';
+
+CREATE OR REPLACE FUNCTION claim_ingestion_run(p_worker TEXT)
+RETURNS SETOF ingestion_runs
+LANGUAGE sql
+AS $$
+    UPDATE ingestion_runs
+    SET status = 'running', worker = p_worker
+    WHERE id = (
+        SELECT id FROM ingestion_runs
+        WHERE status = 'pending' AND job IS NOT NULL
+        ORDER BY started_at
+        LIMIT 1
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING *;
+$$;
+
+REVOKE EXECUTE ON FUNCTION claim_ingestion_run(TEXT) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION claim_ingestion_run(TEXT) TO service_role;
+
+COMMENT ON COLUMN ingestion_runs.job IS 'Job the worker runs: kind, JSON params, and the uploaded file it owns';
+COMMENT ON COLUMN ingestion_runs.worker IS 'Ingestion worker (host:pid) that claimed the run';
+COMMENT ON FUNCTION claim_ingestion_run IS 'Mark the oldest pending run running for one worker and return it';
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+# File: backend/scripts/backfill_entity_tags.py
+# Astoria v2 — Backfill chunk entity tags
+#
+# Tags existing document_chunks with the vessels and people they mention
+# (metadata.ship_names / metadata.people, migration 013), as the loader
+# now does for new chunks. Re-run after loading new vessel_events or
+# person_roles so older chunks pick up the new names.
+#
+# Usage:
+#   From project root:
+#     sudo docker compose exec backend python -m scripts.backfill_entity_tags
+#
+#   Options:
+#     --page-size N    chunks fetched per keyset page (default 500)
+#     --dry-run        count the chunks that would change, write nothing
+#
+# Environment: the backend's own settings (.env), as for the API.
+#
+# end of header
+"""
+
+import argparse
+import os
+import sys
+
+# Add backend directory to path so we can import app modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+load_dotenv()
+
+from app.core.config import get_settings
+from app.core.supabase import get_supabase_admin
+from app.services.entity_tagger import PERSON, VESSEL, load_tagger
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill chunk entity tags")
+    parser.add_argument("--page-size", type=int, default=500,
+                        help="chunks fetched per keyset page (default 500)")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="count the chunks that would change, write nothing")
+    args = parser.parse_args()
+
+    settings = get_settings()
+    supabase = get_supabase_admin()
+    chunks = supabase.schema(settings.db_schema).table("document_chunks")
+    tagger = load_tagger(supabase)
+    print(f"Tagger: {tagger.size} names")
+
+    last_id = None
+    seen = changed = 0
+    while True:
+        query = chunks.select("id, content, metadata").order("id").limit(args.page_size)
+        if last_id:
+            query = query.gt("id", last_id)
+        rows = query.execute().data
+        if not rows:
+            break
+        for row in rows:
+            metadata = row["metadata"] or {}
+            untagged = {k: v for k, v in metadata.items() if k not in (VESSEL, PERSON)}
+            updated = {**untagged, **tagger.tag(row["content"])}
+            if updated != metadata:
+                changed += 1
+                if not args.dry_run:
+                    chunks.update({"metadata": updated}).eq("id", row["id"]).execute()
+        seen += len(rows)
+        last_id = rows[-1]["id"]
+        print(f"  {seen} chunks read, {changed} retagged")
+
+    verb = "would be retagged" if args.dry_run else "retagged"
+    print(f"\nDone: {changed} of {seen} chunks {verb}.")
+
+
+if __name__ == "__main__":
+    main()
+# end backfill_entity_tags.py
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+# File: backend/scripts/backfill_signatures.py
+# Astoria v2 — Backfill near-duplicate signatures
+#
+# Computes the MinHash signature and LSH band keys of every document's
+# raw_content and upserts them into document_signatures (migration 012),
+# so documents ingested before near-duplicate detection existed can be
+# matched against. Re-run after changing MINHASH_NUM_PERM / MINHASH_BANDS.
+#
+# Usage:
+#   From project root:
+#     sudo docker compose exec backend python -m scripts.backfill_signatures
+#
+#   Options:
+#     --page-size N    documents fetched per keyset page (default 20)
+#
+# Environment: the backend's own settings (.env), as for the API.
+#
+# end of header
+"""
+
+import argparse
+import os
+import sys
+
+# Add backend directory to path so we can import app modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+load_dotenv()
+
+from app.core.config import get_settings
+from app.core.supabase import get_supabase_admin
+from app.services import near_duplicate
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill near-duplicate signatures")
+    parser.add_argument("--page-size", type=int, default=20,
+                        help="documents fetched per keyset page (default 20)")
+    args = parser.parse_args()
+
+    settings = get_settings()
+    supabase = get_supabase_admin()
+    documents = supabase.schema(settings.db_schema).table("documents")
+
+    last_id = None
+    done = empty = 0
+    while True:
+        query = documents.select("id, title, raw_content").order("id").limit(args.page_size)
+        if last_id:
+            query = query.gt("id", last_id)
+        rows = query.execute().data
+        if not rows:
+            break
+        for row in rows:
+            signature = near_duplicate.signature([row["raw_content"] or ""])
+            if signature is None:
+                empty += 1
+                continue
+            near_duplicate.save_signature(supabase, row["id"], signature)
+            done += 1
+        last_id = rows[-1]["id"]
+        print(f"  {done} signed, {empty} without text (last: {rows[-1]['title'][:50]})")
+
+    print(f"\nDone: {done} signatures written, {empty} documents without text.")
+
+
+if __name__ == "__main__":
+    main()
+# end backfill_signatures.py
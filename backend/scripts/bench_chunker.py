@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+# File: backend/scripts/bench_chunker.py
+# Astoria v2 — Chunker benchmark
+#
+# Runs app.services.chunking over the Machias register text and reports
+# throughput (chunks/s, MB/s) and the chunk size distribution in tokens.
+# Also re-chunks the text streamed in small pieces and checks the output
+# is identical (determinism / stable chunk hashes).
+#
+# Usage:
+#   From backend/:
+#     python scripts/bench_chunker.py --file /path/to/vessel_records_raw.txt
+#     python scripts/bench_chunker.py --repeat 50      # seed registers x50
+#
+#   Options:
+#     --file F       raw register text (default: the register entries seeded
+#                    by migrations 002/003)
+#     --repeat N     concatenate the text N times (default 1)
+#     --target N     target tokens per chunk (default 400)
+#     --overlap N    overlap tokens (default 50)
+#     --approx       skip the model tokenizer and use approximate counts
+#
+# end of header
+"""
+
+import argparse
+import hashlib
+import os
+import re
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Add backend directory to path so we can import app modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.chunking import E5_MAX_TOKENS, TokenCounter, get_token_counter, iter_chunks
+
+MIGRATIONS = Path(__file__).resolve().parent.parent / "migrations"
+SEED_TEXT = re.compile(r"'text',\s*'((?:[^']|'')*)'")
+
+
+def seed_register_text() -> str:
+    """Register entries from the seed migrations, one paragraph each."""
+    entries = []
+    for name in ("002_maritime_seed_data.sql", "003_expanded_seed_data.sql"):
+        sql = (MIGRATIONS / name).read_text(encoding="utf-8")
+        entries += [m.replace("''", "'") for m in SEED_TEXT.findall(sql)]
+    return "\n\n".join(entries)
+
+
+def percentile(values: list[int], p: float) -> int:
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the passage chunker")
+    parser.add_argument("--file", help="raw register text file")
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--target", type=int, default=400)
+    parser.add_argument("--overlap", type=int, default=50)
+    parser.add_argument("--approx", action="store_true")
+    args = parser.parse_args()
+
+    text = Path(args.file).read_text(encoding="utf-8", errors="ignore") if args.file \
+        else seed_register_text()
+    text = "\n\n".join([text] * args.repeat)
+    model = os.getenv("EMBEDDING_MODEL", "intfloat/e5-large-v2")
+    counter = TokenCounter() if args.approx else get_token_counter(model)
+
+    def run(pieces):
+        return list(iter_chunks(pieces, args.target, args.overlap, counter))
+
+    run([text[:10_000]])     # warm the word-count cache and regexes
+    started = time.perf_counter()
+    chunks = run([text])
+    elapsed = time.perf_counter() - started
+
+    streamed = run(text[i:i + 4096] for i in range(0, len(text), 4096))
+    digest = lambda cs: hashlib.sha256("\0".join(c.text for c in cs).encode()).hexdigest()
+
+    sizes = sorted(c.token_count for c in chunks)
+    mb = len(text.encode()) / 1e6
+    print(f"Input:       {mb:.2f} MB ({len(text):,} chars), "
+          f"{'exact' if counter.exact else 'approximate'} token counts")
+    print(f"Chunks:      {len(chunks):,} in {elapsed:.3f}s "
+          f"= {len(chunks) / elapsed:,.0f} chunks/s, {mb / elapsed:.2f} MB/s")
+    print(f"Tokens:      min {sizes[0]}  p10 {percentile(sizes, 0.1)}  "
+          f"p50 {percentile(sizes, 0.5)}  p90 {percentile(sizes, 0.9)}  max {sizes[-1]}  "
+          f"mean {statistics.mean(sizes):.0f}")
+    print(f"Over limit:  {sum(s > E5_MAX_TOKENS for s in sizes)} chunks > {E5_MAX_TOKENS} tokens")
+    print(f"Stable:      {'yes' if digest(chunks) == digest(streamed) else 'NO'} "
+          f"(whole text vs 4 KB streamed pieces)")
+
+
+if __name__ == "__main__":
+    main()
+# end bench_chunker.py
@@ -3,38 +3,65 @@
 # File: backend/scripts/seed_embeddings.py
 # Astoria v2 — Seed Embeddings Script
 #
-# Reads all documents from Supabase, chunks their raw_content,
+# Streams un-embedded documents from Supabase, chunks their raw_content,
 # generates embeddings using E5-large-v2, and inserts into document_chunks.
 #
 # KEY BEHAVIOR:
 #   - ALWAYS skips documents that already have embeddings — safe to re-run anytime
-#   - Processes documents in alphabetical order by title
-#   - Reports skipped, processed, and errored counts at the end
+#   - Processes documents in alphabetical order by title, one keyset page
+#     at a time (requires migration 006) — constant memory at any corpus size
+#   - Consults the on-disk embedding cache first — chunk text embedded by
+#     any earlier run (or by the API) is not re-encoded
+#   - Shards chunk embedding across a process pool (one model per worker)
+#     while a writer thread bulk-loads finished documents with COPY
+#   - Reports skipped, processed, errored counts and throughput (chunks/s)
 #
 # Usage:
 #   From project root:
 #     sudo docker compose exec backend python -m scripts.seed_embeddings
+#     sudo docker compose exec backend python -m scripts.seed_embeddings --workers 4
+#
+#   Options:
+#     --workers N      embedding processes (default: CPU cores; 1 = in-process)
+#     --batch-size N   chunks per embedding task (default 64)
+#     --page-size N    documents fetched per keyset page (default 50)
+#
+#   Each worker loads its own copy of the model (~1.5GB RAM) — size --workers
+#   to memory as well as cores.
 #
 #   If interrupted, just re-run — already embedded docs are skipped automatically.
 #
 # Environment (from .env — single source of truth):
 #   SUPABASE_URL              — Supabase project URL
 #   SUPABASE_SERVICE_ROLE_KEY — Supabase service role key (admin access)
+#   DATABASE_URL              — direct Postgres URL; enables COPY bulk inserts
+#                               (falls back to PostgREST batches when unset)
 #   EMBEDDING_MODEL           — defaults to intfloat/e5-large-v2
 #   DB_SCHEMA                 — defaults to public
+#   EMBEDDING_CACHE_DIR       — defaults to data/embedding_cache ("" disables)
+#   EMBEDDING_CACHE_DTYPE     — defaults to float16
+#   CHUNK_TARGET_TOKENS       — defaults to 400 (same chunker as the API loader)
+#   CHUNK_OVERLAP_TOKENS      — defaults to 50
 #
 # Architecture Decision:
 #   Option A (chosen): Embeddings generated inside Docker container.
 #   Reason: E5-large-v2 model already loaded at startup, no extra
 #   infrastructure needed, consistent results, free to run.
-#   Option B (future): Direct psycopg2 + pgvector outside Docker.
-#   Consider when: embedding volume exceeds 100k chunks or GPU needed.
+#   Option B (partial): Direct psycopg + pgvector for the writes.
+#   COPY over DATABASE_URL is used for chunk inserts; reads stay on PostgREST.
 #
 # end of header
 """
 
+import argparse
+import json
+import multiprocessing
 import os
+import queue
 import sys
+import threading
+import time
+from collections import deque
 
 # Add backend directory to path so we can import app modules
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -42,17 +69,27 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from dotenv import load_dotenv
 load_dotenv()
 
+import numpy as np
 from supabase import create_client
 from sentence_transformers import SentenceTransformer
 
+from app.services.chunking import chunk_text, get_token_counter
+from app.services.embedding_cache import EmbeddingCache
+
 # ── Configuration from .env ────────────────────────────────────
 
 EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "intfloat/e5-large-v2")
 DB_SCHEMA       = os.getenv("DB_SCHEMA", "public")
-CHUNK_SIZE      = 500   # target characters per chunk
-CHUNK_OVERLAP   = 50    # overlap between consecutive chunks
+CHUNK_TOKENS    = int(os.getenv("CHUNK_TARGET_TOKENS", "400"))
+CHUNK_OVERLAP   = int(os.getenv("CHUNK_OVERLAP_TOKENS", "50"))
 SUPABASE_URL    = os.getenv("SUPABASE_URL")
 SUPABASE_KEY    = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
+DATABASE_URL    = os.getenv("DATABASE_URL", "")
+EMBEDDING_DIM   = int(os.getenv("EMBEDDING_DIMENSION", "1024"))
+CACHE_DIR       = os.getenv("EMBEDDING_CACHE_DIR", "data/embedding_cache")
+CACHE_DTYPE     = os.getenv("EMBEDDING_CACHE_DTYPE", "float16")
+POSTGREST_BATCH = 20    # rows per PostgREST insert (Supabase request size limit)
+COPY_FLUSH_ROWS = 2000  # rows per COPY transaction
 
 
 def get_supabase():
@@ -63,155 +100,318 @@ def get_supabase():
     return create_client(SUPABASE_URL, SUPABASE_KEY)
 
 
-def chunk_text(text: str, chunk_size: int = CHUNK_SIZE, overlap: int = CHUNK_OVERLAP) -> list[str]:
-    """Split text into overlapping chunks at sentence boundaries.
+# ── Embedding workers ──────────────────────────────────────────
+#
+# Each worker process loads its own SentenceTransformer once and then
+# encodes batches of already-prefixed passages. Torch threads are split
+# across workers so the pool does not oversubscribe the cores.
 
-    Tries to split at periods/newlines to keep sentences intact.
-    Falls back to character splitting if sentences are too long.
-    """
-    if not text or len(text) <= chunk_size:
-        return [text] if text else []
+_worker_model = None
 
-    chunks = []
-    start = 0
 
-    while start < len(text):
-        end = start + chunk_size
+def _init_worker(model_name: str, torch_threads: int) -> None:
+    global _worker_model
+    import torch
+    torch.set_num_threads(torch_threads)
+    _worker_model = SentenceTransformer(model_name)
 
-        if end >= len(text):
-            chunks.append(text[start:].strip())
-            break
 
-        best_break = -1
-        for sep in ['. ', '.\n', '\n\n', '\n', '; ', ', ']:
-            pos = text.rfind(sep, start + chunk_size // 2, end + 50)
-            if pos > start:
-                best_break = pos + len(sep)
-                break
+def _encode_batch(texts: list[str]):
+    return _worker_model.encode(texts, normalize_embeddings=True, show_progress_bar=False)
 
-        if best_break > start:
-            chunks.append(text[start:best_break].strip())
-            start = best_break - overlap
+
+class Encoder:
+    """Runs embedding batches in-process (workers=1) or on a process pool."""
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self._model = None
+        self._pool = None
+        if workers <= 1:
+            self._model = SentenceTransformer(EMBEDDING_MODEL)
         else:
-            chunks.append(text[start:end].strip())
-            start = end - overlap
+            threads = max(1, (os.cpu_count() or 1) // workers)
+            ctx = multiprocessing.get_context("spawn")
+            self._pool = ctx.Pool(workers, initializer=_init_worker, initargs=(EMBEDDING_MODEL, threads))
+
+    def submit(self, texts: list[str]):
+        """Start encoding; returns an object with .get() -> ndarray."""
+        if self._pool is not None:
+            return self._pool.apply_async(_encode_batch, (texts,))
+        vectors = self._model.encode(texts, normalize_embeddings=True, show_progress_bar=False)
+        return _Ready(vectors)
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+
 
-    return [c for c in chunks if c]
+class _Ready:
+    def __init__(self, value):
+        self._value = value
 
+    def get(self):
+        return self._value
+
+
+# ── Document scan ──────────────────────────────────────────────
+
+def iter_pending_documents(supabase, page_size: int):
+    """Yield documents without chunks, ordered by (title, id).
+
+    Keyset-paginated through documents_pending_embedding() (migration 006),
+    so memory stays at one page of raw_content and PostgREST's max-rows cap
+    never truncates the scan. Documents embedded while the scan runs drop
+    out of later pages on their own.
+    """
+    after_title, after_id = None, None
+    while True:
+        page = supabase.schema(DB_SCHEMA).rpc(
+            "documents_pending_embedding",
+            {"after_title": after_title, "after_id": after_id, "page_size": page_size},
+        ).execute().data or []
+        yield from page
+        if len(page) < page_size:
+            return
+        after_title, after_id = page[-1]["title"], page[-1]["id"]
+
+
+# ── Writer ─────────────────────────────────────────────────────
+
+class ChunkWriter(threading.Thread):
+    """Consumes finished documents from a bounded queue and stores them.
+
+    Uses COPY over DATABASE_URL when available, otherwise PostgREST inserts.
+    """
 
-def count_tokens_approx(text: str) -> int:
-    """Rough token count (words * 1.3)."""
-    return int(len(text.split()) * 1.3)
+    def __init__(self, supabase, max_pending: int = 8):
+        super().__init__(daemon=True)
+        self.queue: queue.Queue = queue.Queue(maxsize=max_pending)
+        self.supabase = supabase
+        self.rows_written = 0
+        self.docs_written = 0
+        self.errors: list[str] = []
+        self._conn = None
+        if DATABASE_URL:
+            import psycopg
+            self._conn = psycopg.connect(DATABASE_URL)
+
+    def run(self) -> None:
+        pending: list[tuple[str, str, list[dict]]] = []
+        pending_rows = 0
+        while True:
+            item = self.queue.get()
+            if item is not None:
+                pending.append(item)
+                pending_rows += len(item[2])
+            if pending and (item is None or pending_rows >= COPY_FLUSH_ROWS or self._conn is None):
+                self._flush(pending)
+                pending, pending_rows = [], 0
+            if item is None:
+                break
 
+    def _flush(self, docs: list[tuple[str, str, list[dict]]]) -> None:
+        try:
+            if self._conn is not None:
+                self._copy(docs)
+            else:
+                for _, _, rows in docs:
+                    for start in range(0, len(rows), POSTGREST_BATCH):
+                        self.supabase.schema(DB_SCHEMA).table("document_chunks") \
+                            .insert(rows[start:start + POSTGREST_BATCH]) \
+                            .execute()
+        except Exception as e:
+            titles = ", ".join(title for _, title, _ in docs)
+            print(f"  ERROR writing {titles}: {e}")
+            self.errors.extend(doc_id for doc_id, _, _ in docs)
+            return
+
+        for _, _, rows in docs:
+            self.rows_written += len(rows)
+            self.docs_written += 1
+
+    def _copy(self, docs: list[tuple[str, str, list[dict]]]) -> None:
+        from psycopg import sql
+        stmt = sql.SQL(
+            "COPY {}.document_chunks "
+            "(document_id, chunk_index, content, embedding, metadata, token_count) FROM STDIN"
+        ).format(sql.Identifier(DB_SCHEMA))
+        with self._conn.transaction():
+            with self._conn.cursor() as cur, cur.copy(stmt) as copy:
+                for _, _, rows in docs:
+                    for r in rows:
+                        copy.write_row((
+                            r["document_id"],
+                            r["chunk_index"],
+                            r["content"],
+                            "[" + ",".join(repr(float(x)) for x in r["embedding"]) + "]",
+                            json.dumps(r["metadata"]),
+                            r["token_count"],
+                        ))
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Embed all un-embedded documents into document_chunks.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="embedding processes (1 = encode in this process)")
+    parser.add_argument("--batch-size", type=int, default=64, help="chunks per embedding task")
+    parser.add_argument("--page-size", type=int, default=50, help="documents fetched per page")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
 
-def main():
     print(f"=== Astoria v2 — Seed Embeddings ===")
-    print(f"Model:  {EMBEDDING_MODEL}")
-    print(f"Schema: {DB_SCHEMA}")
-    print(f"Mode:   SKIP already embedded documents (safe to re-run)")
+    print(f"Model:   {EMBEDDING_MODEL}")
+    print(f"Schema:  {DB_SCHEMA}")
+    print(f"Mode:    SKIP already embedded documents (safe to re-run)")
+    print(f"Workers: {args.workers} (batch size {args.batch_size})")
+    print(f"Writes:  {'COPY via DATABASE_URL' if DATABASE_URL else 'PostgREST batches'}")
     print()
 
-    # 1. Load embedding model
+    # 1. Start embedding workers
     print("Loading embedding model...")
-    model = SentenceTransformer(EMBEDDING_MODEL)
-    print(f"  Model loaded. Dimension: {model.get_embedding_dimension()}")
+    encoder = Encoder(args.workers)
+    token_counter = get_token_counter(EMBEDDING_MODEL)
+    print(f"  Model loaded. Chunking to {CHUNK_TOKENS} tokens "
+          f"({'exact' if token_counter.exact else 'approximate'} token counts).")
+
+    cache = None
+    if CACHE_DIR:
+        cache = EmbeddingCache(CACHE_DIR, EMBEDDING_MODEL, EMBEDDING_DIM, CACHE_DTYPE)
+        print(f"  Embedding cache: {cache.path} ({len(cache)} vectors)")
 
     # 2. Connect to Supabase
     supabase = get_supabase()
     print("Connected to Supabase.")
 
-    # 3. Fetch all documents
-    result = supabase.schema(DB_SCHEMA).table("documents") \
-        .select("id, title, raw_content, metadata") \
-        .execute()
-    documents = result.data or []
-    print(f"Found {len(documents)} documents.")
+    # 3. Count progress server-side (distinct documents with chunks)
+    progress = supabase.schema(DB_SCHEMA).rpc("embedding_progress", {}).execute()
+    counts = (progress.data or [{}])[0]
+    total_docs = counts.get("total_documents", 0)
+    embedded_docs = counts.get("embedded_documents", 0)
+    print(f"Found {total_docs} documents.")
 
-    if not documents:
+    if not total_docs:
         print("No documents to process. Run seed_vessels.py first.")
+        encoder.close()
         return
 
-    # 4. Sort alphabetically for predictable order
-    documents.sort(key=lambda d: d.get("title", ""))
-
-    # 5. Build set of already-embedded document IDs — never re-embed these
-    existing = supabase.schema(DB_SCHEMA).table("document_chunks") \
-        .select("document_id") \
-        .execute()
-    already_done = set(r["document_id"] for r in (existing.data or []))
-    print(f"Already embedded: {len(already_done)} documents — skipping these")
-    print(f"Remaining:        {len(documents) - len(already_done)} documents to embed")
+    # 4. Already-embedded documents never reach the scan (documents with
+    #    chunks are excluded by the anti-join), so an interrupted run resumes
+    #    where it stopped and a document whose chunks were deleted is redone
+    print(f"Already embedded: {embedded_docs} documents — skipping these")
+    print(f"Remaining:        {total_docs - embedded_docs} documents to embed")
     print()
 
-    # 6. Process each document — skip if already embedded
+    writer = ChunkWriter(supabase)
+    writer.start()
+
+    # 5. Pipeline: chunk → cache lookup → embed on the pool → writer thread.
+    #    In-flight documents are finished strictly in order; at most
+    #    2 × workers embedding tasks are outstanding at any time.
     total_chunks   = 0
     total_embedded = 0
     total_skipped  = 0
     total_errors   = 0
+    max_in_flight  = max(2, 2 * args.workers)
+    in_flight: deque = deque()   # (doc, chunks, vectors, [(positions, async_result)])
+    started = time.monotonic()
 
-    for doc in documents:
-        doc_id = doc["id"]
+    def outstanding() -> int:
+        return sum(len(tasks) for *_, tasks in in_flight)
+
+    def finish_oldest() -> None:
+        nonlocal total_chunks, total_embedded, total_errors
+        doc, chunks, vectors, tasks = in_flight.popleft()
+        try:
+            for (positions, texts), task in tasks:
+                fresh = task.get()
+                if cache is not None:
+                    cache.put_many(texts, fresh)
+                    fresh = fresh.astype(cache.dtype)
+                for pos, vec in zip(positions, fresh):
+                    vectors[pos] = vec
+        except Exception as e:
+            print(f"  ERROR on {doc['title']}: {e}")
+            total_errors += 1
+            return
+
+        rows = [
+            {
+                "document_id": doc["id"],
+                "chunk_index": i,
+                "content":     chunk.text,
+                "embedding":   vectors[i].tolist(),
+                "metadata":    doc.get("metadata", {}),
+                "token_count": chunk.token_count,
+            }
+            for i, chunk in enumerate(chunks)
+        ]
+        writer.queue.put((doc["id"], doc["title"], rows))   # blocks when writer lags
+        total_chunks   += len(chunks)
+        total_embedded += 1
+
+        elapsed = time.monotonic() - started
+        print(f"  {doc['title']}: {len(chunks)} chunks"
+              f"  [{total_chunks / elapsed:.1f} chunks/s]")
+
+    # 6. Walk un-embedded documents alphabetically, one keyset page at a time
+    for doc in iter_pending_documents(supabase, args.page_size):
         title  = doc["title"]
         raw    = doc.get("raw_content", "")
 
-        # Skip if already embedded
-        if doc_id in already_done:
-            total_skipped += 1
-            continue
-
         # Skip if no content
         if not raw:
             print(f"  SKIP {title}: no raw_content")
             total_skipped += 1
             continue
 
-        # Chunk the document
-        chunks = chunk_text(raw)
-        print(f"  {title}: {len(chunks)} chunks")
+        # Chunk the document; E5 requires "passage: " prefix for indexed text
+        chunks   = chunk_text(raw, target_tokens=CHUNK_TOKENS, overlap_tokens=CHUNK_OVERLAP,
+                              counter=token_counter)
+        prefixed = [f"passage: {c.text}" for c in chunks]
 
-        try:
-            # E5 requires "passage: " prefix for documents being indexed
-            prefixed   = [f"passage: {c}" for c in chunks]
-            embeddings = model.encode(
-                prefixed,
-                normalize_embeddings=True,
-                show_progress_bar=False
-            )
-
-            # Build chunk rows
-            rows = []
-            for i, (chunk_text_val, embedding) in enumerate(zip(chunks, embeddings)):
-                rows.append({
-                    "document_id": doc_id,
-                    "chunk_index": i,
-                    "content":     chunk_text_val,
-                    "embedding":   embedding.tolist(),
-                    "metadata":    doc.get("metadata", {}),
-                    "token_count": count_tokens_approx(chunk_text_val),
-                })
-
-            # Insert in batches of 20 (Supabase request size limit)
-            for batch_start in range(0, len(rows), 20):
-                batch = rows[batch_start:batch_start + 20]
-                supabase.schema(DB_SCHEMA).table("document_chunks") \
-                    .insert(batch) \
-                    .execute()
-
-            total_chunks   += len(chunks)
-            total_embedded += 1
+        if cache is not None:
+            vectors, missing = cache.get_many(prefixed)
+        else:
+            vectors, missing = np.zeros((len(chunks), EMBEDDING_DIM), dtype="float32"), list(range(len(chunks)))
 
-        except Exception as e:
-            print(f"  ERROR on {title}: {e}")
-            total_errors += 1
-            continue
+        tasks = []
+        for start in range(0, len(missing), args.batch_size):
+            positions = missing[start:start + args.batch_size]
+            texts = [prefixed[p] for p in positions]
+            tasks.append(((positions, texts), encoder.submit(texts)))
+        in_flight.append((doc, chunks, vectors, tasks))
+
+        while in_flight and outstanding() > max_in_flight:
+            finish_oldest()
+
+    while in_flight:
+        finish_oldest()
+
+    writer.queue.put(None)
+    writer.join()
+    writer.close()
+    encoder.close()
+    elapsed = time.monotonic() - started
 
     # 7. Final report
     print()
     print(f"=== Done ===")
     print(f"Documents embedded:   {total_embedded}")
+    print(f"Documents written:    {writer.docs_written}")
     print(f"Documents skipped:    {total_skipped}")
-    print(f"Documents errored:    {total_errors}")
-    print(f"Total chunks created: {total_chunks}")
+    print(f"Documents errored:    {total_errors + len(writer.errors)}")
+    print(f"Total chunks created: {writer.rows_written}")
+    print(f"Elapsed:              {elapsed:.1f}s"
+          f" ({writer.rows_written / elapsed if elapsed else 0:.1f} chunks/s)")
     print()
     print(f"Verify in Supabase SQL Editor:")
     print(f"  SELECT COUNT(*) FROM {DB_SCHEMA}.document_chunks;")
@@ -0,0 +1,50 @@
+"""
+Astoria v2 — Chunker tests.
+"""
+
+from app.services.chunking import E5_MAX_TOKENS, TokenCounter, chunk_text, iter_chunks
+
+COUNTER = TokenCounter()    # approximate counts; no tokenizer download in tests
+
+REGISTER = "\n".join(
+    f"{n}. VESSEL {chr(65 + n % 26)}, schooner, of Machias. Official No. {100 + n}. "
+    f"Built at East Machias, 18{40 + n % 50}, by Gilbert Trott, master carpenter. "
+    f"{n * 3}.25 tons; 79.3 ft. x 21.7 ft. x 6.7 ft. One deck, two masts. "
+    f"Owners: Capt. J. Q. Libby, 1/2, Machias."
+    for n in range(1, 30)
+)
+
+
+def test_register_entries_start_chunks():
+    """Every register entry begins its own chunk and none are split."""
+    chunks = chunk_text(REGISTER, counter=COUNTER)
+    assert len(chunks) == 29
+    for n, chunk in enumerate(chunks, start=1):
+        assert chunk.text.startswith(f"{n}. VESSEL")
+        assert "Capt. J. Q. Libby" in chunk.text
+
+
+def test_streaming_matches_whole_text():
+    text = "\n\n".join([REGISTER] * 3)
+    whole = chunk_text(text, counter=COUNTER)
+    pieces = [text[i:i + 11] for i in range(0, len(text), 11)]
+    assert list(iter_chunks(pieces, counter=COUNTER)) == whole
+
+
+def test_prose_respects_target_and_overlaps_within_paragraph():
+    prose = " ".join(f"The bark Sarah sailed on voyage {n} to Havana." for n in range(300))
+    chunks = chunk_text(prose, target_tokens=120, overlap_tokens=30, counter=COUNTER)
+    assert len(chunks) > 5
+    assert all(c.token_count <= 120 for c in chunks)
+    # the closing sentences of one chunk open the next
+    first_of_next = chunks[1].text.split(". ", 1)[0] + "."
+    assert first_of_next in chunks[0].text
+    assert chunks[0].text.rsplit(". ", 1)[-1] in chunks[1].text
+
+
+def test_overlong_sentence_is_cut_below_model_limit():
+    run_on = "lumber " * 3000
+    chunks = chunk_text(run_on, counter=COUNTER)
+    assert len(chunks) > 1
+    assert all(c.token_count < E5_MAX_TOKENS for c in chunks)
+    assert sum(len(c.text.split()) for c in chunks) == 3000
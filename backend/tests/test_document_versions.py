@@ -0,0 +1,88 @@
+"""
+Astoria v2 — Document version and content staging tests.
+"""
+
+import io
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("sentence_transformers")
+
+from app.services import loader_agent  # noqa: E402
+from app.services.loader_agent import _find_previous_version, _stage_content  # noqa: E402
+
+
+class _Documents:
+    """Just enough of the supabase query builder to filter a list of rows."""
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    def schema(self, name):
+        return self
+
+    def table(self, name):
+        return _Query(self.rows)
+
+
+class _Query:
+    def __init__(self, rows):
+        self.rows = self.data = rows
+
+    def select(self, columns):
+        return self
+
+    def eq(self, column, value):
+        return _Query([r for r in self.rows if r.get(column) == value])
+
+    def order(self, column, desc=False):
+        return _Query(sorted(self.rows, key=lambda r: r[column], reverse=desc))
+
+    def limit(self, n):
+        return _Query(self.rows[:n])
+
+    def execute(self):
+        return self
+
+
+def test_files_sharing_a_name_are_not_versions_of_each_other():
+    docs = _Documents([
+        {"id": "a", "version": 1, "title": "register.pdf", "content_type": "pdf",
+         "source_url": None, "updated_at": "1"},
+        {"id": "b", "version": 3, "title": "Machias", "content_type": "html",
+         "source_url": "https://example.org/machias", "updated_at": "2"},
+    ])
+    upload = {"title": "register.pdf", "content_type": "pdf"}
+
+    assert _find_previous_version(docs, "public", upload) is None
+    assert _find_previous_version(docs, "public", upload, replace_document_id="a")["id"] == "a"
+    assert _find_previous_version(docs, "public", upload, replace_document_id="missing") is None
+    page = {"title": "Machias", "content_type": "html", "source_url": "https://example.org/machias"}
+    assert _find_previous_version(docs, "public", page)["id"] == "b"
+
+
+def test_content_is_staged_as_numbered_pieces(monkeypatch):
+    inserted = []
+
+    class _Pieces:
+        def schema(self, name):
+            return self
+
+        def table(self, name):
+            assert name == "document_content_pieces"
+            return self
+
+        def insert(self, row):
+            inserted.append(row)
+            return self
+
+        def execute(self):
+            return self
+
+    monkeypatch.setattr(loader_agent, "get_settings",
+                        lambda: SimpleNamespace(ingest_content_piece_chars=4))
+    _stage_content(_Pieces(), "public", io.StringIO("Schooner Alaska"), "d")
+    assert [(r["seq"], r["piece"]) for r in inserted] == [
+        (0, "Scho"), (1, "oner"), (2, " Ala"), (3, "ska")]
+    assert {r["document_id"] for r in inserted} == {"d"}
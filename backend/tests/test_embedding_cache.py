@@ -0,0 +1,67 @@
+"""
+Astoria v2 — Embedding cache tests.
+"""
+
+import numpy as np
+import pytest
+
+from app.services.embedding_cache import EmbeddingCache, encode_cached
+
+
+def _fake_encoder(calls):
+    def encode(texts):
+        calls.append(list(texts))
+        return np.array([[len(t), 1.0, 0.5, 0.25] for t in texts], dtype=np.float32)
+    return encode
+
+
+def test_only_unseen_texts_are_encoded(tmp_path):
+    """Second pass over the same text is served entirely from disk."""
+    cache = EmbeddingCache(str(tmp_path), "intfloat/e5-large-v2", 4)
+    calls = []
+    first = encode_cached(["passage: a", "passage: bb"], _fake_encoder(calls), cache)
+    second = encode_cached(["passage: bb", "passage: ccc", "passage: a"], _fake_encoder(calls), cache)
+
+    assert calls == [["passage: a", "passage: bb"], ["passage: ccc"]]
+    assert np.array_equal(second[0], first[1])
+    assert np.array_equal(second[2], first[0])
+    assert len(cache) == 3
+
+
+def test_cache_survives_reopen_and_is_per_model(tmp_path):
+    """Vectors persist across instances; other models do not see them."""
+    calls = []
+    encode_cached(["passage: x"], _fake_encoder(calls), EmbeddingCache(str(tmp_path), "m1", 4))
+
+    vectors, missing = EmbeddingCache(str(tmp_path), "m1", 4).get_many(["passage: x"])
+    assert missing == []
+    assert vectors[0][0] == len("passage: x")
+
+    _, missing = EmbeddingCache(str(tmp_path), "m2", 4).get_many(["passage: x"])
+    assert missing == [0]
+
+
+def test_duplicate_texts_in_one_batch_encode_once(tmp_path):
+    cache = EmbeddingCache(str(tmp_path), "m", 4, dtype="float32")
+    calls = []
+    out = encode_cached(["passage: d", "passage: d"], _fake_encoder(calls), cache)
+    assert calls == [["passage: d"]]
+    assert np.array_equal(out[0], out[1])
+
+
+def test_each_dtype_has_its_own_index(tmp_path):
+    """Reopening with another dtype starts empty instead of reading the
+    other dtype's rows out of its own (empty) vector file."""
+    calls = []
+    encode_cached(["passage: x"], _fake_encoder(calls), EmbeddingCache(str(tmp_path), "m", 4))
+
+    other = EmbeddingCache(str(tmp_path), "m", 4, dtype="float32")
+    vectors, missing = other.get_many(["passage: x"])
+    assert missing == [0] and not vectors.any()
+    encode_cached(["passage: x"], _fake_encoder(calls), other)
+    assert len(calls) == 2
+
+    _, missing = EmbeddingCache(str(tmp_path), "m", 4).get_many(["passage: x"])
+    assert missing == []
+    with pytest.raises(ValueError):
+        EmbeddingCache(str(tmp_path), "m", 8)
@@ -0,0 +1,29 @@
+"""
+Astoria v2 — Chunk entity tagger tests.
+"""
+
+from app.services.entity_tagger import EntityTagger
+
+TAGGER = EntityTagger(
+    vessels=["A. B. Perry", "Hope", "Sarah", "Sarah Jane"],
+    people=["John B. Chandler", "Josiah Libby", "Libby"],
+)
+
+
+def test_tags_register_entry_regardless_of_case_and_punctuation():
+    text = ("12. A. B. PERRY, schooner, of Machias. Master, John B Chandler. "
+            "Owners: Josiah Libby, 1/2.")
+    assert TAGGER.tag(text) == {
+        "ship_names": ["A. B. Perry"],
+        "people": ["john b. chandler", "josiah libby"],
+    }
+
+
+def test_longest_match_wins_and_lowercase_words_are_ignored():
+    text = "The brig Sarah Jane sailed in hope of a cargo; later the Sarah and Hope returned."
+    assert TAGGER.tag(text) == {"ship_names": ["Hope", "Sarah", "Sarah Jane"]}
+
+
+def test_single_word_person_names_are_not_tagged():
+    assert TAGGER.tag("Libby signed the register.") == {}
+    assert EntityTagger().tag("A. B. Perry") == {}
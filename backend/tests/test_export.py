@@ -0,0 +1,70 @@
+"""
+Astoria v2 — Bulk export query and encoder tests.
+"""
+
+import io
+import json
+from datetime import date
+
+import pytest
+
+from app.services.export import ArrowEncoder, CsvEncoder, NdjsonEncoder, build_query
+
+
+def test_build_query_binds_only_given_filters():
+    sql, values = build_query("ships", {"name": "A. B_", "year_min": 1850, "ship_type": None})
+    assert "sr.name_key LIKE %(name)s AND sr.year_built >= %(year_min)s" in sql
+    assert values == {"name": "a. b\\_%", "year_min": 1850}
+    assert sql.rstrip().endswith("ORDER BY sr.name_key, sr.id")
+
+    sql, values = build_query("people", {"person": "A. A. Lowell"})
+    assert values == {"person": "a a lowell"} and "person_key = %(person)s" in sql
+    assert "WHERE" not in build_query("events", {})[0]
+    with pytest.raises(ValueError):
+        build_query("events", {"tonnage_min": 10})
+
+
+def test_voyages_use_the_explorer_keys():
+    sql, values = build_query("voyages", {"port": " Machias ", "master": "Nelson Ingalls"})
+    assert "(vl.from_key = %(port)s OR vl.to_key = %(port)s) AND vl.master_key = %(master)s" in sql
+    assert values == {"port": "machias", "master": "nelson ingalls"}
+    assert sql.rstrip().endswith("ORDER BY vl.sort_date, vl.id")
+    # raw events don't pretend to resolve masters or inferred ports
+    with pytest.raises(ValueError):
+        build_query("events", {"port": "machias"})
+
+
+def test_text_encoders_stream_rows_per_batch():
+    columns = ["vessel_name", "event_index", "owners_text"]
+    rows = [("A. Hooper", 0, 'Howard Q. Boardman, 1/4, "E. B." Todd'), ("A. B. Perry", 1, None)]
+
+    csv = CsvEncoder(columns, [])
+    assert csv.header() == b"vessel_name,event_index,owners_text\n"
+    assert csv.batch(rows[1:]) == b"A. B. Perry,1,\n"
+    assert csv.batch(rows[:1]).count(b'""E. B.""') == 1
+
+    lines = NdjsonEncoder(columns, []).batch(rows).decode().splitlines()
+    assert [json.loads(line) for line in lines][1] == {
+        "vessel_name": "A. B. Perry", "event_index": 1, "owners_text": None}
+
+
+@pytest.mark.parametrize("parquet", [False, True])
+def test_arrow_encoder_streams_a_readable_file(parquet):
+    pa = pytest.importorskip("pyarrow")
+    import pyarrow.parquet as pq
+
+    columns = ["event_date", "event_index", "event_port"]
+    batches = [[(date(1852, 5, 3), 0, "Machias"), (None, 1, None)],
+               [(date(1860, 1, 9), 2, "Boston")]]
+    encoder = ArrowEncoder(columns, [1082, 23, 25], parquet=parquet)
+    parts = [encoder.header(), *(encoder.batch(rows) for rows in batches), encoder.close()]
+    assert all(parts[1:])                   # every batch is sent as it is written
+
+    data = b"".join(parts)
+    table = pq.read_table(io.BytesIO(data)) if parquet else pa.ipc.open_stream(data).read_all()
+    assert table.schema.types == [pa.date32(), pa.int32(), pa.string()]
+    assert table.to_pylist() == [
+        {"event_date": date(1852, 5, 3), "event_index": 0, "event_port": "Machias"},
+        {"event_date": None, "event_index": 1, "event_port": None},
+        {"event_date": date(1860, 1, 9), "event_index": 2, "event_port": "Boston"},
+    ]
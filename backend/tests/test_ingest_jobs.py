@@ -0,0 +1,168 @@
+"""
+Astoria v2 — Ingestion run queue and worker tests.
+"""
+
+import threading
+import time
+import uuid
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import ingest_jobs
+
+
+class _Runs:
+    """In-memory ingestion_runs with the query-builder calls ingest_jobs
+    makes, and claim_ingestion_run()."""
+
+    def __init__(self):
+        self.rows: dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    def table(self):
+        return _RunsQuery(self)
+
+    def claim(self, worker_id):
+        with self._lock:
+            pending = [r for r in self.rows.values() if r["status"] == "pending" and r.get("job")]
+            if not pending:
+                return None
+            row = min(pending, key=lambda r: r["started_at"])
+            row.update(status="running", worker=worker_id)
+            return dict(row)
+
+
+class _RunsQuery:
+    def __init__(self, runs):
+        self.runs = runs
+        self.filters = []
+        self.action = None
+
+    def insert(self, row):
+        row = {"id": str(uuid.uuid4()), "errors": [], "started_at": f"{time.monotonic():020.6f}",
+               "updated_at": "2026-01-01T00:00:00+00:00", **row}
+        self.action = ("insert", row)
+        return self
+
+    def update(self, values):
+        self.action = ("update", values)
+        return self
+
+    def select(self, columns):
+        self.action = ("select", None)
+        return self
+
+    def eq(self, column, value):
+        self.filters.append(lambda r: r.get(column) == value)
+        return self
+
+    def in_(self, column, values):
+        self.filters.append(lambda r: r.get(column) in values)
+        return self
+
+    def lt(self, column, value):
+        self.filters.append(lambda r: r.get(column) < value)
+        return self
+
+    def is_(self, column, value):
+        self.filters.append(lambda r: r.get(column) is None)
+        return self
+
+    def limit(self, n):
+        return self
+
+    def execute(self):
+        kind, payload = self.action
+        with self.runs._lock:
+            if kind == "insert":
+                self.runs.rows[payload["id"]] = payload
+                return SimpleNamespace(data=[dict(payload)])
+            rows = [r for r in self.runs.rows.values() if all(f(r) for f in self.filters)]
+            if kind == "update":
+                for r in rows:
+                    r.update(payload)
+            return SimpleNamespace(data=[dict(r) for r in rows])
+
+
+@pytest.fixture
+def runs(monkeypatch):
+    runs = _Runs()
+    settings = SimpleNamespace(ingest_heartbeat_s=3600, ingest_claim_interval_s=0.01,
+                               ingest_stale_run_minutes=10)
+    monkeypatch.setattr(ingest_jobs, "_runs_table", runs.table)
+    monkeypatch.setattr(ingest_jobs, "_claim", runs.claim)
+    monkeypatch.setattr(ingest_jobs, "get_settings", lambda: settings)
+    return runs
+
+
+def _wait_for(condition):
+    for _ in range(100):
+        if condition():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def test_the_api_queues_runs_and_a_worker_runs_them(runs, tmp_path):
+    upload = tmp_path / "register.pdf"
+    upload.write_bytes(b"%PDF")
+
+    def load(progress, source, town):
+        progress.record({"status": "success", "chunks_created": 3}, source)
+        return {"source": source, "town": town}
+
+    run = ingest_jobs.submit_run("upload:register.pdf", "load", {"source": str(upload), "town": "Machias"},
+                                 upload=str(upload))
+    assert run.status.value == "pending"          # nothing ran in the API
+
+    worker = ingest_jobs.Worker({"load": load}, threads=1, worker_id="w1")
+    assert worker.run_once() and not worker.run_once()
+    row = runs.rows[run.run_id]
+    assert row["status"] == "completed" and row["worker"] == "w1"
+    assert row["result"] == {"source": str(upload), "town": "Machias"} and row["chunks_created"] == 3
+    assert not upload.exists()
+
+    unknown = ingest_jobs.submit_run("x", "reindex", {})
+    worker.run_once()
+    assert runs.rows[unknown.run_id]["status"] == "failed"
+
+
+def test_stop_fails_running_runs_and_leaves_queued_ones(runs):
+    started, release = threading.Event(), threading.Event()
+
+    def slow(progress):
+        started.set()
+        release.wait(5)
+        return {}
+
+    running = ingest_jobs.submit_run("url:a", "slow", {})
+    queued = ingest_jobs.submit_run("url:b", "slow", {})
+    worker = ingest_jobs.Worker({"slow": slow}, threads=1)
+    worker.start()
+    assert started.wait(5)
+    worker.stop()
+
+    assert runs.rows[running.run_id]["status"] == "failed"
+    assert "shut down during the run" in runs.rows[running.run_id]["errors"][-1]
+    assert runs.rows[queued.run_id]["status"] == "pending"    # for the next worker
+
+    # a run that does finish after all still records its result
+    release.set()
+    assert _wait_for(lambda: runs.rows[running.run_id]["status"] == "completed")
+    assert runs.rows[queued.run_id]["status"] == "pending"
+
+
+def test_startup_fails_only_runs_no_worker_will_finish(runs):
+    old, new = "2000-01-01T00:00:00+00:00", "2999-01-01T00:00:00+00:00"
+    for run_id, status, updated, job in [("crashed", "running", old, {"kind": "load"}),
+                                         ("queued", "pending", old, {"kind": "load"}),
+                                         ("legacy", "pending", old, None),
+                                         ("live", "running", new, {"kind": "load"}),
+                                         ("done", "completed", old, {"kind": "load"})]:
+        runs.rows[run_id] = {"id": run_id, "status": status, "updated_at": updated,
+                             "errors": ["x"], "job": job}
+
+    assert ingest_jobs.recover_stale_runs() == 2
+    assert {r["id"] for r in runs.rows.values() if r["status"] == "failed"} == {"crashed", "legacy"}
+    assert runs.rows["crashed"]["errors"][0] == "x" and len(runs.rows["crashed"]["errors"]) == 2
@@ -0,0 +1,35 @@
+"""
+Astoria v2 — Near-duplicate (MinHash/LSH) tests.
+"""
+
+from app.services.near_duplicate import band_keys, signature, similarity
+
+PAGE = " ".join(
+    f"Entry {n}: the brig Abigail of Machias, Captain Josiah Libby, cleared for "
+    f"Boston with {n * 7} thousand feet of long lumber on day {n} of the season."
+    for n in range(40)
+)
+
+
+def test_footer_change_is_near_duplicate():
+    """Same page with a different nav footer scores high and shares a band."""
+    a = signature([PAGE + "Home | Blue Hill Historical Society"], num_perm=128)
+    b = signature([PAGE + "Home | Sullivan Town Archive | Contact"], num_perm=128)
+
+    assert similarity(a, b) > 0.85
+    assert set(band_keys(a, bands=16)) & set(band_keys(b, bands=16))
+
+
+def test_unrelated_text_is_not():
+    a = signature([PAGE], num_perm=128)
+    b = signature(["Census of Sullivan, 1850: farmers, mariners and a blacksmith. " * 20], num_perm=128)
+    assert similarity(a, b) < 0.2
+
+
+def test_signature_ignores_piece_boundaries_and_case():
+    whole = signature([PAGE], num_perm=64)
+    split = signature([PAGE[i:i + 7] for i in range(0, len(PAGE), 7)], num_perm=64)
+    upper = signature([PAGE.upper()], num_perm=64)
+    assert (whole == split).all()
+    assert (whole == upper).all()
+    assert signature(["  \n "], num_perm=64) is None
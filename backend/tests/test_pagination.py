@@ -0,0 +1,42 @@
+"""
+Astoria v2 — Keyset pagination tests.
+"""
+
+from urllib.parse import parse_qs
+
+import pytest
+from fastapi import HTTPException
+from postgrest import SyncPostgrestClient
+
+from app.core.pagination import apply_keyset, decode_cursor, encode_cursor, page_of
+
+
+def _params(query) -> dict[str, list[str]]:
+    return parse_qs(str(query.request.params))
+
+
+def test_cursor_round_trip_and_rejects_garbage():
+    cursor = encode_cursor('a. "b" perry', "7f3c")
+    assert decode_cursor(cursor) == ('a. "b" perry', "7f3c")
+    assert decode_cursor(None) is None
+    for bad in ("not-a-cursor", encode_cursor("x", "y")[:-3], "WzEsMl0"):  # last: [1,2]
+        with pytest.raises(HTTPException) as err:
+            decode_cursor(bad)
+        assert err.value.status_code == 400
+
+
+def test_page_of_fetches_one_extra_row():
+    rows = [{"id": str(i), "name_key": f"ship {i}"} for i in range(3)]
+    assert page_of(rows, 3, "name_key") == (rows, None)
+    page, cursor = page_of(rows, 2, "name_key")
+    assert page == rows[:2] and decode_cursor(cursor) == ("ship 1", "1")
+
+
+def test_keyset_bounds_the_index_scan():
+    table = SyncPostgrestClient("http://db.invalid").from_("ship_registry")
+    first = _params(apply_keyset(table.select("id"), "name_key", None))
+    assert first["order"] == ["name_key.asc,id.asc"] and "or" not in first
+
+    after = _params(apply_keyset(table.select("id"), "name_key", ("a, b", "9")))
+    assert after["name_key"] == ["gte.a, b"]
+    assert after["or"] == ['(name_key.gt."a, b",and(name_key.eq."a, b",id.gt."9"))']
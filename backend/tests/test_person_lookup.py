@@ -0,0 +1,51 @@
+"""
+Astoria v2 — Person lookup tests.
+"""
+
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("sentence_transformers")
+
+from app.services.retrieval import _detect_person_query, _get_person_events  # noqa: E402
+
+
+class _Supabase:
+    """Records query-builder calls; execute() answers from `answers`
+    (filter column -> rows)."""
+
+    def __init__(self, answers):
+        self.answers = answers
+        self.calls = []
+
+    def table(self, name):
+        self._column = None
+        return self
+
+    def __getattr__(self, name):
+        def call(*args, **kwargs):
+            self.calls.append((name, *args))
+            if name in ("eq", "in_"):
+                self._column = args[0]
+            return self
+        return call
+
+    def execute(self):
+        return SimpleNamespace(data=self.answers.get(self._column, []))
+
+
+def test_events_are_found_under_every_name_form():
+    roles = [{"person_name": "A. A. Lowell", "person_key": "a a lowell"},
+             {"person_name": "Albert A. Lowell", "person_key": "albert a lowell"}]
+    supabase = _Supabase({"master_key": [{"master": "A . A . Lowell"}]})
+    assert _get_person_events("a. a. lowell", roles, supabase) == [{"master": "A . A . Lowell"}]
+    assert ("in_", "master_key", ["a a lowell", "albert a lowell"]) in supabase.calls
+    assert not [c for c in supabase.calls if c[0] == "ilike"]
+
+
+def test_a_surname_alone_is_matched_on_last_key():
+    supabase = _Supabase({"last_key": [{"person_name_normalized": "nelson ingalls"}]})
+    assert _detect_person_query("Show the career of Ingalls", supabase) == "nelson ingalls"
+    assert ("eq", "last_key", "ingalls") in supabase.calls
+    assert not [c for c in supabase.calls if c[0] == "ilike"]
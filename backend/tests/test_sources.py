@@ -0,0 +1,22 @@
+"""
+Astoria v2 — Source detail snippet tests.
+"""
+
+from app.api.sources import MAX_SNIPPETS, _snippets
+
+CHUNK = "The brig Abigail of Machias, Josiah Libby master. " * 2 + "x" * 400 + " The ABIGAIL was lost."
+
+
+def test_snippets_merge_close_matches_and_mark_each():
+    first, last = _snippets(CHUNK, "abigail", width=40)
+    assert not first.text.startswith("…") and first.text.endswith("…")
+    assert [first.text[s:e] for s, e in first.highlights] == ["Abigail", "Abigail"]
+    assert last.text.startswith("…") and last.text.endswith("was lost.")
+    assert [last.text[s:e] for s, e in last.highlights] == ["ABIGAIL"]
+
+
+def test_snippets_are_capped_and_literal():
+    spread = ("Machias " + "y" * 300) * (MAX_SNIPPETS + 2)
+    assert len(_snippets(spread, "machias", width=20)) == MAX_SNIPPETS
+    assert _snippets("1/4 share", "1/4 (") == []
+    assert _snippets("a (1/4) share", "(1/4)")[0].highlights == [(2, 7)]
@@ -0,0 +1,61 @@
+"""
+Astoria v2 — Maritime statistics tests.
+"""
+
+from types import SimpleNamespace
+
+import pytest
+
+from app.services.stats import dims_key, query_stats, sql_for_question
+
+
+class _Recorder:
+    """Records the query-builder calls made on it."""
+
+    def __init__(self):
+        self.calls = []
+
+    def __getattr__(self, name):
+        def call(*args, **kwargs):
+            self.calls.append((name, *args))
+            return self
+        return call
+
+    def execute(self):
+        return SimpleNamespace(data=[])
+
+
+def test_dims_key_is_canonical_and_rejects_unrolled_combinations():
+    assert dims_key("vessels", ["hailing_port", "decade"]) == "decade,hailing_port"
+    assert dims_key("vessels", []) == ""
+    assert dims_key("vessels", ["builder", "decade"]) == "decade,builder"
+    assert dims_key("events", ["port", "event_type", "decade"]) == "decade,event_type,port"
+    for kind, dims in [("vessels", ["port"]), ("events", ["builder"]),
+                       ("vessels", ["builder", "vessel_type"]), ("cargo", ["decade"])]:
+        with pytest.raises(ValueError):
+            dims_key(kind, dims)
+
+
+def test_name_filters_match_the_lowercase_keys():
+    client = _Recorder()
+    query_stats(client, "vessels", ["decade"], {"hailing_port": " MACHIAS ", "vessel_type": "Schooner"})
+    assert ("eq", "dims", "decade,vessel_type,hailing_port") in client.calls
+    assert ("eq", "hailing_port_key", "machias") in client.calls
+    assert ("eq", "vessel_type", "schooner") in client.calls
+    assert not [c for c in client.calls if c[0] == "ilike"]
+
+
+def test_known_questions_use_the_rollups():
+    for question in ["How many vessels were built per decade?",
+                     "Show me tonnage by vessel type",
+                     "Which were the top shipbuilders?",
+                     "What were the busiest ports?",
+                     "Enrolled vs. registered per decade",
+                     "Ships by home port",
+                     "vessels by place built"]:
+        sql = sql_for_question(question)
+        assert sql and "FROM maritime_stats" in sql, question
+    assert "dims = 'decade,event_type'" in sql_for_question("enrollments and registrations by decade")
+    # anything more specific goes to the LLM
+    assert sql_for_question("How many vessels were built per decade in Machias?") is None
+    assert sql_for_question("Who was master of the Alaska?") is None
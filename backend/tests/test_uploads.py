@@ -0,0 +1,90 @@
+"""
+Astoria v2 — Streaming multipart upload tests.
+"""
+
+import asyncio
+import hashlib
+import os
+
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+
+from app.core.uploads import FORM_OVERHEAD, receive_form
+
+BOUNDARY = "astoria-boundary"
+
+
+def _body(fields: dict[str, str], files: dict[str, tuple[str, bytes]]) -> bytes:
+    parts = []
+    for name, value in fields.items():
+        parts.append(f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n'
+                     f"{value}\r\n".encode())
+    for name, (filename, data) in files.items():
+        parts.append(f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="{name}"; '
+                     f'filename="{filename}"\r\nContent-Type: application/octet-stream\r\n\r\n'.encode()
+                     + data + b"\r\n")
+    return b"".join(parts) + f"--{BOUNDARY}--\r\n".encode()
+
+
+def _request(body: bytes, content_length: bool = True, piece: int = 1000) -> tuple[Request, list]:
+    reads = []
+    pieces = [body[i:i + piece] for i in range(0, len(body), piece)]
+
+    async def receive():
+        reads.append(1)
+        data = pieces.pop(0) if pieces else b""
+        return {"type": "http.request", "body": data, "more_body": bool(pieces)}
+
+    headers = [(b"content-type", f"multipart/form-data; boundary={BOUNDARY}".encode())]
+    if content_length:
+        headers.append((b"content-length", str(len(body)).encode()))
+    return Request({"type": "http", "method": "POST", "headers": headers}, receive), reads
+
+
+def test_fields_and_file_are_streamed_to_one_hashed_temp_file():
+    data = os.urandom(5000)
+    request, _ = _request(_body({"town": "Machias"}, {"file": ("register.pdf", data)}))
+    form = asyncio.run(receive_form(request, "file", 1 << 20, {".pdf"}))
+    try:
+        assert form.fields == {"town": "Machias"}
+        assert form.file.filename == "register.pdf" and form.file.size == len(data)
+        assert form.file.checksum == hashlib.sha256(data).hexdigest()
+        with open(form.file.path, "rb") as f:
+            assert f.read() == data
+    finally:
+        form.discard()
+    assert not os.path.exists(form.file.path)
+
+
+def test_oversized_uploads_are_refused_early(tmp_path, monkeypatch):
+    monkeypatch.setattr("tempfile.tempdir", str(tmp_path))
+    body = _body({}, {"file": ("big.pdf", b"x" * (FORM_OVERHEAD + 4096))})
+
+    # declared length: refused before the body is read
+    request, reads = _request(body)
+    with pytest.raises(HTTPException) as err:
+        asyncio.run(receive_form(request, "file", 1024, {".pdf"}))
+    assert err.value.status_code == 413 and reads == []
+
+    # no length (chunked): cut off once the file passes the limit, nothing left behind
+    request, reads = _request(body, content_length=False)
+    with pytest.raises(HTTPException) as err:
+        asyncio.run(receive_form(request, "file", 1024, {".pdf"}))
+    assert err.value.status_code == 413
+    assert os.listdir(tmp_path) == []
+
+    request, _ = _request(_body({}, {"file": ("notes.exe", b"x")}))
+    with pytest.raises(HTTPException) as err:
+        asyncio.run(receive_form(request, "file", 1024, {".pdf"}))
+    assert err.value.status_code == 400
+
+
+def test_urlencoded_forms_carry_fields_only():
+    async def receive():
+        return {"type": "http.request", "body": b"manifest=%7B%22items%22%3A%5B%5D%7D&town=Machias"}
+
+    request = Request({"type": "http", "method": "POST", "headers": [
+        (b"content-type", b"application/x-www-form-urlencoded")]}, receive)
+    form = asyncio.run(receive_form(request, "archive", 1024, {".zip"}))
+    assert form.fields == {"manifest": '{"items":[]}', "town": "Machias"} and form.file is None
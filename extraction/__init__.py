@@ -0,0 +1,19 @@
+"""
+Astoria v2 — Ship register extraction package.
+
+Turns the pdftotext output of "Ship Registers and Enrollments of Machias,
+Maine, 1780-1930" into structured vessels, vessel events and person roles.
+
+    python -m extraction all --input vessel_records_raw.txt   # everything, one pass
+    python -m extraction vessels --input vessel_records_raw.txt   # + events
+    python -m extraction people
+
+Each entry is read by an anchor-indexed lexer (lexer.py) that yields its
+vessel fields and events together. Entries are sharded across a process
+pool and results are cached per entry (keyed by a hash of the entry's
+raw text), so a re-run only parses entries that changed. Outputs are
+JSONL, written as shards complete. The top-level extract_*.py scripts are thin wrappers around
+this CLI; phase3-reference/ keeps the original one-off scripts.
+"""
+
+PARSER_VERSION = "1"    # bump when parser output changes, to invalidate the cache
@@ -0,0 +1,4 @@
+from extraction.cli import main
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+"""
+Astoria v2 — Extraction regression and throughput benchmark.
+
+Runs the three extraction stages over register text and reports, per
+stage, entries/s, peak memory (tracemalloc) and field-level diffs
+against the checked-in goldens in tests/golden/:
+
+  vessels  raw entries    -> vessels_extracted   (lexer.parse_vessel)
+  events   vessel records -> vessel_events       (lexer.extract_events)
+  people   events+vessels -> person_roles        (owners, roles, resolve)
+
+The register parse is also checked against the plain re.search
+reference (RegexScanner) and timed with both scanners.
+
+--scale N runs the stages again on a synthetic register N times the
+input (see synthesize()), to show how each stage grows with input size.
+
+    python -m extraction.bench                      # golden sample
+    python -m extraction.bench --scale 10 --scale 100
+    python -m extraction.bench --input vessel_records_raw.txt --repeat 5
+"""
+
+import argparse
+import re
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+from extraction import people, resolve
+from extraction.entries import ENTRY_PATTERN, iter_entries
+from extraction.io import read_records
+from extraction.lexer import EntryScanner, RegexScanner, extract_events, parse_entry, parse_vessel
+
+GOLDEN = Path(__file__).resolve().parent.parent / "tests" / "golden"
+SAMPLE = GOLDEN / "register_sample.txt"
+
+STAGES = ("vessels", "events", "people")
+GOLDEN_STEMS = {"vessels": "vessels_extracted", "events": "vessel_events", "people": "person_roles"}
+# fields that identify a record when diffing against a golden
+RECORD_KEYS = {
+    "vessels": ("entry_num",),
+    "events": ("entry_num", "event_index"),
+    "people": ("person_name_normalized", "vessel_name", "role"),
+}
+MAX_DIFFS = 10
+
+
+def golden(stem: str) -> list[dict]:
+    return list(read_records(str(GOLDEN / f"{stem}.jsonl")))
+
+
+def parse_all(entry_list: list[dict], scanner) -> list[tuple[dict, list[dict]]]:
+    return [parse_entry(e, scanner) for e in entry_list]
+
+
+def timed(entry_list: list[dict], scanner, rounds: int) -> float:
+    """Best-of-rounds entries/s."""
+    best = float("inf")
+    for _ in range(rounds):
+        started = time.perf_counter()
+        parse_all(entry_list, scanner)
+        best = min(best, time.perf_counter() - started)
+    return len(entry_list) / best
+
+
+# -- stages ---------------------------------------------------------------
+
+def stage_vessels(entry_list: list[dict]) -> list[dict]:
+    return [parse_vessel(e) for e in entry_list]
+
+
+def stage_events(vessel_list: list[dict]) -> list[dict]:
+    return [ev for v in vessel_list for ev in extract_events(v)]
+
+
+def stage_people(event_list: list[dict], vessel_list: list[dict]) -> list[dict]:
+    roles = people.PersonRoles()
+    for ev in event_list:
+        roles.add_event(ev, people.event_owners(ev))
+    for v in vessel_list:
+        roles.add_vessel(v)
+    return resolve.resolve(roles.records())
+
+
+def measure(func, *args, rounds: int = 3) -> tuple[object, float, int]:
+    """(result, best-of-rounds seconds, peak bytes allocated in one traced run)."""
+    best = float("inf")
+    for _ in range(rounds):
+        started = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - started)
+    tracemalloc.start()
+    try:
+        func(*args)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, best, peak
+
+
+def run_stages(entry_list: list[dict], rounds: int = 3) -> dict[str, tuple[list[dict], float, int]]:
+    """Stage name -> (records, seconds, peak bytes); each stage feeds the next."""
+    vessel_list, *vessels = measure(stage_vessels, entry_list, rounds=rounds)
+    event_list, *events = measure(stage_events, vessel_list, rounds=rounds)
+    role_list, *roles = measure(stage_people, event_list, vessel_list, rounds=rounds)
+    return {"vessels": (vessel_list, *vessels),
+            "events": (event_list, *events),
+            "people": (role_list, *roles)}
+
+
+# -- golden diffs ---------------------------------------------------------
+
+def field_diffs(actual: list[dict], expected: list[dict], key: tuple[str, ...]) -> list[tuple]:
+    """(record key, field, expected, actual) for every difference.
+
+    A record missing on one side shows as field None with the record
+    itself on the other side.
+    """
+    def index(records):
+        return {tuple(r.get(k) for k in key): r for r in records}
+
+    got, want = index(actual), index(expected)
+    diffs = []
+    for k in sorted(want.keys() | got.keys(), key=repr):
+        a, e = got.get(k), want.get(k)
+        if a is None or e is None:
+            diffs.append((k, None, e, a))
+            continue
+        diffs.extend((k, f, e.get(f), a.get(f)) for f in sorted(e.keys() | a.keys())
+                     if e.get(f) != a.get(f))
+    return diffs
+
+
+def report_diffs(stage: str, records: list[dict]) -> bool:
+    expected = golden(GOLDEN_STEMS[stage])
+    diffs = field_diffs(records, expected, RECORD_KEYS[stage])
+    if not diffs:
+        print(f"  {stage:<8} match ({len(records)} records)")
+        return True
+    fields = sorted({f or "(record)" for _, f, _, _ in diffs})
+    print(f"  {stage:<8} {len(diffs)} DIFFS in {', '.join(fields)} "
+          f"({len(records)} records, golden {len(expected)})")
+    for k, field, want, got in diffs[:MAX_DIFFS]:
+        print(f"    {k} {field or '(record)'}: expected {want!r}, got {got!r}")
+    if len(diffs) > MAX_DIFFS:
+        print(f"    ... {len(diffs) - MAX_DIFFS} more")
+    return False
+
+
+# -- synthetic input ------------------------------------------------------
+
+def _code(n: int) -> str:
+    """0 -> "A", 25 -> "Z", 26 -> "AA", ..."""
+    code = ""
+    n += 1
+    while n:
+        n, r = divmod(n - 1, 26)
+        code = chr(ord("A") + r) + code
+    return code
+
+
+def synthesize(raw_text: str, scale: int) -> str:
+    """A register `scale` times the size of raw_text.
+
+    Copy k of every entry is renumbered after the entries before it, gets
+    " <code>" appended to its vessel name, and (for k > 0) gets "<code>"
+    appended in lowercase to every surname it shares with the parsed
+    people of the input ("Patterson" -> "Pattersonb"). So vessels, person
+    name forms and resolver blocks all grow with the scale, as they would
+    in a larger register, while every entry keeps the sample's grammar.
+    """
+    entry_list = list(iter_entries(raw_text))
+    vessel_list = stage_vessels(entry_list)
+    surnames = {r["last_name"] for r in stage_people(stage_events(vessel_list), vessel_list)
+                if r["last_name"] and len(r["last_name"]) > 2 and r["last_name"].isalpha()}
+    surname = re.compile(r"\b(" + "|".join(sorted(map(re.escape, surnames))) + r")\b") if surnames else None
+
+    out, number = [], 0
+    for k in range(scale):
+        suffix = _code(k)
+        for e in entry_list:
+            number += 1
+            text = e["raw_text"]
+            m = ENTRY_PATTERN.match(text)
+            head, body = text[m.end(1):m.end(2)], text[m.end(2):]
+            if k and surname:
+                body = surname.sub(lambda s: s.group(1) + suffix.lower(), body)
+            out.append(f"{number}{head} {suffix}{body}")
+    return "\n".join(out) + "\n"
+
+
+# -- main -----------------------------------------------------------------
+
+def report_stages(label: str, entry_list: list[dict], rounds: int) -> dict[str, tuple]:
+    results = run_stages(entry_list, rounds)
+    print(f"{label}: {len(entry_list):,} entries "
+          f"({sum(len(e['raw_text']) for e in entry_list):,} chars)")
+    for stage in STAGES:
+        records, seconds, peak = results[stage]
+        print(f"  {stage:<8} {len(entry_list) / seconds:>10,.0f} entries/s  "
+              f"{seconds * 1000:>9,.1f} ms  peak {peak / 2**20:>7,.2f} MiB  "
+              f"{len(records):>8,} records")
+    return results
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m extraction.bench",
+                                     description="Benchmark the register extraction stages")
+    parser.add_argument("--input", help=f"raw register text (default: {SAMPLE.name})")
+    parser.add_argument("--repeat", type=int, default=20,
+                        help="parse the entries N times per round in the scanner comparison")
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--scale", type=int, action="append", default=[],
+                        help="also run on a synthetic register N times the input (repeatable)")
+    args = parser.parse_args(argv)
+
+    path = Path(args.input) if args.input else SAMPLE
+    raw_text = path.read_text(encoding="utf-8", errors="ignore")
+    entry_list = list(iter_entries(raw_text))
+    if not entry_list:
+        sys.exit(f"ERROR: no register entries in {path}")
+
+    results = report_stages(f"Input {path.name}", entry_list, args.rounds)
+    ok = True
+    if not args.input:
+        print("Goldens:")
+        ok = all([report_diffs(stage, results[stage][0]) for stage in STAGES])
+
+    parsed = parse_all(entry_list, EntryScanner)
+    same = parsed == parse_all(entry_list, RegexScanner)
+    ok = ok and same
+    workload = entry_list * args.repeat
+    rates = {name: timed(workload, scanner, args.rounds)
+             for name, scanner in (("regex", RegexScanner), ("lexer", EntryScanner))}
+    print(f"Scanners: {'identical' if same else 'DIFFER'} (lexer vs re.search reference), "
+          f"{len(entry_list)} entries x {args.repeat}")
+    for name, rate in rates.items():
+        print(f"  {name:<8} {rate:>10,.0f} entries/s")
+    print(f"  speedup  {rates['lexer'] / rates['regex']:>10.2f}x")
+
+    base = {stage: len(entry_list) / results[stage][1] for stage in STAGES}
+    for scale in sorted(set(args.scale)):
+        scaled = list(iter_entries(synthesize(raw_text, scale)))
+        scaled_results = report_stages(f"Scale {scale}x", scaled, args.rounds)
+        print("  entries/s vs 1x: " + ", ".join(
+            f"{stage} {len(scaled) / scaled_results[stage][1] / base[stage]:.2f}"
+            for stage in STAGES))
+
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Astoria v2 — Per-entry extraction cache.
+
+A small SQLite key/value store: (stage, key) -> JSON result, where key is
+a hash of the input text under the current PARSER_VERSION (see
+entries.entry_key). Only the main process touches it; workers just parse.
+"""
+
+import json
+import sqlite3
+from typing import Iterable
+
+
+class ExtractionCache:
+    def __init__(self, path: str | None):
+        self._db = sqlite3.connect(path or ":memory:")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            " stage TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL,"
+            " PRIMARY KEY (stage, key))"
+        )
+        self.hits = self.misses = 0
+
+    def get_many(self, stage: str, keys: list[str]) -> dict:
+        found = {}
+        for start in range(0, len(keys), 500):     # SQLite variable limit
+            batch = keys[start:start + 500]
+            marks = ",".join("?" * len(batch))
+            for key, value in self._db.execute(
+                f"SELECT key, value FROM results WHERE stage = ? AND key IN ({marks})",
+                [stage, *batch],
+            ):
+                found[key] = json.loads(value)
+        self.hits += len(found)
+        self.misses += len(set(keys)) - len(found)
+        return found
+
+    def put_many(self, stage: str, items: Iterable[tuple[str, object]]) -> None:
+        with self._db:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO results (stage, key, value) VALUES (?, ?, ?)",
+                [(stage, key, json.dumps(value)) for key, value in items],
+            )
+
+    def prune(self, stage: str, keep: set[str]) -> int:
+        """Drop cached results of stage whose key is not in keep."""
+        stale = [
+            (stage, key) for (key,) in self._db.execute(
+                "SELECT key FROM results WHERE stage = ?", (stage,))
+            if key not in keep
+        ]
+        with self._db:
+            self._db.executemany("DELETE FROM results WHERE stage = ? AND key = ?", stale)
+        return len(stale)
+
+    def close(self) -> None:
+        self._db.close()
@@ -0,0 +1,222 @@
+"""
+Astoria v2 — Extraction CLI.
+
+Usage:
+  python -m extraction all     --input vessel_records_raw.txt [--out-dir DIR]
+  python -m extraction vessels --input vessel_records_raw.txt [--out-dir DIR]
+  python -m extraction events  [--out-dir DIR]
+  python -m extraction people  [--out-dir DIR]
+
+Stages read and write JSON Lines in --out-dir (default: current dir):
+  all      raw register text       -> vessels_extracted + vessel_events
+                                      + person_roles, in one pass
+  vessels  raw register text       -> vessels_extracted.jsonl
+                                      + vessel_events.jsonl (same scan)
+  events   vessels_extracted       -> vessel_events.jsonl
+  people   vessel_events + vessels -> person_roles.jsonl
+Person roles carry a person_id shared by the name variants of one person
+(extraction/resolve.py).
+Inputs may also be the legacy .json arrays. Entries are parsed by the
+anchor-indexed lexer (extraction/lexer.py). `all` is the full rebuild: each
+entry's vessel, events and owners come out of one parse, and the person
+roles are aggregated as the entries stream past, with no intermediate
+file read back. The other stages re-run one step on existing outputs.
+
+Options:
+  --format FMT      output format: jsonl (default) or parquet (needs pyarrow)
+  --workers N       parser processes (default: one per CPU; 1 = in-process)
+  --shard-size N    entries per pool task (default 64)
+  --cache PATH      per-entry result cache (default DIR/.extraction_cache.sqlite)
+  --no-cache        parse everything, keep nothing
+  --prune-cache     drop cached results for entries no longer in the input
+"""
+
+import argparse
+import importlib.util
+import os
+import sys
+import time
+from collections import Counter
+
+from extraction import entries, lexer, people, resolve
+from extraction.cache import ExtractionCache
+from extraction.engine import DEFAULT_SHARD_SIZE, Runner
+from extraction.io import WRITERS, find_records, read_records
+
+VESSELS, EVENTS, PEOPLE = "vessels_extracted", "vessel_events", "person_roles"
+VESSEL_FIELDS = ["hailing_port", "official_number", "place_built", "year_built",
+                 "builder", "tonnage", "length_ft", "decks", "masts"]
+EVENT_FIELDS = ["event_date", "event_port", "previous_port", "master", "owners_text", "notes"]
+
+
+def _input(args, stem: str) -> str:
+    path = find_records(args.out_dir, stem, args.format)
+    if not path:
+        sys.exit(f"ERROR: no {stem}.{args.format} (or .json) in {args.out_dir}; "
+                 f"run the previous stage first")
+    return path
+
+
+def _writer(args, stem: str):
+    return WRITERS[args.format](os.path.join(args.out_dir, f"{stem}.{args.format}"))
+
+
+def _read_entries(args):
+    with open(args.input, encoding="utf-8", errors="ignore") as f:
+        return entries.iter_entries(f.read())
+
+
+def _rates(records: list[dict], fields: list[str]) -> None:
+    if not records:
+        return
+    print("  Field extraction rates:")
+    for field in fields:
+        count = sum(1 for r in records if r.get(field))
+        print(f"    {field:<16} {count}/{len(records)} ({100 * count / len(records):.0f}%)")
+
+
+class _VesselSummary:
+    """Counts for the vessels/events report, without keeping raw_content."""
+
+    def __init__(self):
+        self.vessels: list[dict] = []
+        self.events: list[dict] = []
+        self.types: Counter = Counter()
+        self.without_events = 0
+
+    def add(self, vessel: dict, vessel_events: list[dict]) -> None:
+        self.types[vessel["vessel_type"]] += 1
+        self.vessels.append({f: vessel.get(f) for f in VESSEL_FIELDS})
+        self.events.extend({f: ev.get(f) for f in EVENT_FIELDS} for ev in vessel_events)
+        self.without_events += not vessel_events
+
+    def report(self, writer, events_writer) -> None:
+        print(f"Vessels: {writer.count} -> {writer.path}")
+        print("  Types: " + ", ".join(f"{t} {c}" for t, c in self.types.most_common()))
+        _rates(self.vessels, VESSEL_FIELDS)
+        print(f"Events: {events_writer.count} -> {events_writer.path} "
+              f"({self.without_events} vessels without events)")
+        _rates(self.events, EVENT_FIELDS)
+
+
+def _write_people(args, roles: people.PersonRoles) -> None:
+    records = resolve.resolve(roles.records())
+    with _writer(args, PEOPLE) as writer:
+        writer.write_many(records)
+    by_role = Counter(r["role"] for r in records)
+    print(f"Person roles: {writer.count} -> {writer.path} "
+          f"({len({r['person_id'] for r in records})} people from "
+          f"{len({r['person_key'] for r in records})} name forms; "
+          + ", ".join(f"{role} {n}" for role, n in sorted(by_role.items())) + ")")
+
+
+def run_all(runner: Runner, args) -> None:
+    summary = _VesselSummary()
+    roles = people.PersonRoles()
+    with _writer(args, VESSELS) as writer, _writer(args, EVENTS) as events_writer:
+        for _, (vessel, vessel_events, owners) in runner.run(
+            "entries+owners",
+            _read_entries(args),
+            key=lambda e: entries.entry_key(e["raw_text"]),
+            func=lexer.parse_entry_people,
+        ):
+            writer.write(vessel)
+            events_writer.write_many(vessel_events)
+            summary.add(vessel, vessel_events)
+            for ev, ev_owners in zip(vessel_events, owners):
+                roles.add_event(ev, ev_owners)
+            roles.add_vessel(vessel)
+    summary.report(writer, events_writer)
+    _write_people(args, roles)
+
+
+def run_vessels(runner: Runner, args) -> None:
+    summary = _VesselSummary()
+    with _writer(args, VESSELS) as writer, _writer(args, EVENTS) as events_writer:
+        for _, (vessel, vessel_events) in runner.run(
+            "entries",
+            _read_entries(args),
+            key=lambda e: entries.entry_key(e["raw_text"]),
+            func=lexer.parse_entry,
+        ):
+            writer.write(vessel)
+            events_writer.write_many(vessel_events)
+            summary.add(vessel, vessel_events)
+    summary.report(writer, events_writer)
+
+
+def run_events(runner: Runner, args) -> None:
+    source = _input(args, VESSELS)
+    all_events: list[dict] = []
+    without = 0
+    with _writer(args, EVENTS) as writer:
+        for _, vessel_events in runner.run(
+            "events",
+            read_records(source),
+            key=lambda v: entries.entry_key(v["raw_content"]),
+            func=lexer.extract_events,
+        ):
+            without += not vessel_events
+            writer.write_many(vessel_events)
+            all_events.extend(vessel_events)
+    print(f"Events: {writer.count} -> {writer.path} ({without} vessels without events)")
+    _rates(all_events, EVENT_FIELDS)
+
+
+def run_people(runner: Runner, args) -> None:
+    roles = people.PersonRoles()
+    for ev, owners in runner.run(
+        "owners",
+        read_records(_input(args, EVENTS)),
+        key=lambda ev: entries.entry_key(ev.get("owners_text") or ""),
+        func=people.event_owners,
+    ):
+        roles.add_event(ev, owners)
+    for vessel in read_records(_input(args, VESSELS)):
+        roles.add_vessel(vessel)
+    _write_people(args, roles)
+
+
+STAGES = {"all": run_all, "vessels": run_vessels, "events": run_events, "people": run_people}
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m extraction",
+                                     description="Extract structured data from ship register text")
+    parser.add_argument("stage", choices=list(STAGES))
+    parser.add_argument("--input", help="raw register text (all and vessels stages)")
+    parser.add_argument("--out-dir", default=".")
+    parser.add_argument("--format", choices=list(WRITERS), default="jsonl")
+    parser.add_argument("--workers", type=int, default=0)
+    parser.add_argument("--shard-size", type=int, default=DEFAULT_SHARD_SIZE)
+    parser.add_argument("--cache")
+    parser.add_argument("--no-cache", action="store_true")
+    parser.add_argument("--prune-cache", action="store_true")
+    return parser
+
+
+def main(argv: list[str] | None = None) -> None:
+    args = build_parser().parse_args(argv)
+    if args.stage in ("all", "vessels") and not args.input:
+        sys.exit(f"ERROR: the {args.stage} stage needs --input (pdftotext output of the register)")
+    if args.format == "parquet" and importlib.util.find_spec("pyarrow") is None:
+        sys.exit("ERROR: --format parquet needs pyarrow (pip install pyarrow)")
+    os.makedirs(args.out_dir, exist_ok=True)
+    cache_path = None if args.no_cache else (
+        args.cache or os.path.join(args.out_dir, ".extraction_cache.sqlite"))
+
+    cache = ExtractionCache(cache_path)
+    runner = Runner(cache, args.workers, args.shard_size)
+    started = time.perf_counter()
+    try:
+        STAGES[args.stage](runner, args)
+    finally:
+        runner.close()
+    elapsed = time.perf_counter() - started
+    total = cache.hits + cache.misses
+    print(f"  {total} inputs in {elapsed:.2f}s ({total / elapsed if elapsed else 0:,.0f}/s), "
+          f"{cache.misses} parsed, {cache.hits} from cache, {runner.workers} worker(s)")
+    if args.prune_cache:
+        for stage, keys in runner.keys_seen.items():
+            print(f"  Pruned {cache.prune(stage, keys)} stale {stage} cache entries")
+    cache.close()
@@ -0,0 +1,87 @@
+"""
+Astoria v2 — Sharded, cached extraction runner.
+
+run() feeds items through a parse function in shards. Each shard's cache
+hits are answered locally and only the misses are sent to the process
+pool; results come back in input order and the new ones are cached. At
+most 2 x workers shards are in flight, so memory stays bounded however
+large the register is.
+"""
+
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Callable, Iterable, Iterator
+
+from extraction.cache import ExtractionCache
+
+DEFAULT_SHARD_SIZE = 64
+
+
+def _apply(func: Callable, items: list) -> list:
+    return [func(item) for item in items]
+
+
+def _shards(items: Iterable, size: int) -> Iterator[list]:
+    it = iter(items)
+    while shard := list(islice(it, size)):
+        yield shard
+
+
+class Runner:
+    """Process pool plus cache shared by the stages of one CLI run."""
+
+    def __init__(self, cache: ExtractionCache, workers: int = 0,
+                 shard_size: int = DEFAULT_SHARD_SIZE):
+        self.cache = cache
+        self.workers = workers or os.cpu_count() or 1
+        self.shard_size = shard_size
+        self._pool = ProcessPoolExecutor(self.workers) if self.workers > 1 else None
+        self.keys_seen: dict[str, set[str]] = {}
+
+    def run(
+        self,
+        stage: str,
+        items: Iterable,
+        key: Callable[[object], str],
+        func: Callable,
+    ) -> Iterator[tuple[object, object]]:
+        """(item, func(item)) for every item, in order, using the cache."""
+        seen = self.keys_seen.setdefault(stage, set())
+        in_flight: deque = deque()
+
+        def submit(shard: list):
+            keys = [key(item) for item in shard]
+            seen.update(keys)
+            cached = self.cache.get_many(stage, keys)
+            todo = [(k, item) for k, item in zip(keys, shard) if k not in cached]
+            work = [item for _, item in todo]
+            if not work:
+                future = None
+            elif self._pool:
+                future = self._pool.submit(_apply, func, work)
+            else:
+                future = _apply(func, work)
+            in_flight.append((shard, keys, cached, todo, future))
+
+        def collect() -> Iterator[tuple[object, object]]:
+            shard, keys, cached, todo, future = in_flight.popleft()
+            if todo:
+                fresh = future.result() if self._pool else future
+                new = {k: result for (k, _), result in zip(todo, fresh)}
+                self.cache.put_many(stage, new.items())
+                cached.update(new)
+            for item, k in zip(shard, keys):
+                yield item, cached[k]
+
+        for shard in _shards(items, self.shard_size):
+            submit(shard)
+            if len(in_flight) >= 2 * self.workers:
+                yield from collect()
+        while in_flight:
+            yield from collect()
+
+    def close(self) -> None:
+        if self._pool:
+            self._pool.shutdown()
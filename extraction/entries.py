@@ -0,0 +1,51 @@
+"""
+Astoria v2 — Register entry splitting.
+
+Each entry starts with:  NUMBER. VESSEL NAME, type, of port
+The vessel name is in ALL CAPS. Types: schooner, brig, bark, sloop, ship,
+gas screw, steamer. An entry runs from its header to the next header.
+"""
+
+import hashlib
+import re
+from typing import Iterator
+
+from extraction import PARSER_VERSION
+
+ENTRY_PATTERN = re.compile(
+    r'^(\d+)\s*[\.\,]\s+'                           # entry number
+    r'([A-Z][A-Z\s\.\'\-\&\$]+?)\s*,\s*'           # vessel name (ALL CAPS)
+    r'(schooner|brig|bark|sloop|ship|gas screw|steamer)'  # vessel type
+    r'\s*,?\s*of\s+',
+    re.MULTILINE | re.IGNORECASE
+)
+
+
+def clean_vessel_name(name: str) -> str:
+    """Title Case vessel name with OCR spacing fixed: "A . B . PERRY" -> "A. B. Perry"."""
+    name = re.sub(r'\s+', ' ', name).strip()
+    name = re.sub(r'\s+\.', '.', name)
+    name = re.sub(r'\.\s+', '. ', name)
+    name = name.rstrip('.,').strip()
+    return name.title()
+
+
+def iter_entries(raw_text: str) -> Iterator[dict]:
+    """Register entries in order: entry_num, vessel_name, vessel_type, raw_text."""
+    matches = ENTRY_PATTERN.finditer(raw_text)
+    current = next(matches, None)
+    while current:
+        following = next(matches, None)
+        end = following.start() if following else len(raw_text)
+        yield {
+            "entry_num": int(current.group(1)),
+            "vessel_name": clean_vessel_name(current.group(2)),
+            "vessel_type": current.group(3).strip().lower(),
+            "raw_text": raw_text[current.start():end].strip(),
+        }
+        current = following
+
+
+def entry_key(raw_text: str) -> str:
+    """Cache key for an entry: its raw text under the current parser version."""
+    return hashlib.sha256(f"{PARSER_VERSION}\0{raw_text}".encode()).hexdigest()
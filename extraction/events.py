@@ -0,0 +1,247 @@
+"""
+Astoria v2 — Vessel event extraction.
+
+Parses a vessel record's raw text into its enrollment and registration
+events for the vessel_events table. Each event's fields are searched for
+within its own block, from its header to the next event's header:
+  - event_type: enrolled/registered (domestic vs foreign trade)
+  - event_port: where document was issued (vessel was present)
+  - previous_port: where vessel came from (enables voyage reconstruction)
+  - master: captain at that time
+  - owners_text: full ownership string for text search
+"""
+
+import re
+from difflib import SequenceMatcher
+
+# Main event pattern: Enrolled/Registered, [of PORT,] No. NN, DATE, at PORT
+EVENT_PATTERN = re.compile(
+    r'(Enrolled|Registered)\s*'
+    r'(\(\s*temporary\s*\))?\s*'              # optional (temporary)
+    r',?\s*'
+    r'(?:of\s+([^,]+?)\s*,\s*)?'              # optional "of PORT,"
+    r'No\s*[\.\,]\s*(\d+)\s*,\s*'             # No. NN
+    r'([A-Z][a-z]+\.?\s+\d+\s*,?\s*\d{4})\s*' # date: Mon. DD, YYYY
+    r',?\s*at\s+([^\.]+)',                      # at PORT
+    re.IGNORECASE
+)
+
+# Previously enrolled/registered pattern
+PREVIOUS_PATTERN = re.compile(
+    r'Previously\s+'
+    r'(enrolled|registered)\s*'
+    r'(\(\s*temporary\s*\))?\s*'
+    r'([A-Z][a-z]+\.?\s+\d+\s*,?\s*\d{4})?\s*'  # optional date
+    r',?\s*at\s+([^\.]+)',
+    re.IGNORECASE
+)
+
+# Master pattern — handles OCR-spaced initials like "A . L . Mitchell ."
+# Match "Master:" then capture everything up to a sentence-ending period
+# (period followed by space+uppercase, or period at end, or "Previously", or "Change")
+MASTER_PATTERN = re.compile(
+    r'Master\s*[:\;]\s*(.+?)(?:\.\s*(?:Previously|Change|Surrendered|$|\n))',
+    re.IGNORECASE
+)
+
+# Owners pattern (grab everything between "Owners:" and "Master:")
+OWNERS_PATTERN = re.compile(
+    r'Owners?\s*[:\;]\s*(.+?)(?:\s*Master\s*[:\;])',
+    re.IGNORECASE | re.DOTALL
+)
+
+# Change of master
+CHANGE_MASTER_PATTERN = re.compile(
+    r'Change\s+of\s+master\s*[:\;]\s*([^,\.]+?)(?:\s*,\s*([A-Z][a-z]+\.?\s+\d+\s*,?\s*\d{4}))?(?:\.|,)',
+    re.IGNORECASE
+)
+
+# Notes: tonnage amended, readmeasured, surrendered, trade changed
+NOTES_PATTERNS = [
+    (re.compile(r'having\s+tonnage\s+amended\s*,?\s*(\d+[\.\s]?\d*)\s*tons?', re.IGNORECASE), 'tonnage_amended'),
+    (re.compile(r'having\s+been\s+readmeasured\s*\.?\s*(\d+[\.\s]?\d*)\s*tons?', re.IGNORECASE), 'readmeasured'),
+    (re.compile(r'Surrendered\s*,?\s*([^\.]+)', re.IGNORECASE), 'surrendered'),
+    (re.compile(r'trade\s+changed', re.IGNORECASE), 'trade_changed'),
+]
+
+MONTH_MAP = {
+    'jan': 1, 'feb': 2, 'mar': 3, 'apr': 4, 'may': 5, 'jun': 6,
+    'jul': 7, 'aug': 8, 'sep': 9, 'oct': 10, 'nov': 11, 'dec': 12
+}
+
+
+def parse_date(date_str):
+    """Parse date strings like 'Nov. 14, 1873' or 'Sept 7 , 1855'."""
+    if not date_str:
+        return None
+    # Clean OCR artifacts
+    date_str = re.sub(r'\s+', ' ', date_str.strip())
+    date_str = date_str.replace(' ,', ',').replace(' .', '.')
+
+    # Try pattern: Mon[.] DD, YYYY
+    m = re.match(r'([A-Za-z]+)\.?\s*(\d+)\s*,?\s*(\d{4})', date_str)
+    if m:
+        month_str = m.group(1).lower()[:3]
+        day = int(m.group(2))
+        year = int(m.group(3))
+        month = MONTH_MAP.get(month_str)
+        if month and 1 <= day <= 31 and 1700 <= year <= 1950:
+            try:
+                return f"{year}-{month:02d}-{day:02d}"
+            except:
+                pass
+    return None
+
+
+def clean_text(s):
+    """Clean OCR spacing artifacts."""
+    if not s:
+        return None
+    s = re.sub(r'\s+', ' ', s).strip()
+    # Fix OCR-spaced initials: "A . L ." → "A. L."
+    s = re.sub(r'(\w)\s+\.', r'\1.', s)
+    s = re.sub(r'\s+,', ',', s)
+    s = s.strip(' .,;:')
+    return s if s else None
+
+
+def normalize_port(port_str):
+    """Normalize OCR-garbled port names."""
+    if not port_str:
+        return None
+    port_str = clean_text(port_str)
+    if not port_str:
+        return None
+    # Remove trailing clauses like "having been readmeasured", "having tonnage amended"
+    port_str = re.sub(r',?\s*having\s+.*$', '', port_str, flags=re.IGNORECASE).strip()
+    # Normalize Machias variants (OCR misreadings)
+    machias_variants = re.compile(
+        r'^(?:lachias|llachias|Hachias|l\'achias|Machies|liachias|'
+        r'Machia[^s]|[lI1]achias|Macliias|Maehias|Mach\s*ias|'
+        r'Machins|Mechias|Plachias|ilachias|hlachias|"\s*achias|'
+        r'Machin s|Macbi[ae]s|Macl[il]as|Macbias|Macliins|Maehins|'
+        r'M achias|Macliias|Macliins)$',
+        re.IGNORECASE
+    )
+    if machias_variants.match(port_str):
+        return 'Machias'
+    # Catch "Machias" or close variants with trailing junk
+    if re.match(r'^[Mm]ach', port_str) and len(port_str) > 10:
+        return 'Machias'
+    # Lowercase "machias"
+    if port_str.lower() == 'machias':
+        return 'Machias'
+    # Broad catch: anything 5-10 chars that looks like garbled "Machias"
+    # (not Millbridge, Cherryfield, or other real ports)
+    clean_lower = re.sub(r'[^a-z]', '', port_str.lower())
+    if len(clean_lower) >= 5 and len(clean_lower) <= 10:
+        # Check if it's close to "machias" or "machins"
+        ratio = SequenceMatcher(None, clean_lower, 'machias').ratio()
+        if ratio >= 0.55 and clean_lower not in ('millbridge', 'cherryfield'):
+            return 'Machias'
+    # Also catch ports that captured trailing owner/master text
+    if re.search(r'Owners|Master|Jamers|Ormers|Ovmers', port_str, re.IGNORECASE):
+        first_word = port_str.split(',')[0].split(' ')[0].strip()
+        if first_word:
+            return normalize_port(first_word)
+        return 'Machias'
+    # Catch very short fragments (likely garbled Machias)
+    if len(clean_lower) <= 3:
+        return 'Machias'
+    return port_str
+
+
+def event_records(v: dict, scan) -> list[dict]:
+    """Events of one vessel record, in text order, read through scan.
+
+    scan covers the vessel's raw_content (see lexer.EntryScanner).
+    """
+    vessel_name = v["vessel_name"]
+    raw = v["raw_content"]
+    entry_num = v["entry_num"]
+
+    # Find all enrollment/registration events
+    event_matches = list(scan.finditer(EVENT_PATTERN))
+
+    events = []
+    for ei, em in enumerate(event_matches):
+        event_type_raw = em.group(1).lower()
+        is_temporary = bool(em.group(2))
+        doc_number = em.group(4)
+        date_str = em.group(5)
+        event_port = normalize_port(em.group(6))
+
+        # Build event type
+        if is_temporary:
+            event_type = f"{event_type_raw}_temporary"
+        else:
+            event_type = event_type_raw
+
+        # Parse the date
+        event_date = parse_date(date_str)
+
+        # Get the text block for this event (from this match to next match or end)
+        event_start = em.start()
+        event_end = event_matches[ei + 1].start() if ei + 1 < len(event_matches) else len(raw)
+
+        # Extract master from this event block
+        master = None
+        mm = scan.search(MASTER_PATTERN, event_start, event_end)
+        if mm:
+            master = clean_text(mm.group(1))
+            if master:
+                # Remove trailing periods and whitespace
+                master = master.rstrip(' .')
+                # Handle "same" variants
+                if master.lower() in ('same', 'sane', 'samo', 'snme', 'sanc', 'samc', 'sanie'):
+                    master = '(same as previous)'
+                # Skip if just a single letter (truncated by OCR)
+                elif len(master) <= 1:
+                    master = None
+
+        # Extract owners from this event block
+        owners_text = None
+        om = scan.search(OWNERS_PATTERN, event_start, event_end)
+        if om:
+            owners_text = clean_text(om.group(1))
+            if owners_text and owners_text.lower() in ('same', 'same.', 'sane', 'samo'):
+                owners_text = '(same as previous)'
+
+        # Extract "Previously enrolled/registered at PORT"
+        previous_port = None
+        pm = scan.search(PREVIOUS_PATTERN, event_start, event_end)
+        if pm:
+            previous_port = normalize_port(pm.group(4))
+
+        # Extract change of master
+        change_master = None
+        cm = scan.search(CHANGE_MASTER_PATTERN, event_start, event_end)
+        if cm:
+            change_master = clean_text(cm.group(1))
+
+        # Check for notes
+        notes_list = []
+        for pattern, note_type in NOTES_PATTERNS:
+            nm = scan.search(pattern, event_start, event_end)
+            if nm:
+                notes_list.append(note_type)
+        if change_master:
+            notes_list.append(f"change_of_master: {change_master}")
+
+        notes = "; ".join(notes_list) if notes_list else None
+
+        event = {
+            "vessel_name": vessel_name,
+            "entry_num": entry_num,
+            "event_type": event_type,
+            "event_date": event_date,
+            "event_port": event_port,
+            "previous_port": previous_port,
+            "doc_number": doc_number,
+            "master": master,
+            "owners_text": owners_text,
+            "notes": notes,
+            "event_index": ei,
+        }
+        events.append(event)
+    return events
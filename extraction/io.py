@@ -0,0 +1,104 @@
+"""
+Astoria v2 — Extraction record files.
+
+Outputs are JSON Lines, one record per line, written as they are produced
+to <path>.partial and renamed into place when complete, so a crashed run
+never leaves a truncated output behind. read_records() also accepts the
+legacy indented JSON arrays (e.g. phase3-reference outputs).
+
+Parquet (--format parquet) needs pyarrow, which is imported only when a
+.parquet file is written or read.
+"""
+
+import json
+import os
+from typing import Iterable, Iterator
+
+
+class JsonlWriter:
+    def __init__(self, path: str):
+        self.path = path
+        self.count = 0
+        self._partial = f"{path}.partial"
+        self._file = open(self._partial, "w", encoding="utf-8")
+
+    def write(self, record: dict) -> None:
+        self._file.write(json.dumps(record, ensure_ascii=False, default=str))
+        self._file.write("\n")
+        self.count += 1
+
+    def write_many(self, records: Iterable[dict]) -> None:
+        for record in records:
+            self.write(record)
+
+    def close(self) -> None:
+        self._file.close()
+        os.replace(self._partial, self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self._file.close()
+
+
+class ParquetWriter(JsonlWriter):
+    """JsonlWriter's interface for a .parquet file. Rows are kept until
+    close and written as one table, so every column's type is inferred
+    from all of them (not just from a first batch that may be all None)."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.count = 0
+        self._partial = f"{path}.partial"
+        self._rows: list[dict] = []
+
+    def write(self, record: dict) -> None:
+        self._rows.append(record)
+        self.count += 1
+
+    def close(self) -> None:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        pq.write_table(pa.Table.from_pylist(self._rows), self._partial)
+        self._rows = []
+        os.replace(self._partial, self.path)
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+
+
+WRITERS = {"jsonl": JsonlWriter, "parquet": ParquetWriter}
+
+
+def read_records(path: str) -> Iterator[dict]:
+    """Records of a .jsonl or .parquet file (streamed) or a legacy .json array."""
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(path).iter_batches():
+            yield from batch.to_pylist()
+        return
+    if path.endswith(".json"):
+        with open(path, encoding="utf-8") as f:
+            yield from json.load(f)
+        return
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def find_records(directory: str, stem: str, fmt: str = "jsonl") -> str | None:
+    """<stem>.<fmt> in directory, else the other format, else the legacy
+    <stem>.json, else None."""
+    for suffix in dict.fromkeys((f".{fmt}", ".jsonl", ".parquet", ".json")):
+        path = os.path.join(directory, stem + suffix)
+        if os.path.exists(path):
+            return path
+    return None
@@ -0,0 +1,263 @@
+"""
+Astoria v2 — Anchor-indexed register entry lexer.
+
+The grammar of vessels.py / events.py hangs on a few anchor words
+("Built", "Official", "tons", "ft", "Enrolled", "Master", ...). One scan of
+an entry (str.find per word) indexes where they occur, and from then on
+every pattern is only tried, with re.match, at the offsets where that
+index says a match can start; no pattern rescans the entry:
+
+  PREFIX  the match starts at one of its anchor words
+          ("Built at ...", "Enrolled, No. ...", "Master: ...")
+  NUMBER  the match holds one of its anchor words, and only digits, ".",
+  WORDS   "/" and whitespace (NUMBER) or word characters and whitespace
+          (WORDS) ahead of it ("67.25 tons", "79.3 ft", "two masts"), so
+          it starts in the run of such characters that ends at an anchor
+
+A field with fallbacks (vessels.PORT_PATTERNS, BUILD_PATTERNS,
+TONS_PATTERNS, DIMENSIONS_PATTERNS) is read in one pass over the offsets
+where any of its patterns can start, trying them in priority order at
+each, as an alternation of the cascade would (EntryScanner.first). That
+leftmost match is the answer unless an earlier pattern of the cascade
+matches further on, so only those are tried again, from there.
+
+EntryScanner returns exactly what the plain re.search of each pattern
+would, and the fields and events of an entry come out of the same scanner
+(parse_entry).
+
+RegexScanner is the plain re.search reference, kept for golden checks and
+benchmarks (python -m extraction.bench). A pattern without an anchor spec
+here raises KeyError, so a new pattern can't silently fall back to a full
+rescan.
+"""
+
+import re
+from bisect import bisect_left
+from heapq import merge
+
+from extraction import events, people, vessels
+
+PREFIX, NUMBER, WORDS = "prefix", "number", "words"
+
+# can this character come ahead of the anchor word in a NUMBER / WORDS match
+# (what \d, \s and \w match in a str pattern, and "./")
+_LEAD = {
+    NUMBER: lambda ch: ch.isdecimal() or ch.isspace() or ch in "./",
+    WORDS: lambda ch: ch.isalnum() or ch == "_" or ch.isspace(),
+}
+# their ASCII members, for str.rstrip
+_LEAD_ASCII = {kind: "".join(filter(lead, map(chr, range(128)))) for kind, lead in _LEAD.items()}
+
+VESSEL_TYPE_WORDS = ("schooner", "brig", "bark", "sloop", "ship", "gas screw", "steamer")
+
+# pattern -> (anchor words, PREFIX | NUMBER | WORDS)
+_SPECS = {
+    vessels.PORT_PATTERNS[0]: (VESSEL_TYPE_WORDS, PREFIX),
+    vessels.PORT_PATTERNS[1]: (VESSEL_TYPE_WORDS, PREFIX),
+    vessels.OFFICIAL_PATTERN: (("official",), PREFIX),
+    vessels.BUILD_PATTERN: (("built",), PREFIX),
+    vessels.BUILD_YEAR_PATTERN: (("built",), PREFIX),
+    vessels.GROSS_TONS_PATTERN: (("gross",), NUMBER),
+    vessels.DECIMAL_TONS_PATTERN: (("tons",), NUMBER),
+    vessels.FRACTION_TONS_PATTERN: (("tons",), NUMBER),
+    vessels.WHOLE_TONS_PATTERN: (("tons",), NUMBER),
+    vessels.DIMENSIONS_PATTERN: (("ft",), NUMBER),
+    vessels.LOOSE_DIMENSIONS_PATTERN: (("ft",), NUMBER),
+    vessels.DECK_PATTERN: (("deck",), WORDS),
+    vessels.MAST_PATTERN: (("mast",), WORDS),
+    vessels.STERN_PATTERN: (("stern",), WORDS),
+    vessels.HEAD_PATTERN: (("head",), WORDS),     # "a billethead", "a plain head"
+    events.EVENT_PATTERN: (("enrolled", "registered"), PREFIX),
+    events.PREVIOUS_PATTERN: (("previously",), PREFIX),
+    events.MASTER_PATTERN: (("mast",), PREFIX),       # "Master:" shares the "mast" anchor
+    events.OWNERS_PATTERN: (("owner",), PREFIX),
+    events.CHANGE_MASTER_PATTERN: (("change",), PREFIX),
+}
+_NOTE_ANCHORS = {
+    "tonnage_amended": "having", "readmeasured": "having",
+    "surrendered": "surrendered", "trade_changed": "trade",
+}
+for _pattern, _note in events.NOTES_PATTERNS:
+    _SPECS[_pattern] = ((_NOTE_ANCHORS[_note],), PREFIX)
+
+CASCADES = (vessels.PORT_PATTERNS, vessels.BUILD_PATTERNS,
+            vessels.TONS_PATTERNS, vessels.DIMENSIONS_PATTERNS)
+
+
+def _cascade_spec(cascade: tuple) -> tuple:
+    """Anchor spec covering every pattern of a cascade."""
+    kinds = {_SPECS[p][1] for p in cascade}
+    assert len(kinds) == 1, "a cascade's patterns must share their kind"
+    return tuple(dict.fromkeys(w for p in cascade for w in _SPECS[p][0])), kinds.pop()
+
+
+# cascade (or a leading part of one) -> (anchor words, kind)
+_CASCADE_SPECS = {c[:n]: _cascade_spec(c[:n]) for c in CASCADES for n in range(1, len(c) + 1)}
+
+ANCHOR_WORDS = sorted({w for words, _ in _SPECS.values() for w in words})
+# Anchor pass for the rare text whose lower() changes length (non-ASCII
+# case folding). Zero-width, so anchors inside other words ("Ownership")
+# are all found; no anchor word is a prefix of another, so one alternative
+# per position is enough.
+_ANCHOR = re.compile("(?=(" + "|".join(re.escape(w) for w in ANCHOR_WORDS) + "))", re.IGNORECASE)
+
+
+def anchor_positions(text: str) -> dict[str, list[int]]:
+    """Sorted start offsets of each anchor word in text, case-insensitive."""
+    low = text.lower()
+    at: dict[str, list[int]] = {}
+    if len(low) != len(text):
+        for m in _ANCHOR.finditer(text):
+            at.setdefault(m.group(1).lower(), []).append(m.start())
+        return at
+    for word in ANCHOR_WORDS:
+        i = low.find(word)
+        if i < 0:
+            continue
+        found = at[word] = []
+        while i >= 0:
+            found.append(i)
+            i = low.find(word, i + 1)
+    return at
+
+
+class RegexScanner:
+    """Reference scanner: every search is a plain re.search of the text."""
+
+    def __init__(self, text: str):
+        self.text = text
+
+    def search(self, pattern, pos: int = 0, endpos: int | None = None):
+        return pattern.search(self.text, pos, len(self.text) if endpos is None else endpos)
+
+    def finditer(self, pattern):
+        return pattern.finditer(self.text)
+
+    def first(self, cascade: tuple):
+        """(pattern, match) of the first pattern in cascade that matches
+        anywhere in the text; (None, None) if none does."""
+        for pattern in cascade:
+            m = pattern.search(self.text)
+            if m:
+                return pattern, m
+        return None, None
+
+
+class EntryScanner:
+    """Anchor-driven scanner over one entry; same results as RegexScanner."""
+
+    def __init__(self, text: str):
+        self.text = text
+        self._at = anchor_positions(text)
+        # (anchor words, kind) -> sorted offsets a match can start at
+        self._starts: dict[tuple, list[int]] = {}
+
+    def _offsets(self, words: tuple, kind: str) -> list[int]:
+        if kind is PREFIX and len(words) == 1:
+            return self._at.get(words[0], [])
+        starts = self._starts.get((words, kind))
+        if starts is None:
+            starts = self._starts[(words, kind)] = self._find_starts(words, kind)
+        return starts
+
+    def _find_starts(self, words: tuple, kind: str) -> list[int]:
+        if len(words) == 1:
+            anchors = self._at.get(words[0], [])
+        else:
+            # words never share an offset: none is a prefix of another
+            anchors = list(merge(*(self._at.get(w, []) for w in words)))
+        if kind is PREFIX:
+            return anchors
+        # a match holding anchor a starts in the run of lead characters
+        # ending at a; the run before the previous anchor is already in
+        text, lead, chars = self.text, _LEAD[kind], _LEAD_ASCII[kind]
+        starts, low = [], 0
+        for a in anchors:
+            s = low + len(text[low:a].rstrip(chars))
+            while s > low and not text[s - 1].isascii() and lead(text[s - 1]):
+                s = low + len(text[low:s - 1].rstrip(chars))
+            starts.extend(range(s, a + 1))
+            low = a + 1
+        return starts
+
+    def search(self, pattern, pos: int = 0, endpos: int | None = None):
+        text = self.text
+        endpos = len(text) if endpos is None else endpos
+        starts = self._offsets(*_SPECS[pattern])
+        match = pattern.match
+        for i in range(bisect_left(starts, pos), len(starts)):
+            p = starts[i]
+            if p >= endpos:
+                break
+            m = match(text, p, endpos)
+            if m:
+                return m
+        return None
+
+    def first(self, cascade: tuple):
+        """Same result as RegexScanner.first, from one pass over the
+        offsets where any pattern of the cascade can start.
+
+        At each offset the patterns are tried in cascade order, so the
+        first hit is the leftmost match, by the earliest pattern matching
+        there. No pattern matches before that offset, so only the patterns
+        ahead of the winner can still win, by matching further on: look
+        for those from the next offset, and so on.
+        """
+        text = self.text
+        found = (None, None)
+        pos = 0
+        while cascade:
+            starts = self._offsets(*_CASCADE_SPECS[cascade])
+            hit = None
+            for k in range(bisect_left(starts, pos), len(starts)):
+                p = starts[k]
+                for i, pattern in enumerate(cascade):
+                    m = pattern.match(text, p)
+                    if m:
+                        hit = i, m
+                        break
+                if hit:
+                    break
+            if hit is None:
+                break
+            i, m = hit
+            found = cascade[i], m
+            cascade, pos = cascade[:i], m.start() + 1
+        return found
+
+    def finditer(self, pattern):
+        """Non-overlapping matches in order, like pattern.finditer (PREFIX patterns)."""
+        words, kind = _SPECS[pattern]
+        assert kind is PREFIX, "finditer needs a prefix-anchored pattern"
+        end = 0
+        for p in self._offsets(words, kind):
+            if p < end:
+                continue
+            m = pattern.match(self.text, p)
+            if m:
+                yield m
+                end = m.end()
+
+
+def parse_vessel(entry: dict, scanner=EntryScanner) -> dict:
+    """Vessel record for one register entry (see entries.iter_entries)."""
+    return vessels.vessel_record(entry, scanner(entry["raw_text"]))
+
+
+def extract_events(v: dict, scanner=EntryScanner) -> list[dict]:
+    """Events of one vessel record, in text order."""
+    return events.event_records(v, scanner(v["raw_content"]))
+
+
+def parse_entry(entry: dict, scanner=EntryScanner) -> tuple[dict, list[dict]]:
+    """Vessel record and its events from one scan of the entry."""
+    scan = scanner(entry["raw_text"])
+    vessel = vessels.vessel_record(entry, scan)
+    return vessel, events.event_records(vessel, scan)
+
+
+def parse_entry_people(entry: dict, scanner=EntryScanner) -> tuple[dict, list[dict], list[list[dict]]]:
+    """parse_entry plus the parsed owners of each event (the `all` stage)."""
+    vessel, vessel_events = parse_entry(entry, scanner)
+    return vessel, vessel_events, [people.event_owners(ev) for ev in vessel_events]
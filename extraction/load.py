@@ -0,0 +1,359 @@
+"""
+Astoria v2 — Bulk loader for extracted register records.
+
+Loads the extraction outputs into the Supabase Postgres database:
+
+    python -m extraction.load vessels events people [--in-dir DIR] [--dry-run]
+
+  vessels  vessels_extracted -> documents      one per checksum
+  events   vessel_events     -> vessel_events  one per (document, event_index)
+  people   person_roles      -> person_roles   one per (document, person, role)
+
+Each table is one transaction. The records are COPYed into a temp
+staging table, matched to their vessel documents by a join inside the
+database (events by register entry number, people by vessel name) and
+merged with INSERT ... ON CONFLICT. Events and roles of a loaded vessel
+that are no longer extracted are deleted, so a re-seed leaves the table
+as extracted without emptying it first. --dry-run runs the same
+transaction, prints what it would change and rolls back. Materialized
+views over the loaded tables (voyage_legs and maritime_stats, migrations
+017 and 020) are refreshed afterwards.
+
+Connects to --dsn or $DATABASE_URL; needs migrations 014 (conflict keys)
+and 015 (person ids).
+"""
+
+import argparse
+import hashlib
+import os
+import sys
+import time
+from datetime import date
+from typing import Callable, Iterable, NamedTuple
+
+import psycopg
+from psycopg.types.json import Jsonb
+
+from extraction.io import find_records, read_records
+
+ARCHIVE_NAME = "Machias Ship Registers 1780-1930"
+SAMPLE = 5      # changed / unmatched vessels listed per table
+# materialized view -> the tables it is built from (refreshed after loading them)
+MATERIALIZED = {"voyage_legs": {"events"}, "maritime_stats": {"vessels", "events"}}
+
+
+# --- Row builders -----------------------------------------------------------
+
+def document_title(v: dict) -> str:
+    return f"Ship Registry: {v['vessel_name']} ({v['vessel_type'].title()})"
+
+
+def document_metadata(v: dict) -> dict:
+    meta = {
+        "type": "ship",
+        "ship_name": v["vessel_name"],  # already Title Case from extraction
+        "ship_type": v["vessel_type"],
+        "entry_number": v["entry_num"],
+    }
+    if v.get("official_number"):
+        meta["official_number"] = int(v["official_number"])
+    # record field -> metadata key, where present
+    for field, key in (("hailing_port", "hailing_port"), ("place_built", "place_built"),
+                       ("year_built", "year_built"), ("builder", "builder"),
+                       ("tonnage", "tonnage"), ("length_ft", "length_ft"),
+                       ("beam_ft", "breadth_ft"), ("depth_ft", "depth_ft"),
+                       ("decks", "decks"), ("masts", "masts"),
+                       ("stern_type", "stern"), ("head_type", "head")):
+        if v.get(field):
+            meta[key] = v[field]
+    return meta
+
+
+def document_checksum(v: dict) -> str:
+    content = f"{v['entry_num']}_{v['vessel_name']}_{v['vessel_type']}_{v['raw_content'][:200]}"
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
+def iso_date(value):
+    """YYYY-MM-DD if it is a real date, else None (the parser allows Feb. 30)."""
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(value).isoformat()
+    except ValueError:
+        return None
+
+
+def document_row(v: dict) -> tuple:
+    return (document_title(v), ARCHIVE_NAME, "text", v["raw_content"],
+            document_checksum(v), Jsonb(document_metadata(v)))
+
+
+def event_row(e: dict) -> tuple:
+    return (e.get("entry_num"), e["vessel_name"], e["event_type"], iso_date(e.get("event_date")),
+            e.get("event_port"), e.get("previous_port"), e.get("doc_number"), e.get("master"),
+            e.get("owners_text"), e.get("notes"), e.get("event_index", 0),
+            Jsonb({"entry_num": e.get("entry_num")}))
+
+
+def role_row(r: dict) -> tuple:
+    return (r["person_name"], r["person_name_normalized"], r.get("last_name"), r["vessel_name"],
+            r["role"], r.get("ownership_share"), r.get("residence"),
+            iso_date(r.get("first_date")), iso_date(r.get("last_date")), r.get("event_count", 1),
+            r.get("person_key"), r.get("person_id"))
+
+
+# --- Tables -----------------------------------------------------------------
+
+# Vessel documents of the register, one per entry number / vessel name;
+# the register's own documents win over older seed documents.
+_DOCS_BY_ENTRY = """
+    SELECT DISTINCT ON (metadata->>'entry_number') metadata->>'entry_number' AS entry_number, id
+    FROM documents
+    WHERE metadata->>'type' = 'ship' AND metadata ? 'entry_number'
+    ORDER BY metadata->>'entry_number', archive_name IS NOT DISTINCT FROM %(archive)s DESC,
+             ingested_at DESC
+"""
+_DOCS_BY_NAME = """
+    SELECT DISTINCT ON (metadata->>'ship_name') metadata->>'ship_name' AS ship_name, id
+    FROM documents
+    WHERE metadata->>'type' = 'ship' AND metadata ? 'ship_name'
+    ORDER BY metadata->>'ship_name', archive_name IS NOT DISTINCT FROM %(archive)s DESC,
+             ingested_at DESC
+"""
+
+
+class Table(NamedTuple):
+    target: str
+    stem: str                        # extraction output it is loaded from
+    stage: str                       # temp table DDL body (column definitions)
+    columns: tuple[str, ...]         # staged by COPY, in row order
+    row: Callable[[dict], tuple]
+    key: tuple[str, ...]             # conflict target (migration 014 / checksum)
+    merged: tuple[str, ...]          # columns written to the target
+    label: str                       # column named in the diff output
+    resolve: str | None = None       # UPDATE stage SET document_id = ...
+    insert_only: tuple[str, ...] = ()
+
+
+TABLES = {
+    "vessels": Table(
+        target="documents",
+        stem="vessels_extracted",
+        stage="title TEXT, archive_name TEXT, content_type TEXT, raw_content TEXT, "
+              "checksum TEXT, metadata JSONB",
+        columns=("title", "archive_name", "content_type", "raw_content", "checksum", "metadata"),
+        row=document_row,
+        key=("checksum",),
+        merged=("title", "archive_name", "content_type", "raw_content", "checksum", "metadata"),
+        label="title",
+        # changed text is a new document version (re-ingest), not a reseed
+        insert_only=("raw_content",),
+    ),
+    "events": Table(
+        target="vessel_events",
+        stem="vessel_events",
+        stage="entry_num INTEGER, vessel_name TEXT, event_type TEXT, event_date DATE, "
+              "event_port TEXT, previous_port TEXT, doc_number TEXT, master TEXT, "
+              "owners_text TEXT, notes TEXT, event_index INTEGER, metadata JSONB, "
+              "document_id UUID",
+        columns=("entry_num", "vessel_name", "event_type", "event_date", "event_port",
+                 "previous_port", "doc_number", "master", "owners_text", "notes",
+                 "event_index", "metadata"),
+        row=event_row,
+        key=("document_id", "event_index"),
+        merged=("document_id", "vessel_name", "event_type", "event_date", "event_port",
+                "previous_port", "doc_number", "master", "owners_text", "notes",
+                "event_index", "metadata"),
+        label="vessel_name",
+        resolve=f"""
+            UPDATE stage SET document_id = d.id
+            FROM ({_DOCS_BY_ENTRY}) d
+            WHERE d.entry_number = stage.entry_num::text
+        """,
+    ),
+    "people": Table(
+        target="person_roles",
+        stem="person_roles",
+        stage="person_name TEXT, person_name_normalized TEXT, last_name TEXT, "
+              "vessel_name TEXT, role TEXT, ownership_share TEXT, residence TEXT, "
+              "first_date DATE, last_date DATE, event_count INTEGER, person_key TEXT, "
+              "person_id TEXT, document_id UUID",
+        columns=("person_name", "person_name_normalized", "last_name", "vessel_name", "role",
+                 "ownership_share", "residence", "first_date", "last_date", "event_count",
+                 "person_key", "person_id"),
+        row=role_row,
+        key=("document_id", "person_name_normalized", "role"),
+        merged=("document_id", "person_name", "person_name_normalized", "last_name",
+                "vessel_name", "role", "ownership_share", "residence", "first_date",
+                "last_date", "event_count", "person_key", "person_id"),
+        label="vessel_name",
+        resolve=f"""
+            UPDATE stage SET document_id = d.id
+            FROM ({_DOCS_BY_NAME}) d
+            WHERE d.ship_name = stage.vessel_name
+        """,
+    ),
+}
+
+
+def merge_sql(table: Table) -> str:
+    """INSERT ... ON CONFLICT from the stage, returning (inserted?, label) per changed row."""
+    key = ", ".join(table.key)
+    cols = ", ".join(table.merged)
+    changed = [c for c in table.merged if c not in table.key + table.insert_only]
+    where = "WHERE document_id IS NOT NULL" if table.resolve else ""
+    return f"""
+        INSERT INTO {table.target} AS t ({cols})
+        SELECT DISTINCT ON ({key}) {cols} FROM stage {where} ORDER BY {key}
+        ON CONFLICT ({key}) DO UPDATE
+            SET {", ".join(f"{c} = EXCLUDED.{c}" for c in changed)}
+            WHERE ({", ".join(f"t.{c}" for c in changed)})
+                IS DISTINCT FROM ({", ".join(f"EXCLUDED.{c}" for c in changed)})
+        RETURNING (xmax = 0), t.{table.label}
+    """
+
+
+def stale_sql(table: Table) -> str:
+    """Rows of the loaded documents that the stage no longer has."""
+    match = " AND ".join(f"s.{c} = t.{c}" for c in table.key)
+    return f"""
+        DELETE FROM {table.target} t
+        WHERE t.document_id IN (SELECT document_id FROM stage WHERE document_id IS NOT NULL)
+          AND NOT EXISTS (SELECT 1 FROM stage s WHERE {match})
+        RETURNING t.{table.label}
+    """
+
+
+# --- Loading ----------------------------------------------------------------
+
+def load_table(conn: psycopg.Connection, table: Table, records: Iterable[dict],
+               dry_run: bool = False) -> dict:
+    """Stage, match and merge one table in one transaction; returns the diff."""
+    params = {"archive": ARCHIVE_NAME}
+    with conn.transaction(force_rollback=dry_run), conn.cursor() as cur:
+        cur.execute(f"CREATE TEMP TABLE stage ({table.stage}) ON COMMIT DROP")
+        staged = 0
+        with cur.copy(f"COPY stage ({', '.join(table.columns)}) FROM STDIN") as copy:
+            for record in records:
+                copy.write_row(table.row(record))
+                staged += 1
+
+        unmatched: list[tuple[str, int]] = []
+        if table.resolve:
+            cur.execute(table.resolve, params)
+            cur.execute("SELECT vessel_name, COUNT(*) FROM stage WHERE document_id IS NULL "
+                        "GROUP BY vessel_name ORDER BY vessel_name")
+            unmatched = cur.fetchall()
+
+        cur.execute(f"SELECT COUNT(*) FROM (SELECT DISTINCT {', '.join(table.key)} FROM stage"
+                    + (" WHERE document_id IS NOT NULL" if table.resolve else "") + ") k")
+        matched = cur.fetchone()[0]
+        cur.execute(merge_sql(table))
+        changes = cur.fetchall()
+        deleted: list[str] = []
+        if table.resolve:
+            cur.execute(stale_sql(table))
+            deleted = [label for (label,) in cur.fetchall()]
+        cur.execute(f"SELECT COUNT(*) FROM {table.target}")
+        total = cur.fetchone()[0]
+
+    inserted = [label for is_new, label in changes if is_new]
+    updated = [label for is_new, label in changes if not is_new]
+    return {
+        "staged": staged, "matched": matched, "total": total,
+        "inserted": inserted, "updated": updated, "deleted": deleted,
+        "unchanged": matched - len(changes), "unmatched": unmatched,
+    }
+
+
+def _names(labels: list[str]) -> str:
+    distinct = sorted(set(labels))
+    more = f", ... {len(distinct) - SAMPLE} more" if len(distinct) > SAMPLE else ""
+    return ", ".join(distinct[:SAMPLE]) + more
+
+
+def report(table: Table, diff: dict, elapsed: float) -> None:
+    print(f"{table.target}: {diff['staged']} staged, {diff['matched']} matched -> "
+          f"{len(diff['inserted'])} inserted, {len(diff['updated'])} updated, "
+          f"{len(diff['deleted'])} deleted, {diff['unchanged']} unchanged "
+          f"({diff['total']} rows, {elapsed:.2f}s)")
+    for change in ("inserted", "updated", "deleted"):
+        if diff[change]:
+            print(f"  {change + ':':<10} {_names(diff[change])}")
+    if diff["unmatched"]:
+        rows = sum(n for _, n in diff["unmatched"])
+        print(f"  {rows} rows skipped, no vessel document for {len(diff['unmatched'])} vessels: "
+              + _names([name for name, _ in diff["unmatched"]]))
+
+
+def refresh_views(conn: psycopg.Connection, names: list[str]) -> None:
+    """Refresh the materialized views built from the loaded tables."""
+    for view, tables in MATERIALIZED.items():
+        if not tables & set(names):
+            continue
+        if conn.execute("SELECT to_regclass(%s)", (view,)).fetchone()[0] is None:
+            continue    # its migration isn't applied
+        started = time.perf_counter()
+        conn.execute(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {view}")
+        print(f"{view}: refreshed ({time.perf_counter() - started:.2f}s)")
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m extraction.load",
+                                     description="Bulk-load extracted register records")
+    parser.add_argument("tables", nargs="*", metavar="TABLE",
+                        help="vessels, events, people (default: all, in that order)")
+    parser.add_argument("--in-dir", default=os.getcwd(),
+                        help="directory with the extraction outputs (default: current dir)")
+    parser.add_argument("--dsn", default=os.getenv("DATABASE_URL"),
+                        help="Postgres connection URL (default: $DATABASE_URL)")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="show what would change, then roll back")
+    args = parser.parse_args(argv)
+    unknown = set(args.tables) - set(TABLES)
+    if unknown:
+        parser.error(f"unknown table(s): {', '.join(sorted(unknown))} (choose from {', '.join(TABLES)})")
+    if not args.dsn:
+        sys.exit("ERROR: set DATABASE_URL (Supabase Settings → Database) or pass --dsn")
+
+    # documents before the rows that point at them
+    names = [name for name in TABLES if not args.tables or name in args.tables]
+    sources = {}
+    for name in names:
+        path = find_records(args.in_dir, TABLES[name].stem)
+        if not path:
+            sys.exit(f"ERROR: no {TABLES[name].stem}.jsonl (or .json) in {args.in_dir}; "
+                     f"run python -m extraction first")
+        sources[name] = path
+
+    inserted_docs = 0
+    with psycopg.connect(args.dsn, autocommit=True) as conn:   # one transaction() per table
+        for name in names:
+            table = TABLES[name]
+            started = time.perf_counter()
+            try:
+                diff = load_table(conn, table, read_records(sources[name]), args.dry_run)
+            except psycopg.errors.InvalidColumnReference:
+                sys.exit(f"ERROR: {table.target} has no unique key on ({', '.join(table.key)}); "
+                         f"run backend/migrations/014_bulk_load_keys.sql first")
+            except psycopg.Error as e:
+                sys.exit(f"ERROR: loading {table.target} failed, nothing written: {e}")
+            report(table, diff, time.perf_counter() - started)
+            if table.target == "documents":
+                inserted_docs = len(diff["inserted"])
+        if not args.dry_run:
+            try:
+                refresh_views(conn, names)
+            except psycopg.Error as e:
+                sys.exit(f"ERROR: refreshing views failed (the tables are loaded): {e}")
+
+    if args.dry_run:
+        print("Dry run: rolled back, nothing written.")
+    elif inserted_docs:
+        print(f"\nNEXT STEP: embed the {inserted_docs} new documents on the VM:\n"
+              f"  docker compose exec backend python -m scripts.seed_embeddings")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+"""
+Astoria v2 — Person role extraction.
+
+People (masters, owners, builders) from vessel events and vessel records,
+aggregated to one record per person+vessel+role combination:
+  1. events -> master names per event
+  2. events -> owners_text -> individual owner names + shares
+  3. vessels -> builder per vessel
+"""
+
+import re
+
+ROLE_ORDER = {"master": 0, "owner": 1, "builder": 2}
+
+
+def clean_name(name):
+    """Clean and normalize a person's name."""
+    if not name:
+        return None
+    # Fix OCR-spaced initials: "A . L ." → "A. L."
+    name = re.sub(r'(\w)\s+\.', r'\1.', name)
+    # Fix missing space after period: "A.L." → "A. L."
+    name = re.sub(r'\.([A-Z])', r'. \1', name)
+    # Remove multiple spaces
+    name = re.sub(r'\s+', ' ', name).strip()
+    # Remove trailing periods and junk
+    name = name.rstrip(' .,;:')
+    # Remove leading junk characters
+    name = re.sub(r'^[^A-Za-z]+', '', name)
+    # Skip if too short or clearly not a name
+    if not name or len(name) < 3:
+        return None
+    # Skip if it's all lowercase (probably a word, not a name)
+    if name == name.lower():
+        return None
+    # Skip common non-name strings
+    skip_words = {'same', 'sane', 'samo', 'none', 'copartners', 'agent', 'and',
+                  'with', 'exception', 'lieu', 'Abstracts', 'Registers', 'Enrollments',
+                  'Master', 'Owners', 'Previously', 'Registered', 'Enrolled',
+                  'Square', 'Elliptic', 'Round', 'stern', 'Haster', 'Oumers',
+                  'Ormers', 'Overs', 'Ovmers', 'Moster', 'Change', 'Surrendered'}
+    # Also skip known town/place names that get captured as person names
+    town_names = {
+        'new york city', 'east machias', 'columbia falls', 'jonesport',
+        'machias', 'addison', 'harrington', 'cherryfield', 'boston',
+        'portland', 'millbridge', 'steuben', 'cutler', 'lubec',
+        'calais', 'eastport', 'pembroke', 'dennysville', 'columbia',
+        'new bedford', 'philadelphia', 'baltimore', 'new york',
+        'bangor', 'rockland', 'bath', 'ellsworth', 'bucksport',
+        'tremont', 'augusta', 'norfolk', 'mobile', 'savannah',
+        'fernandina', 'new haven', 'bridgeport', 'charleston',
+        'new orleans', 'st george', 'whiting', 'machiasport',
+        'marshfield', 'roque bluffs', 'bucks harbor', 'centerville',
+        'south addison', 'west jonesport', 'indian river', 'perry',
+    }
+    if name.lower() in town_names:
+        return None
+    if name.split()[0] in skip_words:
+        return None
+    return name
+
+
+def extract_last_name(name):
+    """Extract the likely surname from a full name."""
+    if not name:
+        return None
+    parts = name.split()
+    if not parts:
+        return None
+    # Last word that's not a suffix (Jr., Sr., etc.)
+    for p in reversed(parts):
+        if p.rstrip('.') not in ('Jr', 'Sr', 'III', 'II', 'IV'):
+            return p.rstrip('.')
+    return parts[-1].rstrip('.')
+
+
+def parse_owners_text(owners_text, vessel_name, event_date):
+    """Parse owners_text into individual owner records.
+
+    Format patterns:
+      "John B. Chandler, 4/64, Abraham K. McKenzie, 2/64, ... Harrington"
+      "Jesse L. Nash, 3/4, Columbia ; Alexander H. Wass, 1/4, Boston, Mass"
+      "same, with exception of X, 2/64, in lieu of Y, 2/64"
+    """
+    if not owners_text:
+        return []
+
+    # Skip "same" variants
+    text = owners_text.strip()
+    if text.lower().startswith('same') and 'exception' not in text.lower():
+        return []
+
+    owners = []
+
+    # Handle "with exception of X in lieu of Y" — extract just the new owner
+    exception_match = re.search(
+        r'exception\s+of\s+(.+?)(?:,\s*\d+\s*/\s*\d+)?(?:,\s*(?:agent\s*,?\s*)?(\w[\w\s]*?))?(?:\s*,?\s*in\s+lieu)',
+        text, re.IGNORECASE
+    )
+    if exception_match:
+        name = clean_name(exception_match.group(1))
+        if name:
+            owners.append({
+                'person_name': name,
+                'ownership_share': None,
+                'residence': None,
+            })
+        return owners
+
+    # Main parsing: split on semicolons first (separate town groups)
+    # Then within each group, find "Name, share" patterns
+
+    # Pattern: Name (with initials), optional share (N/N)
+    # Names are typically: "FirstName MiddleInitial. LastName" or "F. M. LastName"
+    owner_pattern = re.compile(
+        r'([A-Z][a-zA-Z]*(?:\s*\.?\s+[A-Z][\.\w]*)*(?:\s+[A-Z][a-zA-Z]+)+)'  # name
+        r'\s*,?\s*'
+        r'(\d+\s*/\s*\d+)?'  # optional share
+    )
+
+    # Find all name-like patterns
+    for m in owner_pattern.finditer(text):
+        raw_name = m.group(1).strip()
+        share = m.group(2)
+
+        name = clean_name(raw_name)
+        if not name:
+            continue
+
+        # Clean up share formatting
+        if share:
+            share = re.sub(r'\s+', '', share)  # "4 / 64" → "4/64"
+
+        # Try to extract residence (town name after the share, before semicolon)
+        residence = None
+        after_match = text[m.end():]
+        res_match = re.match(r'\s*,?\s*([A-Z][a-z]+(?:\s+[A-Z][a-z]+)*(?:\s*,\s*[A-Z][a-z]+\.?)?)\s*[;\.]',
+                            after_match)
+        if res_match:
+            res = res_match.group(1).strip()
+            # Only accept if it looks like a place name (not another person)
+            if len(res.split()) <= 4 and not re.search(r'\d+\s*/\s*\d+', after_match[:len(res)+5]):
+                residence = res
+
+        # Skip entries without a share that look like place names
+        # (place names appear after the last owner in a group, before semicolon)
+        if not share:
+            words = name.split()
+            has_initial = any(w.endswith('.') and len(w) <= 3 for w in words)
+            if not has_initial and len(words) <= 3:
+                # Likely a town name unless it matches "Firstname Lastname" with common first names
+                continue
+
+        owners.append({
+            'person_name': name,
+            'ownership_share': share,
+            'residence': residence,
+        })
+
+    return owners
+
+
+class PersonRoles:
+    """Aggregates person roles keyed on (person_name_normalized, vessel, role).
+
+    Feed masters and owners event by event, in event order (a "same" master
+    resolves to the vessel's last named master), and builders vessel by
+    vessel. Owners are passed pre-parsed (parse_owners_text), so parsing
+    can run on a process pool.
+    """
+
+    def __init__(self):
+        self._people = {}       # (name_norm, vessel, role) -> record
+        self._last_master = {}  # per vessel, last known master
+
+    def _add(self, name, vessel, role, date, share=None, residence=None):
+        key = (name.lower(), vessel, role)
+        rec = self._people.get(key)
+        if rec is None:
+            self._people[key] = {
+                'person_name': name,
+                'person_name_normalized': name.lower(),
+                'last_name': extract_last_name(name),
+                'vessel_name': vessel,
+                'role': role,
+                'ownership_share': share,
+                'residence': residence,
+                'first_date': date,
+                'last_date': date,
+                'event_count': 1,
+            }
+            return
+        if role == 'builder':
+            return
+        rec['event_count'] += 1
+        if share and not rec['ownership_share']:
+            rec['ownership_share'] = share
+        if residence and not rec['residence']:
+            rec['residence'] = residence
+        if date:
+            if not rec['first_date'] or date < rec['first_date']:
+                rec['first_date'] = date
+            if not rec['last_date'] or date > rec['last_date']:
+                rec['last_date'] = date
+
+    def add_event(self, ev, owners):
+        """One vessel event and its parsed owners."""
+        vessel = ev['vessel_name']
+        date = ev.get('event_date')
+        master = ev.get('master')
+        if master and master != '(same as previous)':
+            self._last_master[vessel] = master
+        elif master == '(same as previous)':
+            master = self._last_master.get(vessel)
+        if master and master != '(same as previous)':
+            name = clean_name(master)
+            if name:
+                self._add(name, vessel, 'master', date)
+        for owner in owners:
+            self._add(owner['person_name'], vessel, 'owner', date,
+                      owner.get('ownership_share'), owner.get('residence'))
+
+    def add_vessel(self, v):
+        """A vessel record's builder."""
+        name = clean_name(v.get('builder'))
+        if name:
+            year = v.get('year_built')
+            self._add(name, v['vessel_name'], 'builder',
+                      f"{year}-01-01" if year else None, residence=v.get('place_built'))
+
+    def records(self):
+        """All person roles, sorted by name, vessel and role."""
+        return sorted(
+            self._people.values(),
+            key=lambda p: (p['person_name_normalized'], p['vessel_name'], ROLE_ORDER[p['role']]),
+        )
+
+
+def event_owners(ev):
+    """Parsed owners of one event (empty for none or "same as previous")."""
+    owners_text = ev.get('owners_text')
+    if not owners_text or owners_text == '(same as previous)':
+        return []
+    return parse_owners_text(owners_text, ev['vessel_name'], ev.get('event_date'))
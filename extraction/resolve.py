@@ -0,0 +1,202 @@
+"""
+Astoria v2 — Person entity resolution.
+
+person_roles rows name the same person in several ways: "A. A. Lowell",
+"A A Lowell", "Albert A. Lowell", OCR slips like "Patterscn". resolve()
+gives every row a person_key (the name as lowercase letters, one space
+between words: "a a lowell") and a person_id shared by all the keys that
+are taken to be one person:
+
+  1. block   keys are grouped by the Soundex code of the surname and the
+             first initial; in surname order, each key is compared with
+             the next WINDOW keys of its block
+  2. score   name similarity (difflib ratio) plus evidence: a shared
+             vessel, or careers that overlap in time; careers far apart
+             count against (father and son, grandfather and grandson)
+  3. merge   pairs scoring >= MERGE_SCORE are joined, unless that would
+             put conflicting names in one person ("John B." and "John C."
+             may each join "John", but never each other; "Jr." never
+             joins the name without it)
+
+Given names match when equal, when one is the other's initial, or when
+both are spelled out and differ only by an OCR slip ("Jobn", "John").
+
+The window keeps the work linear in the number of distinct names however
+common a surname gets (a block of up to WINDOW + 1 keys is compared in
+full). Most pairs are then rejected before difflib's ratio(): by given
+names, then by length and by quick_ratio(), upper bounds on the ratio
+that fall short of what the pair's evidence leaves to make up.
+
+person_id is a hash of the person's canonical key (the key with the most
+events, then the longest), so it is stable across re-runs as long as
+that name stays the person's best attested form.
+"""
+
+import hashlib
+import re
+from collections import defaultdict
+from difflib import SequenceMatcher
+from functools import lru_cache
+
+MERGE_SCORE = 0.9
+OCR_SCORE = 0.75        # spelled-out given names this similar are one name
+WINDOW = 8
+SUFFIXES = {"jr", "sr", "ii", "iii", "d"}    # "2d" loses its digit to person_key
+
+_SOUNDEX = {c: d for d, letters in
+            (("1", "bfpv"), ("2", "cgjkqsxz"), ("3", "dt"), ("4", "l"), ("5", "mn"), ("6", "r"))
+            for c in letters}
+
+
+def person_key(name: str) -> str:
+    """Lowercase letters-only words of a name: "A. A. Lowell" -> "a a lowell".
+
+    Keep in step with backend/app/services/retrieval.py:_person_key.
+    """
+    return " ".join(re.findall(r"[a-z]+", name.lower()))
+
+
+def soundex(word: str) -> str:
+    if not word:
+        return ""
+    code, last = word[0].upper(), _SOUNDEX.get(word[0], "")
+    for c in word[1:]:
+        digit = _SOUNDEX.get(c, "")
+        if digit and digit != last:
+            code += digit
+        if c not in "hw":          # h/w don't separate equal codes
+            last = digit
+    return (code + "000")[:4]
+
+
+def _split(key: str) -> tuple[list[str], str, tuple[str, ...]]:
+    """(given names, surname, suffixes) of a person_key."""
+    words = key.split()
+    suffixes = []
+    while len(words) > 1 and words[-1] in SUFFIXES:
+        suffixes.insert(0, words.pop())
+    return words[:-1], words[-1] if words else "", tuple(suffixes)
+
+
+@lru_cache(maxsize=65536)
+def _same_given(a: str, b: str) -> bool:
+    if a == b:
+        return True
+    if len(a) == 1 or len(b) == 1:
+        return a[0] == b[0]
+    return a[0] == b[0] and SequenceMatcher(None, a, b).ratio() >= OCR_SCORE
+
+
+def _given_compatible(a: list[str], b: list[str]) -> bool:
+    """The shorter list of given names fits the longer one in order
+    ("john" ~ "john b", "j b" ~ "john b", but not "john b" ~ "john c")."""
+    if len(a) > len(b):
+        a, b = b, a
+    i = 0
+    for word in b:
+        if i < len(a) and _same_given(a[i], word):
+            i += 1
+    return i == len(a)
+
+
+class _Name:
+    """Everything the person_roles rows say about one person_key."""
+
+    def __init__(self, key: str):
+        self.key = key
+        self.given, self.surname, self.suffixes = _split(key)
+        self.signature = (tuple(self.given), self.suffixes)    # all conflict() looks at
+        self.matcher = SequenceMatcher(None, b=key)     # indexes key once for every score()
+        self.vessels: set[str] = set()
+        self.events = 0
+        self.first = self.last = None     # years
+
+    def add(self, row: dict) -> None:
+        self.vessels.add(row["vessel_name"])
+        self.events += row.get("event_count") or 1
+        for field in ("first_date", "last_date"):
+            if row.get(field):
+                year = int(row[field][:4])
+                self.first = year if self.first is None else min(self.first, year)
+                self.last = year if self.last is None else max(self.last, year)
+
+
+def conflict(a: _Name, b: _Name) -> bool:
+    """The two names can't be one person (different given names or suffix)."""
+    return a.suffixes != b.suffixes or not _given_compatible(a.given, b.given)
+
+
+def score(a: _Name, b: _Name) -> float:
+    """Likelihood that two names in one block are the same person (0.0 for
+    a pair that can't reach MERGE_SCORE)."""
+    if conflict(a, b):
+        return 0.0
+    evidence = 0.15 if a.vessels & b.vessels else 0.0
+    if None not in (a.first, b.first):
+        gap = max(a.first, b.first) - min(a.last, b.last)
+        if gap <= 10:
+            evidence += 0.1
+        elif gap > 40:
+            evidence -= 0.3
+    # upper bounds on ratio(), cheapest first, against what evidence leaves to make up
+    needed = MERGE_SCORE - evidence
+    if 2 * min(len(a.key), len(b.key)) / (len(a.key) + len(b.key)) < needed:
+        return 0.0
+    matcher = b.matcher
+    matcher.set_seq1(a.key)
+    if matcher.quick_ratio() < needed:
+        return 0.0
+    return matcher.ratio() + evidence
+
+
+def _pairs(names: list[_Name]):
+    # surname order keeps the spellings of one surname within each other's window
+    names = sorted(names, key=lambda n: (n.surname, n.key))
+    for i, a in enumerate(names):
+        for b in names[i + 1:i + WINDOW + 1]:
+            yield a, b
+
+
+def resolve(records: list[dict]) -> list[dict]:
+    """records with person_key and person_id added (in place, same order)."""
+    names: dict[str, _Name] = {}
+    for r in records:
+        r["person_key"] = key = person_key(r["person_name"])
+        names.setdefault(key, _Name(key)).add(r)
+
+    blocks: dict[tuple, list[_Name]] = defaultdict(list)
+    for n in names.values():
+        blocks[(soundex(n.surname), n.given[0][0] if n.given else "")].append(n)
+
+    # union-find over keys; each root keeps its members, and one member per
+    # distinct signature for the conflict check, so merging a big cluster
+    # of spellings costs its distinct given names, not its size squared
+    parent = {key: key for key in names}
+    members = {key: [names[key]] for key in names}
+    signatures = {key: {names[key].signature: names[key]} for key in names}
+
+    def root(key: str) -> str:
+        while parent[key] != key:
+            parent[key] = key = parent[parent[key]]
+        return key
+
+    candidates = [(s, a.key, b.key) for block in blocks.values() for a, b in _pairs(block)
+                  if (s := score(a, b)) >= MERGE_SCORE]
+    for _, a, b in sorted(candidates, key=lambda c: (-c[0], c[1], c[2])):  # best pairs first
+        ra, rb = root(a), root(b)
+        if ra == rb or any(conflict(x, y) for x in signatures[ra].values()
+                           for y in signatures[rb].values()):
+            continue
+        parent[rb] = ra
+        members[ra] += members.pop(rb)
+        signatures[ra].update(signatures.pop(rb))
+
+    person_ids = {}
+    for group in members.values():
+        canonical = max(group, key=lambda n: (n.events, len(n.key), n.key)).key
+        person_id = hashlib.sha256(canonical.encode()).hexdigest()[:16]
+        for n in group:
+            person_ids[n.key] = person_id
+    for r in records:
+        r["person_id"] = person_ids[r["person_key"]]
+    return records
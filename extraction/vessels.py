@@ -0,0 +1,240 @@
+"""
+Astoria v2 — Vessel record parsing.
+
+Structured fields of one register entry: hailing port, official number,
+build place/year/builder, tonnage, dimensions, decks, masts, stern, head.
+
+The grammar is the compiled patterns below. A field with fallbacks is a
+cascade (PORT_PATTERNS, BUILD_PATTERNS, TONS_PATTERNS, DIMENSIONS_PATTERNS):
+the first pattern that matches anywhere in the entry wins, and
+scan.first() finds it. The functions take a scanner rather than the text:
+lexer.EntryScanner tries each pattern only where the entry's anchor words
+say it can start and reads a cascade in one pass over those offsets,
+lexer.RegexScanner is the plain re.search reference. Both read the same
+patterns, so the two can't drift apart.
+"""
+
+import re
+
+VESSEL_TYPES = r'(?:schooner|brig|bark|sloop|ship|gas screw|steamer)'
+
+# Hailing port: "schooner, of PORT" up to the next field
+PORT_PATTERNS = (
+    re.compile(
+        VESSEL_TYPES + r'\s*,?\s*of\s+(.+?)[\.\s]*(?:Official|Built|Previously|\d+\s*/\s*\d+|\d+[\.\s]\d+\s*(?:gross|tons))',
+        re.IGNORECASE
+    ),
+    # Fallback: simpler pattern - get everything after "of" until period
+    re.compile(
+        VESSEL_TYPES + r'\s*,?\s*of\s+([A-Z][A-Za-z\s,\.]+?)(?:\.\s+(?:Official|Built|Previously)|\.\s+\d)',
+        re.IGNORECASE
+    ),
+)
+
+OFFICIAL_PATTERN = re.compile(r'Official\s+No[\.\s]+(\d+)', re.IGNORECASE)
+
+# Built at LOCATION, YEAR, by BUILDER, master carpenter.
+BUILD_PATTERN = re.compile(
+    r'Built\s+at\s+(.+?)\s*,\s*'                    # location
+    r'(\d{4})\s*'                                      # year
+    r',\s*by\s+(.+?)'                                  # builder name
+    r'(?:\s*,\s*master\s+carpenter)?'                 # optional title
+    r'\s*\.\s*\d',                                     # period then tonnage digit
+    re.IGNORECASE
+)
+# Simpler pattern: Built at LOCATION, YEAR.
+BUILD_YEAR_PATTERN = re.compile(r'Built\s+at\s+(.+?)\s*,\s*(\d{4})', re.IGNORECASE)
+BUILD_PATTERNS = (BUILD_PATTERN, BUILD_YEAR_PATTERN)
+
+# Tonnage. The historical format uses 95ths: NNN NN/95 tons.
+GROSS_TONS_PATTERN = re.compile(       # NNN.NN gross tons, NNN.NN net tons
+    r'(\d+\.?\d*)\s+gross\s+tons?\s*,?\s*(\d+\.?\d*)\s+net\s+tons?', re.IGNORECASE)
+DECIMAL_TONS_PATTERN = re.compile(r'(\d+\.\d+)\s+tons', re.IGNORECASE)
+FRACTION_TONS_PATTERN = re.compile(r'(\d+)\s+(\d+)\s*/\s*(\d+)\s+tons', re.IGNORECASE)
+WHOLE_TONS_PATTERN = re.compile(r'(\d+)\s+tons', re.IGNORECASE)
+TONS_PATTERNS = (GROSS_TONS_PATTERN, DECIMAL_TONS_PATTERN, FRACTION_TONS_PATTERN, WHOLE_TONS_PATTERN)
+
+# Dimensions: NN.N ft. x NN.N ft. x N.N ft (decimal format)
+DIMENSIONS_PATTERN = re.compile(
+    r'(\d+\.?\d*)\s*ft\.?\s*(?:\d+(?:\s*/\s*\d+)?\s*in\.?\s*)?x\s*'
+    r'(\d+\.?\d*)\s*ft\.?\s*(?:\d+(?:\s*/\s*\d+)?\s*in\.?\s*)?x\s*'
+    r'(\d+\.?\d*)\s*ft',
+    re.IGNORECASE
+)
+# Broader pattern: three numbers separated by x near "ft"
+LOOSE_DIMENSIONS_PATTERN = re.compile(
+    r'(\d+[\.\s]?\d*)\s*(?:ft|Ft)[\.\s]*(?:\d+[^x]*?)?\s*x\s*'
+    r'(\d+[\.\s]?\d*)\s*(?:ft|Ft)[\.\s]*(?:\d+[^x]*?)?\s*x\s*'
+    r'(\d+[\.\s]?\d*)\s*(?:ft|Ft)',
+    re.IGNORECASE
+)
+DIMENSIONS_PATTERNS = (DIMENSIONS_PATTERN, LOOSE_DIMENSIONS_PATTERN)
+
+DECK_PATTERN = re.compile(r'(\w+)\s+deck', re.IGNORECASE)
+MAST_PATTERN = re.compile(r'(\w+)\s+mast', re.IGNORECASE)
+STERN_PATTERN = re.compile(r'(square|elliptic|round)\s+stern', re.IGNORECASE)
+HEAD_PATTERN = re.compile(r'a\s+(billethead|figurehead|scrollhead|plain head)', re.IGNORECASE)
+
+DECK_MAP = {'one': 1, 'two': 2, 'three': 3, '1': 1, '2': 2, '3': 3}
+MAST_MAP = {'one': 1, 'two': 2, 'three': 3, 'four': 4, '1': 1, '2': 2, '3': 3, '4': 4}
+
+
+def parse_hailing_port(scan):
+    """Extract hailing port from 'of PORT' pattern after vessel type."""
+    pattern, m = scan.first(PORT_PATTERNS)
+    if pattern is PORT_PATTERNS[0]:
+        port = m.group(1).strip()
+        # Clean OCR artifacts and trailing punctuation
+        port = re.sub(r'\s+', ' ', port)
+        port = port.rstrip(' .,;:')
+        return port
+
+    if m:
+        port = m.group(1).strip().rstrip(' .,;:')
+        port = re.sub(r'\s+', ' ', port)
+        return port
+    return None
+
+
+def parse_official_number(scan):
+    """Extract Official No. from entry."""
+    m = scan.search(OFFICIAL_PATTERN)
+    if m:
+        return m.group(1)
+    return None
+
+
+def parse_build_info(scan):
+    """Extract build location, year, and builder."""
+    pattern, m = scan.first(BUILD_PATTERNS)
+    if pattern is BUILD_PATTERN:
+        location = re.sub(r'\s+', ' ', m.group(1).strip().rstrip(' ,'))
+        year = int(m.group(2))
+        builder = None
+        if m.group(3):
+            builder = re.sub(r'\s+', ' ', m.group(3).strip().rstrip(' ,'))
+            # Remove trailing "master carpenter" if it got captured
+            builder = re.sub(r'\s*,?\s*master\s+carpenter\s*$', '', builder, flags=re.IGNORECASE).strip()
+        return location, year, builder
+
+    if m:
+        location = re.sub(r'\s+', ' ', m.group(1).strip().rstrip(' ,'))
+        year = int(m.group(2))
+        return location, year, None
+
+    return None, None, None
+
+
+def parse_tonnage(scan):
+    """Extract tonnage info. The historical format uses 95ths: NNN NN/95 tons."""
+    pattern, m = scan.first(TONS_PATTERNS)
+    if pattern is FRACTION_TONS_PATTERN:
+        whole, numer, denom = (int(g) for g in m.groups())
+        if denom:
+            return round(whole + numer / denom, 2)
+        m = scan.search(WHOLE_TONS_PATTERN)
+    if m:
+        return float(m.group(1))
+
+    return None
+
+
+def _plausible(length, beam, depth):
+    # Sanity check: vessels are typically 30-250 ft long
+    return 10 < length < 500 and 5 < beam < 100 and 2 < depth < 50
+
+
+def parse_dimensions(scan):
+    """Extract dimensions: length x beam x depth."""
+    pattern, m = scan.first(DIMENSIONS_PATTERNS)
+    if pattern is DIMENSIONS_PATTERN:
+        dims = tuple(float(g) for g in m.groups())
+        if _plausible(*dims):
+            return dims
+        m = scan.search(LOOSE_DIMENSIONS_PATTERN)
+    if m:
+        try:
+            dims = tuple(float(g.replace(' ', '')) for g in m.groups())
+        except ValueError:     # only spaces are dropped; "12\n5" is not a number
+            return None, None, None
+        if _plausible(*dims):
+            return dims
+    return None, None, None
+
+
+def parse_deck_masts(scan):
+    """Extract deck and mast configuration."""
+    decks = None
+    masts = None
+    m = scan.search(DECK_PATTERN)
+    if m:
+        decks = DECK_MAP.get(m.group(1).lower())
+
+    m = scan.search(MAST_PATTERN)
+    if m:
+        masts = MAST_MAP.get(m.group(1).lower())
+
+    return decks, masts
+
+
+def parse_stern_head(scan):
+    """Extract stern type and head type."""
+    stern = None
+    head = None
+    m = scan.search(STERN_PATTERN)
+    if m:
+        stern = m.group(1).lower()
+
+    m = scan.search(HEAD_PATTERN)
+    if m:
+        head = m.group(1).lower()
+
+    return stern, head
+
+
+def vessel_record(entry: dict, scan) -> dict:
+    """Vessel record for one register entry, read through scan."""
+    port = parse_hailing_port(scan)
+    if port:
+        # Normalize port names: remove OCR extra spaces before commas/periods
+        port = re.sub(r'\s+,', ',', port)
+        port = re.sub(r'\s+\.', '.', port)
+        # Normalize common OCR variants
+        port = port.replace('Mass .', 'Mass.').replace('Mass,', 'Mass.')
+        port = port.replace('Conn .', 'Conn.').replace('N . Y .', 'N.Y.')
+        port = port.replace('N . J .', 'N.J.').replace('N . H .', 'N.H.')
+        port = port.replace('R . I .', 'R.I.')
+
+    official_no = parse_official_number(scan)
+    build_location, build_year, builder = parse_build_info(scan)
+    if build_location:
+        build_location = re.sub(r'\s+,', ',', build_location)
+        build_location = re.sub(r'\s+\.', '.', build_location)
+    if builder:
+        builder = re.sub(r'\s+\.', '.', builder)
+        builder = re.sub(r'\s+,', ',', builder)
+        builder = builder.strip().rstrip(' ,')
+    tonnage = parse_tonnage(scan)
+    length, beam, depth = parse_dimensions(scan)
+    decks, masts = parse_deck_masts(scan)
+    stern, head = parse_stern_head(scan)
+
+    return {
+        "entry_num": entry["entry_num"],
+        "vessel_name": entry["vessel_name"],
+        "vessel_type": entry["vessel_type"],
+        "hailing_port": port,
+        "official_number": official_no,
+        "place_built": build_location,
+        "year_built": build_year,
+        "builder": builder,
+        "tonnage": tonnage,
+        "length_ft": length,
+        "beam_ft": beam,
+        "depth_ft": depth,
+        "decks": decks,
+        "masts": masts,
+        "stern_type": stern,
+        "head_type": head,
+        "raw_content": entry["raw_text"],
+    }
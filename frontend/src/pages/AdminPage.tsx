@@ -14,11 +14,23 @@ interface IngestResult {
   document_id?: string;
   title?: string;
   chunks_created?: number;
+  version?: number;
+  chunks_reused?: number;
   message?: string;
   docs_loaded?: number;
   errors?: string[];
 }
 
+interface IngestRun {
+  run_id: string;
+  status: "pending" | "running" | "completed" | "failed";
+  documents_processed: number;
+  chunks_created: number;
+  duplicates: number;
+  errors: string[];
+  result?: IngestResult | Record<string, IngestResult> | null;
+}
+
 interface AdminPageProps {
   onLogout: () => void;
 }
@@ -88,6 +100,30 @@ export default function AdminPage({ onLogout }: AdminPageProps) {
     return res.json();
   };
 
+  // --- Run polling: ingestion endpoints return a run_id immediately ---
+  const pollRun = async (runId: string): Promise<IngestResult> => {
+    for (;;) {
+      const res = await fetch(`/api/ingest/runs/${runId}`, {
+        headers: { Authorization: `Bearer ${token}` },
+      });
+      if (!res.ok) throw new Error(`API error ${res.status}`);
+      const run: IngestRun = await res.json();
+      if (run.status === "completed" || run.status === "failed") {
+        const single = run.result && "status" in run.result ? (run.result as IngestResult) : null;
+        return {
+          status: run.status === "failed" ? "failed" : single?.status ?? "completed",
+          document_id: single?.document_id,
+          title: single?.title,
+          chunks_created: run.chunks_created,
+          docs_loaded: single ? undefined : run.documents_processed,
+          message: single?.message,
+          errors: run.errors,
+        };
+      }
+      await new Promise((r) => setTimeout(r, 1500));
+    }
+  };
+
   // --- Upload handler ---
   const handleUpload = async (e: React.FormEvent) => {
     e.preventDefault();
@@ -98,8 +134,8 @@ export default function AdminPage({ onLogout }: AdminPageProps) {
       form.append("file", file);
       if (uploadTown) form.append("town", uploadTown);
       if (uploadArchive) form.append("archive_name", uploadArchive);
-      const data = await apiFetch("/api/ingest/upload", form);
-      setResult(data);
+      const run = await apiFetch("/api/ingest/upload", form);
+      setResult(await pollRun(run.run_id));
     } catch (err) {
       setError(err instanceof Error ? err.message : "Upload failed");
     } finally {
@@ -117,8 +153,8 @@ export default function AdminPage({ onLogout }: AdminPageProps) {
       form.append("url", url);
       if (urlTown) form.append("town", urlTown);
       if (urlArchive) form.append("archive_name", urlArchive);
-      const data = await apiFetch("/api/ingest/url", form);
-      setResult(data);
+      const run = await apiFetch("/api/ingest/url", form);
+      setResult(await pollRun(run.run_id));
     } catch (err) {
       setError(err instanceof Error ? err.message : "URL ingest failed");
     } finally {
@@ -142,8 +178,8 @@ export default function AdminPage({ onLogout }: AdminPageProps) {
         const err = await res.json().catch(() => ({ detail: res.statusText }));
         throw new Error(err.detail || `API error ${res.status}`);
       }
-      const data = await res.json();
-      setResult(data);
+      const run = await res.json();
+      setResult(await pollRun(run.run_id));
     } catch (err) {
       setError(err instanceof Error ? err.message : "Scrape failed");
     } finally {
@@ -411,6 +447,7 @@ export default function AdminPage({ onLogout }: AdminPageProps) {
           <div className="mt-4 p-4 bg-green-50 border border-green-200 rounded-lg text-sm">
             <p className="font-semibold text-green-800 mb-2">
               {result.status === "success" ? "✅ Ingested successfully" :
+               result.status === "updated" ? `✅ Updated to version ${result.version}` :
                result.status === "duplicate" ? "⚠️ Duplicate — already in knowledge base" :
                result.status === "completed" ? "✅ Scrape completed" :
                `Status: ${result.status}`}
@@ -419,6 +456,9 @@ export default function AdminPage({ onLogout }: AdminPageProps) {
             {result.chunks_created !== undefined && (
               <p className="text-gray-700">Chunks created: {result.chunks_created}</p>
             )}
+            {result.chunks_reused !== undefined && (
+              <p className="text-gray-700">Unchanged chunks kept: {result.chunks_reused}</p>
+            )}
             {result.docs_loaded !== undefined && (
               <p className="text-gray-700">Documents loaded: {result.docs_loaded}</p>
             )}
@@ -0,0 +1,142 @@
+"""
+Astoria v2 — Register extraction package tests.
+"""
+
+from extraction import bench, cli, lexer
+from extraction.entries import iter_entries
+from extraction.io import read_records
+from extraction.lexer import RegexScanner, extract_events, parse_entry, parse_vessel
+
+REGISTER = """\
+1. A. HOOPER, schooner, of Calais. Official No. 448. Built at Eden, 1854. 67.25 tons; \
+79.3 ft. x 21.7 ft. x 6.7 ft. One deck, two masts, square stern, a billethead. \
+Previously registered May 25, 1897, at Calais. Enrolled (temporary), No. 63, Nov. 4, 1897, \
+at Machias. Owners: Howard Q. Boardman, 1/4, E. B. Todd, 3/4, Calais. Master: Thomas E. Patterson.
+2. A . B . PERRY, schooner, of Machias. Built at Machias, 1850, by Gilbert Trott, master \
+carpenter. 98 40/95 tons; 70 ft. x 20 ft. x 7 ft. One deck, two masts, square stern, a billethead. \
+Enrolled, No. 4, May 2, 1851, at Machias. Owners: Gilbert Trott, 1/2, Josiah Libby, 1/2, Machias. \
+Master: Josiah Libby. Enrolled, No. 9, June 8, 1853, at Machias. Owners: same. Master: same.
+"""
+
+
+def test_entry_and_vessel_fields():
+    hooper, perry = (parse_vessel(e) for e in iter_entries(REGISTER))
+    assert perry["vessel_name"] == "A. B. Perry"
+    assert (hooper["official_number"], hooper["place_built"], hooper["year_built"]) == ("448", "Eden", 1854)
+    assert (hooper["length_ft"], hooper["beam_ft"], hooper["depth_ft"]) == (79.3, 21.7, 6.7)
+    assert perry["builder"] == "Gilbert Trott"
+    assert perry["tonnage"] == round(98 + 40 / 95, 2)
+
+    events = extract_events(perry)
+    assert [(e["event_date"], e["master"]) for e in events] == [
+        ("1851-05-02", "Josiah Libby"), ("1853-06-08", "(same as previous)"),
+    ]
+
+
+def test_lexer_matches_goldens_and_regex_reference():
+    entry_list = list(iter_entries(bench.SAMPLE.read_text(encoding="utf-8")))
+    parsed = [parse_entry(e) for e in entry_list]
+    assert parsed == [parse_entry(e, RegexScanner) for e in entry_list]
+    assert [v for v, _ in parsed] == bench.golden(cli.VESSELS)
+    assert [ev for _, evs in parsed for ev in evs] == bench.golden(cli.EVENTS)
+    results = bench.run_stages(entry_list, rounds=1)
+    for stage in bench.STAGES:
+        assert bench.field_diffs(results[stage][0], bench.golden(bench.GOLDEN_STEMS[stage]),
+                                 bench.RECORD_KEYS[stage]) == []
+    # one alternative per anchor position relies on this
+    words = lexer.ANCHOR_WORDS
+    assert not any(a != b and b.startswith(a) for a in words for b in words)
+
+
+def test_lexer_keeps_cascade_priority_over_text_order():
+    register = (REGISTER
+                .replace("98 40/95 tons;", "98 40/95 tons, having tonnage amended, 88.5 tons;")
+                .replace("79.3 ft.", "7 9 ft.")
+                .replace("70 ft. x 20 ft. x 7 ft", "70 ft. x 2 ft. x 7 ft"))
+    entry_list = list(iter_entries(register))
+    assert [parse_entry(e) for e in entry_list] == [parse_entry(e, RegexScanner) for e in entry_list]
+    hooper, perry = (v for v, _ in map(parse_entry, entry_list))
+    assert perry["tonnage"] == 88.5          # a decimal tonnage anywhere beats an earlier fraction
+    assert (hooper["length_ft"], hooper["beam_ft"]) == (79.0, 21.7)    # "9 ft" is implausible, "7 9 ft" loose
+    assert perry["length_ft"] is None        # implausible beam, and no loose match either
+
+
+def test_bench_field_diffs_and_synthetic_scale():
+    golden = bench.golden(cli.VESSELS)
+    changed = [dict(v) for v in golden[:-1]]
+    changed[0]["tonnage"] = 1.0
+    assert bench.field_diffs(changed, golden, bench.RECORD_KEYS["vessels"]) == [
+        ((1,), "tonnage", 67.25, 1.0), ((24,), None, golden[-1], None),
+    ]
+
+    entry_list = list(iter_entries(bench.synthesize(REGISTER, 3)))
+    assert [e["entry_num"] for e in entry_list] == [1, 2, 3, 4, 5, 6]
+    assert [e["vessel_name"] for e in entry_list[::2]] == ["A. Hooper A", "A. Hooper B", "A. Hooper C"]
+    roles = bench.run_stages(entry_list, rounds=1)["people"][0]
+    assert {r["person_name"] for r in roles if r["role"] == "builder"} == {
+        "Gilbert Trott", "Gilbert Trottb", "Gilbert Trottc"}
+
+
+def _run_all(tmp_path, out, *extra):
+    raw = tmp_path / "raw.txt"
+    raw.write_text(REGISTER)
+    opts = ["--out-dir", str(out), "--cache", str(tmp_path / "cache.sqlite"), *extra]
+    cli.main(["vessels", "--input", str(raw), *opts])
+    cli.main(["events", *opts])
+    cli.main(["people", *opts])
+    return {stem: list(read_records(str(out / f"{stem}.jsonl")))
+            for stem in (cli.VESSELS, cli.EVENTS, cli.PEOPLE)}
+
+
+def test_pool_matches_in_process_and_rerun_uses_cache(tmp_path, capsys):
+    serial = _run_all(tmp_path, tmp_path / "serial", "--workers", "1", "--no-cache")
+    pooled = _run_all(tmp_path, tmp_path / "pooled", "--workers", "2", "--shard-size", "1")
+    capsys.readouterr()
+    rerun = _run_all(tmp_path, tmp_path / "rerun", "--workers", "2")
+
+    assert serial == pooled == rerun
+    fused = tmp_path / "fused"
+    cli.main(["all", "--input", str(tmp_path / "raw.txt"), "--out-dir", str(fused), "--workers", "2"])
+    assert {stem: list(read_records(str(fused / f"{stem}.jsonl"))) for stem in serial} == serial
+    assert "0 parsed" in capsys.readouterr().out
+    perry = [r for r in serial[cli.PEOPLE] if r["vessel_name"] == "A. B. Perry"]
+    assert {(r["person_name"], r["role"], r["event_count"]) for r in perry} == {
+        ("Gilbert Trott", "builder", 1), ("Gilbert Trott", "owner", 1),
+        ("Josiah Libby", "owner", 1), ("Josiah Libby", "master", 2),
+    }
+
+
+def test_load_rows_and_merge():
+    from extraction import load
+
+    perry = parse_vessel(list(iter_entries(REGISTER))[1])
+    title, archive, _, raw, checksum, meta = load.document_row(perry)
+    assert title == "Ship Registry: A. B. Perry (Schooner)"
+    assert (meta.obj["entry_number"], meta.obj["breadth_ft"]) == (2, 20.0)
+    assert load.iso_date("1853-06-08") == "1853-06-08" and load.iso_date("1851-02-30") is None
+
+    documents = load.merge_sql(load.TABLES["vessels"])
+    assert "ON CONFLICT (checksum)" in documents and "raw_content = EXCLUDED" not in documents
+    events = load.merge_sql(load.TABLES["events"])
+    assert "ON CONFLICT (document_id, event_index)" in events
+    assert "WHERE document_id IS NOT NULL" in events
+
+
+def test_resolve_person_variants():
+    from extraction import resolve
+
+    def row(name, vessel, year):
+        return {"person_name": name, "vessel_name": vessel, "event_count": 1,
+                "first_date": f"{year}-01-01", "last_date": f"{year}-12-31"}
+
+    records = resolve.resolve([
+        row("A. A. Lowell", "Hooper", 1880), row("A A Lowell", "Hooper", 1884),
+        row("Albert A. Lowell", "Perry", 1886), row("John B. Chandler", "Hooper", 1880),
+        row("John C. Chandler", "Hooper", 1881), row("Wass", "Perry", 1880),
+        row("Wass, Jr.", "Perry", 1882),
+    ])
+    ids = {r["person_key"]: r["person_id"] for r in records}
+    assert ids["a a lowell"] == ids["albert a lowell"]
+    assert ids["john b chandler"] != ids["john c chandler"]
+    assert ids["wass"] != ids["wass jr"]
+    assert resolve.soundex("patterson") == resolve.soundex("patterscn") == "P362"